@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import numpy
+
+
+class AdjacencyGraph():
+    """
+    DESCRIPTION: Touch adjacency graph of the holdings. The holdings are referred by their position in the layer order, the adjacency lists are stored in compressed sparse row arrays
+    """
+
+    def __init__(self, featureIds, indptr, indices):
+        """
+        DESCRIPTION: Create the adjacency graph
+        INPUTS:
+                featureIds: List or NumPy array, feature ids of the holdings, in the layer order
+                indptr: NumPy array, row pointers
+                indices: NumPy array, positions of the neighbours, sorted inside the rows
+        OUTPUTS: None
+        """
+        self.featureIds = numpy.asarray(featureIds, dtype=numpy.int64)
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def fromPairs(cls, featureIds, firstPositions, secondPositions):
+        """
+        DESCRIPTION: Create the adjacency graph from the list of the touching pairs, each pair is needed only once
+        INPUTS:
+                featureIds: List or NumPy array, feature ids of the holdings, in the layer order
+                firstPositions: List, positions of the first holdings of the pairs
+                secondPositions: List, positions of the second holdings of the pairs
+        OUTPUTS: AdjacencyGraph
+        """
+        number = len(featureIds)
+        firstPositions = numpy.asarray(firstPositions, dtype=numpy.int64)
+        secondPositions = numpy.asarray(secondPositions, dtype=numpy.int64)
+        rows = numpy.concatenate((firstPositions, secondPositions))
+        columns = numpy.concatenate((secondPositions, firstPositions))
+        pairs = numpy.unique(numpy.stack((rows, columns), axis=1), axis=0).reshape(-1, 2)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        indptr = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(pairs[:, 0], minlength=number)))).astype(numpy.int64)
+        return cls(featureIds, indptr, pairs[:, 1].astype(numpy.int32))
+
+    def neighbours(self, position):
+        """
+        DESCRIPTION: Give back the positions of the holdings, which touch a holding
+        INPUTS:
+                position: Integer, position of the holding
+        OUTPUTS: NumPy array
+        """
+        return self.indices[self.indptr[position]:self.indptr[position+1]]
+
+    def neighbourFeatureIds(self, position):
+        """
+        DESCRIPTION: Give back the feature ids of the holdings, which touch a holding
+        INPUTS:
+                position: Integer, position of the holding
+        OUTPUTS: List, feature ids
+        """
+        return self.featureIds[self.neighbours(position)].tolist()
+
+    def degree(self, position):
+        """
+        DESCRIPTION: Give back the number of the neighbours of a holding
+        INPUTS:
+                position: Integer, position of the holding
+        OUTPUTS: Integer
+        """
+        return int(self.indptr[position+1] - self.indptr[position])
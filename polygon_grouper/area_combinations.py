@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import bisect, math
+
+
+class AreaCombinations():
+    """
+    DESCRIPTION: Lazy enumeration of the combinations of holdings, in the order of itertools.combinations by increasing size. The branches, which total area can not get inside the given area range, are pruned during the enumeration, and the size cap is applied before a combination is built
+    """
+
+    def __init__(self, elements, areas, minimalArea=None, maximalArea=None, constant=None, maxSize=10, sizes=None):
+        """
+        DESCRIPTION: Create the enumeration
+        INPUTS:
+                elements: List, holding ids
+                areas: Dictionary, key: holding id, values: Numeric, area
+                minimalArea: Numeric, smallest allowed total area of a combination (None: no limit)
+                maximalArea: Numeric, largest allowed total area of a combination (None: no limit)
+                constant: String, optional holding id, which is in every combination
+                maxSize: Integer, largest number of holdings in a combination, the constant included
+                sizes: List, optional, the enumerated numbers of elements (without the constant)
+        OUTPUTS: None
+        """
+        self.elements = list(elements)
+        self.areas = [areas[element] for element in self.elements]
+        if constant is not None:
+            self.prefix = (constant,)
+            self.prefixArea = areas[constant]
+        else:
+            self.prefix = ()
+            self.prefixArea = 0
+        largestSize = min(len(self.elements), maxSize - len(self.prefix))
+        if sizes is None:
+            self.sizes = list(range(1, largestSize + 1))
+        else:
+            self.sizes = [size for size in sizes if 1 <= size <= largestSize]
+        self.minimalArea = -math.inf if minimalArea is None else minimalArea
+        self.maximalArea = math.inf if maximalArea is None else maximalArea
+        # Floating point slack, so the pruning never drops a combination, which passes the threshold check
+        self.minimalArea -= 1e-9 * (1 + abs(self.minimalArea)) if math.isfinite(self.minimalArea) else 0
+        self.maximalArea += 1e-9 * (1 + abs(self.maximalArea)) if math.isfinite(self.maximalArea) else 0
+        # The pruning is only valid for non negative areas
+        self.pruning = all(area >= 0 for area in self.areas + [self.prefixArea])
+        self.largestSums = None
+        self.smallestSums = None
+        if self.pruning and self.sizes:
+            self.calculateSuffixSums(max(self.sizes))
+
+    def calculateSuffixSums(self, maximalCount):
+        """
+        DESCRIPTION: Calculate the sums of the largest and of the smallest areas after each position, for the bounds of the branches
+        INPUTS:
+                maximalCount: Integer, largest number of summed areas
+        OUTPUTS: None
+        """
+        number = len(self.areas)
+        self.largestSums = [None] * (number + 1)
+        self.smallestSums = [None] * (number + 1)
+        suffix = []
+        for position in range(number, -1, -1):
+            if position < number:
+                bisect.insort(suffix, self.areas[position])
+            count = min(maximalCount, len(suffix))
+            largest = [0]
+            smallest = [0]
+            for turn in range(count):
+                largest.append(largest[-1] + suffix[-1-turn])
+                smallest.append(smallest[-1] + suffix[turn])
+            self.largestSums[position] = largest
+            self.smallestSums[position] = smallest
+
+    def count(self):
+        """
+        DESCRIPTION: Give back the number of the combinations without the pruning, which is the length of the former full enumeration
+        INPUTS: None
+        OUTPUTS: Integer
+        """
+        return sum(math.comb(len(self.elements), size) for size in self.sizes)
+
+    def extend(self, size, start, partialArea, chosen, rank, limit):
+        """
+        DESCRIPTION: Enumerate the combinations, which continue a partial combination
+        INPUTS:
+                size: Integer, number of elements in the combinations
+                start: Integer, position of the first usable element
+                partialArea: Numeric, total area of the partial combination
+                chosen: List, holding ids of the partial combination
+                rank: Integer, position of the first continuation in the enumeration without pruning
+                limit: Numeric, the continuations from this position are not enumerated
+        OUTPUTS: Generator, tuples of the position and the holding ids
+        """
+        remaining = size - len(chosen)
+        if remaining == 0:
+            if self.minimalArea <= partialArea <= self.maximalArea:
+                yield rank, self.prefix + tuple(chosen)
+            return
+        number = len(self.elements)
+        for position in range(start, number - remaining + 1):
+            if rank >= limit:
+                return
+            area = self.areas[position]
+            # Number of the combinations, which continue with this element
+            branchSize = math.comb(number - position - 1, remaining - 1)
+            if self.pruning:
+                if partialArea + self.largestSums[position][remaining] < self.minimalArea:
+                    break
+                if partialArea + self.smallestSums[position][remaining] > self.maximalArea:
+                    break
+                if partialArea + area > self.maximalArea:
+                    rank += branchSize
+                    continue
+            chosen.append(self.elements[position])
+            yield from self.extend(size, position + 1, partialArea + area, chosen, rank, limit)
+            chosen.pop()
+            rank += branchSize
+
+    def ranked(self, limit=math.inf):
+        """
+        DESCRIPTION: Enumerate the combinations with their positions in the enumeration without pruning, so the caps of the search can count the pruned combinations as well
+        INPUTS:
+                limit: Numeric, optional, only the combinations before this position are enumerated
+        OUTPUTS: Generator, tuples of the position and the holding ids
+        """
+        rank = 0
+        for size in self.sizes:
+            if rank >= limit:
+                return
+            yield from self.extend(size, 0, self.prefixArea, [], rank, limit)
+            rank += math.comb(len(self.elements), size)
+
+    def limited(self, limit):
+        """
+        DESCRIPTION: Enumerate the combinations among the first ones of the enumeration without pruning, as the former capped search did
+        INPUTS:
+                limit: Integer, number of the combinations without pruning
+        OUTPUTS: Generator, tuples of holding ids
+        """
+        for rank, combination in self.ranked(limit):
+            yield combination
+
+    def __iter__(self):
+        for rank, combination in self.ranked():
+            yield combination
+
+
+class AreaMatching():
+    """
+    DESCRIPTION: Matching of the target and the holder combinations of a swap by their total areas. The holder areas are sorted once, and the target combinations are read in one pass: each target gets the holder combinations inside its allowed area range with binary search, instead of testing every pair. Only the targets with a match are given back, so the enumeration of the targets is never kept in full
+    """
+
+    def __init__(self, holderCombinations, holderAreas):
+        """
+        DESCRIPTION: Create the matching
+        INPUTS:
+                holderCombinations: List, combinations of the holder
+                holderAreas: List, total area of each holder combination
+        OUTPUTS: None
+        """
+        self.holderCombinations = holderCombinations
+        self.order = sorted(range(len(holderAreas)), key=holderAreas.__getitem__)
+        self.sortedAreas = [holderAreas[position] for position in self.order]
+
+    def match(self, targetCombinations, targetArea, lowest, highest):
+        """
+        DESCRIPTION: Give back the targets with the holder combinations, for which the net area (holder area minus target area) is inside a range
+        INPUTS:
+                targetCombinations: Iterable, combinations of the target holder
+                targetArea: Function, gives back the total area of a target combination
+                lowest: Numeric, smallest allowed net area
+                highest: Numeric, largest allowed net area
+        OUTPUTS: Generator, tuples of a target combination and List of the matching holder combinations, in the original orders
+        """
+        for targetCombination in targetCombinations:
+            area = targetArea(targetCombination)
+            minimalArea = area + lowest
+            maximalArea = area + highest
+            # Floating point slack, the threshold check is made again on the matched pairs
+            minimalArea -= 1e-9 * (1 + abs(minimalArea))
+            maximalArea += 1e-9 * (1 + abs(maximalArea))
+            start = bisect.bisect_left(self.sortedAreas, minimalArea)
+            end = bisect.bisect_right(self.sortedAreas, maximalArea)
+            if start < end:
+                yield targetCombination, [self.holderCombinations[position] for position in sorted(self.order[start:end])]
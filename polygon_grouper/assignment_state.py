@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+
+class AssignmentBuffer():
+    """
+    DESCRIPTION: In memory buffer of the attribute changes of the swaps (new holders and exchange labels). The changes are written to the layer with one bulk call, once per turn
+    """
+
+    def __init__(self, holdingIds, featureIds):
+        """
+        DESCRIPTION: Create the buffer
+        INPUTS:
+                holdingIds: List, holding ids
+                featureIds: List, feature ids, in the order of the holding ids
+        OUTPUTS: None
+        """
+        self.featureIds = dict(zip(holdingIds, featureIds))
+        self.changes = {}
+
+    def setValue(self, holdingId, field, newValue):
+        """
+        DESCRIPTION: Record the new value of a field of a holding
+        INPUTS:
+                holdingId: String, holding id
+                field: String, attribute name
+                newValue: String or Integer
+        OUTPUTS: None
+        """
+        self.changes.setdefault(self.featureIds[holdingId], {})[field] = newValue
+
+    def __len__(self):
+        return len(self.changes)
+
+    def flush(self, layer):
+        """
+        DESCRIPTION: Write every recorded change to the layer with one changeAttributeValues call, and empty the buffer
+        INPUTS:
+                layer: QgsVectorLayer
+        OUTPUTS: Boolean, result of the write
+        """
+        if not self.changes:
+            return True
+        dataProvider = layer.dataProvider()
+        fieldIndexes = {}
+        attributeMap = {}
+        for featureId, values in self.changes.items():
+            attributes = {}
+            for field, newValue in values.items():
+                if field not in fieldIndexes:
+                    fieldIndexes[field] = dataProvider.fieldNameIndex(field)
+                attributes[fieldIndexes[field]] = newValue
+            attributeMap[featureId] = attributes
+        result = dataProvider.changeAttributeValues(attributeMap)
+        self.changes = {}
+        layer.triggerRepaint()
+        return result
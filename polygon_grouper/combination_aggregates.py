@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+
+class CombinationAggregates():
+    """
+    DESCRIPTION: Precalculated totals of every combination of a small list of holdings. A combination is a bitmask over the positions of the holdings, and the total area, the sum and the maximum of the distances to a seed and the composite number of every mask are filled in once, each mask from the mask without its highest bit. The sums are made in the order of the positions, so they are equal to the sums made one by one
+    """
+
+    def __init__(self, holdingIds, areas, distance):
+        """
+        DESCRIPTION: Create the aggregates
+        INPUTS:
+                holdingIds: List, holding ids, in the order of the combinations
+                areas: Dictionary, key: holding id, values: Numeric, area
+                distance: Function, gives back the distance of a seed (first argument) and a holding (second argument)
+        OUTPUTS: None
+        """
+        self.holdingIds = list(holdingIds)
+        self.positions = {holdingId: position for position, holdingId in enumerate(self.holdingIds)}
+        self.holdingAreas = [areas[holdingId] for holdingId in self.holdingIds]
+        self.distance = distance
+        self.areas = self.subsetSums(self.holdingAreas)
+        self.counts = self.subsetSums([1] * len(self.holdingIds))
+        self.seedTables = {}
+
+    def subsetSums(self, values):
+        """
+        DESCRIPTION: Calculate the sum of the values of every mask
+        INPUTS:
+                values: List, Numeric, value by position
+        OUTPUTS: List, sum by mask
+        """
+        sums = [0] * (1 << len(values))
+        for mask in range(1, len(sums)):
+            highest = mask.bit_length() - 1
+            sums[mask] = sums[mask ^ (1 << highest)] + values[highest]
+        return sums
+
+    def subsetMaxima(self, values):
+        """
+        DESCRIPTION: Calculate the maximum of the values of every mask, 0 for the empty mask
+        INPUTS:
+                values: List, Numeric, value by position
+        OUTPUTS: List, maximum by mask
+        """
+        maxima = [0] * (1 << len(values))
+        for mask in range(1, len(maxima)):
+            highest = mask.bit_length() - 1
+            previous = maxima[mask ^ (1 << highest)]
+            value = values[highest]
+            maxima[mask] = value if value > previous else previous
+        return maxima
+
+    def mask(self, combination):
+        """
+        DESCRIPTION: Give back the bitmask of a combination
+        INPUTS:
+                combination: List, holding ids
+        OUTPUTS: Integer, KeyError if a holding is not in the list
+        """
+        mask = 0
+        for holdingId in combination:
+            mask |= 1 << self.positions[holdingId]
+        return mask
+
+    def seedTable(self, seed):
+        """
+        DESCRIPTION: Give back the distance totals of every mask to a seed, they are calculated at the first use
+        INPUTS:
+                seed: String, holding id
+        OUTPUTS: Tuple, Lists by mask: sum of the distances, maximum distance, composite number
+        """
+        try:
+            return self.seedTables[seed]
+        except KeyError:
+            distances = [self.distance(seed, holdingId) for holdingId in self.holdingIds]
+            composites = [area*distance for area, distance in zip(self.holdingAreas, distances)]
+            table = (self.subsetSums(distances), self.subsetMaxima(distances), self.subsetSums(composites))
+            self.seedTables[seed] = table
+            return table
+
+    def area(self, combination):
+        """
+        DESCRIPTION: Give back the total area of a combination
+        INPUTS:
+                combination: List, holding ids
+        OUTPUTS: Numeric
+        """
+        return self.areas[self.mask(combination)]
+
+    def distanceSum(self, combination, seed):
+        """
+        DESCRIPTION: Give back the sum of the distances of a combination to a seed
+        INPUTS:
+                combination: List, holding ids
+                seed: String, holding id
+        OUTPUTS: Numeric
+        """
+        return self.seedTable(seed)[0][self.mask(combination)]
+
+    def maxDistance(self, combination, seed):
+        """
+        DESCRIPTION: Give back the maximum distance of a combination to a seed
+        INPUTS:
+                combination: List, holding ids
+                seed: String, holding id
+        OUTPUTS: Numeric
+        """
+        return self.seedTable(seed)[1][self.mask(combination)]
+
+    def avgDistance(self, combination, seed):
+        """
+        DESCRIPTION: Give back the average distance of a combination to a seed
+        INPUTS:
+                combination: List, holding ids
+                seed: String, holding id
+        OUTPUTS: Numeric, ZeroDivisionError for an empty combination
+        """
+        mask = self.mask(combination)
+        return self.seedTable(seed)[0][mask] / self.counts[mask]
+
+    def compositeNumber(self, combination, seed):
+        """
+        DESCRIPTION: Give back the sum of the composite numbers (area multiplied by distance) of a combination to a seed
+        INPUTS:
+                combination: List, holding ids
+                seed: String, holding id
+        OUTPUTS: Numeric
+        """
+        return self.seedTable(seed)[2][self.mask(combination)]
@@ -1,43 +1,283 @@
-import itertools
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import math
 import multiprocessing
-import sys
 import os
+import shutil
+import sys
+import time
+
+try:
+    from .area_combinations import AreaCombinations, AreaMatching
+    from .combination_aggregates import CombinationAggregates
+    from .search_budget import bestFirstPairs, enumerationDeadline, untilDeadline
+except ImportError:
+    # Imported as a top level module (e.g. by the tests)
+    from area_combinations import AreaCombinations, AreaMatching
+    from combination_aggregates import CombinationAggregates
+    from search_budget import bestFirstPairs, enumerationDeadline, untilDeadline
+
+# Evaluator of the worker process, set by the pool initializer
+workerEvaluator = None
+
+
+class SwapEvaluator():
+    """
+    DESCRIPTION: Evaluation of the closer swaps between a holder and one target holder. It only reads the state, which does not change during a run (holding areas, centroid distances, total area bounds of the holders), the actual holdings and totals of the two holders are given with every evaluation. So the evaluations of a holder's targets are independent, and can run in worker processes
+    """
+
+    def __init__(self, holdingsWithArea, distanceMatrix, holderRegistry, simply=False, clock=time.time):
+        """
+        DESCRIPTION: Create the evaluator
+        INPUTS:
+                holdingsWithArea: Dictionary, key: holding id, values: Numeric, area
+                distanceMatrix: DistanceMatrix, centroid distances
+                holderRegistry: HolderRegistry, with the total area bounds
+                simply: Boolean, at most 200000 target combinations are checked, if there is no deadline
+                clock: Function, gives back the actual time in seconds, the same in every process
+        OUTPUTS: None
+        """
+        self.holdingsWithArea = holdingsWithArea
+        self.distanceMatrix = distanceMatrix
+        self.holderRegistry = holderRegistry
+        self.simply = simply
+        self.clock = clock
+        self.holderKey = None
+        self.holderCombinations = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['holderKey'] = None
+        state['holderCombinations'] = None
+        return state
+
+    def distance(self, seed, featureId):
+        """
+        DESCRIPTION: Give back the distance of a holding and the seed polygon
+        INPUTS:
+                seed: String, holding id
+                featureId: String, holding id
+        OUTPUTS: Numeric
+        """
+        return self.distanceMatrix[seed][featureId]
+
+    def distanceSummary(self, featureIds, seed):
+        """
+        DESCRIPTION: Calculate the maximum and the sum of the distances of a list of holdings and the seed polygon
+        INPUTS:
+                featureIds: List, holding ids
+                seed: String, holding id
+        OUTPUTS: Tuple, maximum distance and sum of the distances
+        """
+        row = self.distanceMatrix[seed]
+        maxDistance = 0
+        sumDistance = 0
+        for featureId in featureIds:
+            distance = row[featureId]
+            if distance > maxDistance:
+                maxDistance = distance
+            sumDistance += distance
+        return maxDistance, sumDistance
+
+    def combinationArea(self, combination):
+        """
+        DESCRIPTION: Calculate a list of holding's total area
+        INPUTS:
+                combination: List, holding ids
+        OUTPUTS: Numeric
+        """
+        temporaryArea = 0
+        for holding in combination:
+            temporaryArea += self.holdingsWithArea[holding]
+        return temporaryArea
+
+    def prepareHolder(self, holdings):
+        """
+        DESCRIPTION: Give back the combinations of the holder's holdings with their aggregates. The last result is kept, because the targets of a holder are evaluated after each other
+        INPUTS:
+                holdings: List, holding ids of the holder, which are suitable for change
+        OUTPUTS: Tuple, List of the combinations, AreaMatching of the combinations, Tuple of the smallest and largest total area, CombinationAggregates
+        """
+        key = tuple(holdings)
+        if key != self.holderKey:
+            aggregates = CombinationAggregates(holdings, self.holdingsWithArea, self.distance)
+            combinations = list(AreaCombinations(holdings, self.holdingsWithArea, maxSize=10))
+            areas = [aggregates.area(combination) for combination in combinations]
+            if areas:
+                areaRange = (min(areas), max(areas))
+            else:
+                areaRange = (math.inf, -math.inf)
+            self.holderKey = key
+            self.holderCombinations = (combinations, AreaMatching(combinations, areas), areaRange, aggregates)
+        return self.holderCombinations
+
+    def evaluate(self, holderSide, targetSide):
+        """
+        DESCRIPTION: Find the best closer swap between a holder and a target holder. The checks and the ranking are the same as in the closer function: the swapped holdings have to get closer to the seeds, the total areas have to stay inside the bounds, the holding numbers can not grow, and the largest composite number wins (the first one at equal numbers). The pairs are checked from the largest composite number, so the search stops at the first suitable pair, or at the deadline with the best pair found until then
+        INPUTS:
+                holderSide: Dictionary, keys: holder, seed, holdings (suitable for change), totalArea, totalDistance, holdingNumber, deadline (optional, time of the search in seconds)
+                targetSide: Dictionary, the same keys for the target holder, seed is None for a target without seed polygon
+        OUTPUTS: Tuple, composite number, holder combination, target combination, new total area of the holder and of the target; None if there is no suitable swap
+        """
+        holder = holderSide['holder']
+        seed = holderSide['seed']
+        holderTotalArea = holderSide['totalArea']
+        targetHolder = targetSide['holder']
+        targetHolderSeed = targetSide['seed']
+        targetTotalArea = targetSide['totalArea']
+        deadline = holderSide.get('deadline')
+        holderCombinations, matching, holderAreaRange, aggregates = self.prepareHolder(holderSide['holdings'])
+
+        lowest, highest = self.holderRegistry.transferWindow(holder, holderTotalArea, targetHolder, targetTotalArea)
+        smallest, largest = holderAreaRange
+        targetAllCombinations = AreaCombinations(targetSide['holdings'], self.holdingsWithArea, smallest - highest, largest - lowest, maxSize=10)
+        if deadline is not None:
+            # Part of the time is kept for checking the pairs, so the best one found until the deadline is given back
+            targetAllCombinations = untilDeadline(targetAllCombinations, enumerationDeadline(deadline, self.clock), self.clock)
+        elif self.simply:
+            targetAllCombinations = targetAllCombinations.limited(200000)
+        matches = matching.match(targetAllCombinations, self.combinationArea, lowest, highest)
+
+        # The pairs are checked in decreasing measure, so the first suitable one is the best
+        measures = {combination: aggregates.compositeNumber(combination, seed) for combination in holderCombinations}
+        targetDistances = {}
+        best = None
+        for targetCombination, holderCombination in untilDeadline(bestFirstPairs(matches, measures), deadline, self.clock):
+            try:
+                targetSeedMaxDistance, targetSeedSumDistance, targetMaxDistance, targetSumDistance = targetDistances[targetCombination]
+            except KeyError:
+                targetSeedMaxDistance, targetSeedSumDistance = self.distanceSummary(targetCombination, seed)
+                if targetHolderSeed is not None:
+                    targetMaxDistance, targetSumDistance = self.distanceSummary(targetCombination, targetHolderSeed)
+                else:
+                    targetMaxDistance, targetSumDistance = None, None
+                targetDistances[targetCombination] = (targetSeedMaxDistance, targetSeedSumDistance, targetMaxDistance, targetSumDistance)
+            holderAvgDistanceNew = targetSeedSumDistance / len(targetCombination)
+            holderMaxDistance = aggregates.maxDistance(holderCombination, seed)
+            holderAvgDistanceOld = aggregates.avgDistance(holderCombination, seed)
+            targetCloser = not targetSeedMaxDistance > holderMaxDistance and not targetSeedSumDistance > holderSide['totalDistance']
+            if targetHolderSeed is None:
+                if not (targetCloser and holderAvgDistanceNew < holderAvgDistanceOld):
+                    continue
+            else:
+                targetAvgDistanceOld = targetSumDistance / len(targetCombination)
+                targetAvgDistanceNew = aggregates.avgDistance(holderCombination, targetHolderSeed)
+                holderCloser = (not aggregates.maxDistance(holderCombination, targetHolderSeed) > targetMaxDistance
+                                and not aggregates.distanceSum(holderCombination, targetHolderSeed) > targetSide['totalDistance'])
+                if not (targetCloser and holderCloser and (targetAvgDistanceNew < targetAvgDistanceOld) and (holderAvgDistanceNew < holderAvgDistanceOld)):
+                    continue
+
+            newHolderTotalArea = holderTotalArea - aggregates.area(holderCombination) + self.combinationArea(targetCombination)
+            if self.holderRegistry.inBounds(holder, newHolderTotalArea):
+                newTargetTotalArea = targetTotalArea - self.combinationArea(targetCombination) + aggregates.area(holderCombination)
+                if self.holderRegistry.inBounds(targetHolder, newTargetTotalArea):
+                    localMeasure = measures[holderCombination]
+                    holderNewHoldignNum = holderSide['holdingNumber'] - len(holderCombination) + len(targetCombination)
+                    targetNewHoldingNum = targetSide['holdingNumber'] - len(targetCombination) + len(holderCombination)
+                    if holderNewHoldignNum <= holderSide['holdingNumber'] and targetNewHoldingNum <= targetSide['holdingNumber']:
+                        if best is None or not best[0] or best[0] < localMeasure:
+                            best = (localMeasure, holderCombination, targetCombination, newHolderTotalArea, newTargetTotalArea)
+                        if best[0]:
+                            # The next pairs can not have larger measure
+                            break
+        return best
+
+
+class SwapPool():
+    """
+    DESCRIPTION: Pool of worker processes for the swap evaluations. The evaluator is sent once to every worker at the start, after that only the holder and target data of the evaluations are sent. With one worker the evaluations run in the main process
+    """
+
+    def __init__(self, evaluator, workers=1):
+        """
+        DESCRIPTION: Create the pool, the worker processes are started at the first parallel evaluation
+        INPUTS:
+                evaluator: SwapEvaluator
+                workers: Integer, number of worker processes, 0 for the number of processors
+        OUTPUTS: None
+        """
+        self.evaluator = evaluator
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.pool = None
+
+    def start(self):
+        """
+        DESCRIPTION: Start the worker processes. The spawn method is used on every platform, because a forked QGIS process is not safe
+        INPUTS: None
+        OUTPUTS: None
+        """
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(pythonExecutable())
+        self.pool = context.Pool(processes=self.workers, initializer=initWorker, initargs=(self.evaluator,))
+
+    def evaluate(self, tasks):
+        """
+        DESCRIPTION: Evaluate swaps
+        INPUTS:
+                tasks: List, tuples of the holder side and the target side Dictionaries (see SwapEvaluator.evaluate)
+        OUTPUTS: List, results of the evaluations, in the order of the tasks
+        """
+        if self.workers < 2 or len(tasks) < 2:
+            return [self.evaluator.evaluate(holderSide, targetSide) for holderSide, targetSide in tasks]
+        if self.pool is None:
+            self.start()
+        # Every (holder, target) pair is a separate chunk, so one large target enumeration does not hold back the pairs behind it
+        return self.pool.map(evaluateTask, tasks, chunksize=1)
+
+    def close(self):
+        """
+        DESCRIPTION: Stop the worker processes
+        INPUTS: None
+        OUTPUTS: None
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+
+def pythonExecutable():
+    """
+    DESCRIPTION: Find the Python interpreter for the worker processes. Inside QGIS sys.executable can be the QGIS application itself
+    INPUTS: None
+    OUTPUTS: String, path of the interpreter
+    """
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    version = f'python{sys.version_info.major}.{sys.version_info.minor}'
+    candidates = [os.path.join(sys.exec_prefix, 'pythonw.exe'),
+                  os.path.join(sys.exec_prefix, 'python.exe'),
+                  os.path.join(sys.exec_prefix, 'bin', version),
+                  os.path.join(sys.exec_prefix, 'bin', 'python3')]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return shutil.which(version) or shutil.which('python3') or sys.executable
+
+
+def initWorker(evaluator):
+    """
+    DESCRIPTION: Keep the evaluator in a worker process
+    INPUTS:
+            evaluator: SwapEvaluator
+    OUTPUTS: None
+    """
+    global workerEvaluator
+    workerEvaluator = evaluator
+
 
-def combinationIterator(iterable, r):
-    returnList = []
-    for combination in itertools.combinations(iterable, r):
-        if len(combination) >= 1 and len(combination) <= 10:
-            returnList.append(combination)
-    return returnList
-
-def chunkIteration(iterable, r, chunkSize):
-    return itertools.islice(combinationIterator(iterable, r), chunkSize)
-
-class MultiProcessCombinator():
-
-    def __init__(self):
-        self.cpu_count = os.cpu_count()-2
-
-    def multiProcess(self, iterable, r):
-        chunkIterable = chunkIteration(iterable, r, self.cpu_count)
-        with multiprocessing.Pool(processes=self.cpu_count) as pool:
-            results = pool.map(chunkIteration, chunkIterable)
-            pool.close()
-            pool.join()
-        result = [result.get() for result in results]
-        return result
-
-#def parallelProcess(chunkIteratorVar, poolSize):
-#    with multiprocessing.Pool(processes=poolSize) as pool:
-#        results = [pool.apply_async(chunkIteratorVar) for _ in range(len(chunkIteratorVar))]
-#        pool.close()
-#        pool.join()
-#        return [result.get() for result in results]
-#
-if __name__ == "__main__":
-    worker = MultiProcessCombinator()
-    work = worker.multiProcess(sys.argv[1].split(','), int(sys.argv[2]))
-    sys.stdout.write(work)
-    #return work
-#if __name__ == "__main__":
-#    pass
\ No newline at end of file
+def evaluateTask(task):
+    """
+    DESCRIPTION: Evaluate a swap in a worker process
+    INPUTS:
+            task: Tuple, holder side and target side Dictionaries
+    OUTPUTS: Tuple, result of SwapEvaluator.evaluate
+    """
+    holderSide, targetSide = task
+    return workerEvaluator.evaluate(holderSide, targetSide)
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import itertools
+import numpy
+
+# Maximal number of matrix cells computed at once, to keep temporary arrays small
+BLOCK_CELLS = 4000000
+
+
+class DistanceRow():
+    """
+    DESCRIPTION: Read view of one row of a distance matrix, which can be used as the former nested dictionary (holding id -> distance)
+    """
+
+    def __init__(self, index, holdingIds, distances):
+        """
+        DESCRIPTION: Create a row view
+        INPUTS:
+                index: Dictionary, key: holding id, values: Integer, position in the arrays
+                holdingIds: List, holding ids, ordered by their position
+                distances: NumPy array, distances of the row
+        OUTPUTS: None
+        """
+        self.index = index
+        self.holdingIds = holdingIds
+        self.distances = distances
+        self.extra = {}
+
+    def __getitem__(self, holdingId):
+        try:
+            return float(self.distances[self.index[holdingId]])
+        except KeyError:
+            return self.extra[holdingId]
+
+    def __setitem__(self, holdingId, distance):
+        if holdingId in self.index:
+            self.distances[self.index[holdingId]] = distance
+        else:
+            self.extra[holdingId] = distance
+
+    def __contains__(self, holdingId):
+        return holdingId in self.index or holdingId in self.extra
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self):
+        return len(self.holdingIds) + len(self.extra)
+
+    def keys(self):
+        # Iterators, the full rows are not copied on every call
+        return itertools.chain(self.holdingIds, self.extra.keys())
+
+    def values(self):
+        return itertools.chain(map(float, self.distances), self.extra.values())
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+
+class DistanceMatrix():
+    """
+    DESCRIPTION: Distance matrix of the holdings centroids. The centroids are stored in a contiguous coordinate array, every holding id has an integer index in it. Only the rows of the seed polygons are stored, the other rows are calculated on demand
+    """
+
+    def __init__(self, holdingIds, coordinates, dtype=numpy.float64):
+        """
+        DESCRIPTION: Create the distance matrix
+        INPUTS:
+                holdingIds: List, holding ids
+                coordinates: List or NumPy array, (x, y) coordinates of the centroids, in the order of the holding ids
+                dtype: NumPy type of the stored distances
+        OUTPUTS: None
+        """
+        self.holdingIds = list(holdingIds)
+        self.index = {holdingId: turn for turn, holdingId in enumerate(self.holdingIds)}
+        self.coordinates = numpy.ascontiguousarray(coordinates, dtype=numpy.float64).reshape(-1, 2)
+        self.dtype = dtype
+        self.rows = {}
+
+    def __getstate__(self):
+        # Only the centroids are pickled (e.g. for the worker processes). The seed rows would be seeds x holdings distances, a worker
+        # calculates a row again at its first use (one vectorised pass over the centroids) and keeps it for the rest of the run
+        state = self.__dict__.copy()
+        state['rows'] = {}
+        return state
+
+    def addRows(self, holdingIds):
+        """
+        DESCRIPTION: Materialise the rows of some holdings (seed polygons), in row blocks
+        INPUTS:
+                holdingIds: List, holding ids
+        OUTPUTS: None
+        """
+        missing = [holdingId for holdingId in dict.fromkeys(holdingIds) if holdingId not in self.rows and holdingId in self.index]
+        blockSize = max(1, BLOCK_CELLS // max(1, len(self.holdingIds)))
+        for start in range(0, len(missing), blockSize):
+            block = missing[start:start+blockSize]
+            positions = [self.index[holdingId] for holdingId in block]
+            distances = self.distancesFrom(self.coordinates[positions]).astype(self.dtype)
+            for holdingId, rowDistances in zip(block, distances):
+                self.rows[holdingId] = DistanceRow(self.index, self.holdingIds, rowDistances)
+
+    def distancesFrom(self, points):
+        """
+        DESCRIPTION: Calculate the distances of some points to every centroid
+        INPUTS:
+                points: NumPy array, (x, y) coordinates
+        OUTPUTS: NumPy array, len(points) x N distances
+        """
+        dx = points[:, 0, None] - self.coordinates[None, :, 0]
+        dy = points[:, 1, None] - self.coordinates[None, :, 1]
+        return numpy.hypot(dx, dy)
+
+    def row(self, holdingId):
+        """
+        DESCRIPTION: Give back the distances of a holding to every holding
+        INPUTS:
+                holdingId: String, holding id
+        OUTPUTS: NumPy array
+        """
+        return self[holdingId].distances
+
+    def __getitem__(self, holdingId):
+        try:
+            return self.rows[holdingId]
+        except KeyError:
+            position = self.index[holdingId]
+            distances = self.distancesFrom(self.coordinates[position:position+1])[0].astype(self.dtype)
+            distanceRow = DistanceRow(self.index, self.holdingIds, distances)
+            self.rows[holdingId] = distanceRow
+            return distanceRow
+
+    def __contains__(self, holdingId):
+        return holdingId in self.index
+
+    def __iter__(self):
+        return iter(self.holdingIds)
+
+    def __len__(self):
+        return len(self.holdingIds)
+
+    def keys(self):
+        return list(self.holdingIds)
+
+    def items(self):
+        return ((holdingId, self[holdingId]) for holdingId in self.holdingIds)
+
+
+class RadiusRow():
+    """
+    DESCRIPTION: Read only view of one row of a sparse distance matrix, which can be used as the former nested dictionary (holding id -> distance), in the order of the distances
+    """
+
+    def __init__(self, holdingIds, indices, distances):
+        """
+        DESCRIPTION: Create a row view
+        INPUTS:
+                holdingIds: List, holding ids, ordered by their position
+                indices: NumPy array, positions of the holdings inside the threshold, sorted by distance
+                distances: NumPy array, distances of the holdings
+        OUTPUTS: None
+        """
+        self.distances = {holdingIds[index]: distance for index, distance in zip(indices.tolist(), distances.tolist())}
+
+    def __getitem__(self, holdingId):
+        return self.distances[holdingId]
+
+    def __contains__(self, holdingId):
+        return holdingId in self.distances
+
+    def __iter__(self):
+        return iter(self.distances)
+
+    def __len__(self):
+        return len(self.distances)
+
+    def keys(self):
+        return self.distances.keys()
+
+    def values(self):
+        return self.distances.values()
+
+    def items(self):
+        return self.distances.items()
+
+
+class RadiusMatrix():
+    """
+    DESCRIPTION: Sparse distance matrix, which contains only the holding pairs inside a distance threshold. The rows are stored in compressed sparse row arrays, sorted by distance
+    """
+
+    def __init__(self, holdingIds, coordinates, radius, dtype=numpy.float64, neighbourhoods=None):
+        """
+        DESCRIPTION: Create the sparse distance matrix with a uniform grid radius query
+        INPUTS:
+                holdingIds: List, holding ids
+                coordinates: List or NumPy array, (x, y) coordinates of the centroids, in the order of the holding ids
+                radius: Numeric, distance threshold
+                dtype: NumPy type of the stored distances
+                neighbourhoods: Tuple, row pointers, column indices and distances of a former calculation (e.g. from the cache), or None
+        OUTPUTS: None
+        """
+        self.holdingIds = list(holdingIds)
+        self.index = {holdingId: turn for turn, holdingId in enumerate(self.holdingIds)}
+        self.coordinates = numpy.ascontiguousarray(coordinates, dtype=numpy.float64).reshape(-1, 2)
+        self.radius = radius
+        self.dtype = dtype
+        self.rows = {}
+        if neighbourhoods is None:
+            self.indptr, self.indices, self.distances = self.calculateNeighbourhoods()
+        else:
+            self.indptr, self.indices, self.distances = self.orderTies(*neighbourhoods)
+
+    def calculateNeighbourhoods(self):
+        """
+        DESCRIPTION: Collect the holdings inside the distance threshold for every holding. The centroids are bucketed into grid cells with the size of the threshold, so only the 3 x 3 surrounding cells have to be checked
+        INPUTS: None
+        OUTPUTS: NumPy arrays, row pointers, column indices and distances
+        """
+        number = len(self.holdingIds)
+        valid = numpy.flatnonzero(numpy.isfinite(self.coordinates).all(axis=1))
+        cellSize = self.radius if self.radius > 0 else 1
+        cells = numpy.floor(self.coordinates[valid] / cellSize).astype(numpy.int64)
+        uniqueCells, inverse = numpy.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = valid[numpy.argsort(inverse, kind='stable')]
+        bounds = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(inverse, minlength=len(uniqueCells)))))
+        cellMembers = {}
+        for turn, cell in enumerate(uniqueCells.tolist()):
+            cellMembers[tuple(cell)] = order[bounds[turn]:bounds[turn+1]]
+
+        rows = []
+        columns = []
+        distances = []
+        for (cellX, cellY), members in cellMembers.items():
+            candidates = [cellMembers[(cellX+dx, cellY+dy)] for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (cellX+dx, cellY+dy) in cellMembers]
+            candidates = numpy.concatenate(candidates)
+            chunkSize = max(1, BLOCK_CELLS // len(candidates))
+            for start in range(0, len(members), chunkSize):
+                chunk = members[start:start+chunkSize]
+                dx = self.coordinates[chunk, 0, None] - self.coordinates[None, candidates, 0]
+                dy = self.coordinates[chunk, 1, None] - self.coordinates[None, candidates, 1]
+                chunkDistances = numpy.hypot(dx, dy)
+                rowPositions, columnPositions = numpy.nonzero(chunkDistances <= self.radius)
+                rows.append(chunk[rowPositions])
+                columns.append(candidates[columnPositions])
+                distances.append(chunkDistances[rowPositions, columnPositions])
+
+        if rows:
+            rows = numpy.concatenate(rows)
+            columns = numpy.concatenate(columns)
+            distances = numpy.concatenate(distances).astype(self.dtype)
+        else:
+            rows = numpy.zeros(0, dtype=numpy.int64)
+            columns = numpy.zeros(0, dtype=numpy.int64)
+            distances = numpy.zeros(0, dtype=self.dtype)
+        # Equal distances are ordered by holding id, as the former sorted (distance, id) tuples
+        sortOrder = numpy.lexsort((self.idRanks()[columns], distances, rows))
+        indptr = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(rows, minlength=number)))).astype(numpy.int64)
+        return indptr, columns[sortOrder].astype(numpy.int32), distances[sortOrder]
+
+    def idRanks(self):
+        """
+        DESCRIPTION: Give back the rank of every holding id in the sorted holding ids
+        INPUTS: None
+        OUTPUTS: NumPy array
+        """
+        number = len(self.holdingIds)
+        idRanks = numpy.empty(number, dtype=numpy.int64)
+        idRanks[sorted(range(number), key=self.holdingIds.__getitem__)] = numpy.arange(number)
+        return idRanks
+
+    def orderTies(self, indptr, indices, distances):
+        """
+        DESCRIPTION: Order the equal distances of the rows by the actual holding ids. The arrays are copied only if there is a tie
+        INPUTS:
+                indptr: NumPy array, row pointers
+                indices: NumPy array, column indices
+                distances: NumPy array, distances, sorted inside the rows
+        OUTPUTS: NumPy arrays, row pointers, column indices and distances
+        """
+        rows = numpy.repeat(numpy.arange(len(indptr)-1), numpy.diff(indptr))
+        ties = (rows[1:] == rows[:-1]) & (distances[1:] == distances[:-1])
+        if not ties.any():
+            return indptr, indices, distances
+        sortOrder = numpy.lexsort((self.idRanks()[indices], distances, rows))
+        return indptr, indices[sortOrder], distances[sortOrder]
+
+    def neighbourhood(self, holdingId):
+        """
+        DESCRIPTION: Give back the indices and distances of the holdings inside the threshold of a holding, sorted by distance
+        INPUTS:
+                holdingId: String, holding id
+        OUTPUTS: NumPy arrays, indices and distances
+        """
+        position = self.index[holdingId]
+        start, end = self.indptr[position], self.indptr[position+1]
+        return self.indices[start:end], self.distances[start:end]
+
+    def __getitem__(self, holdingId):
+        try:
+            return self.rows[holdingId]
+        except KeyError:
+            indices, distances = self.neighbourhood(holdingId)
+            radiusRow = RadiusRow(self.holdingIds, indices, distances)
+            self.rows[holdingId] = radiusRow
+            return radiusRow
+
+    def __contains__(self, holdingId):
+        return holdingId in self.index
+
+    def __iter__(self):
+        return iter(self.holdingIds)
+
+    def __len__(self):
+        return len(self.holdingIds)
+
+    def keys(self):
+        return list(self.holdingIds)
+
+    def items(self):
+        return ((holdingId, self[holdingId]) for holdingId in self.holdingIds)
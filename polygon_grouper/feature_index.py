@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+
+class FeatureIndex():
+    """
+    DESCRIPTION: Run scoped index of the holdings: holding id -> feature id, geometry and attribute values. The layer is read once, every later lookup is a dictionary access instead of an expression selection
+    """
+
+    def __init__(self, layer, idAttribute):
+        """
+        DESCRIPTION: Read every feature of the layer into the index
+        INPUTS:
+                layer: QgsVectorLayer
+                idAttribute: String, name of the holding id field
+        OUTPUTS: None
+        """
+        self.fieldNames = [field.name() for field in layer.fields()]
+        self.fieldIndexes = {fieldName: turn for turn, fieldName in enumerate(self.fieldNames)}
+        self.holdingIds = []
+        self.featureIds = []
+        self.geometries = []
+        self.attributes = []
+        idIndex = self.fieldIndexes[idAttribute]
+        for feature in layer.getFeatures():
+            attributes = tuple(feature.attributes())
+            self.holdingIds.append(attributes[idIndex])
+            self.featureIds.append(feature.id())
+            self.geometries.append(feature.geometry())
+            self.attributes.append(attributes)
+        self.index = {holdingId: position for position, holdingId in enumerate(self.holdingIds)}
+
+    def __len__(self):
+        return len(self.holdingIds)
+
+    def __contains__(self, holdingId):
+        return holdingId in self.index
+
+    def __getitem__(self, holdingId):
+        return self.geometries[self.index[holdingId]]
+
+    def featureId(self, holdingId):
+        """
+        DESCRIPTION: Give back the feature id of a holding
+        INPUTS:
+                holdingId: String, holding id
+        OUTPUTS: Integer
+        """
+        return self.featureIds[self.index[holdingId]]
+
+    def geometry(self, holdingId):
+        """
+        DESCRIPTION: Give back the geometry of a holding
+        INPUTS:
+                holdingId: String, holding id
+        OUTPUTS: QgsGeometry
+        """
+        return self.geometries[self.index[holdingId]]
+
+    def attribute(self, holdingId, fieldName):
+        """
+        DESCRIPTION: Give back an attribute value of a holding, as it was when the index was built
+        INPUTS:
+                holdingId: String, holding id
+                fieldName: String, name of the field
+        OUTPUTS: Attribute value
+        """
+        return self.attributes[self.index[holdingId]][self.fieldIndexes[fieldName]]
+
+    def column(self, fieldName):
+        """
+        DESCRIPTION: Give back the values of a field for every holding, in the layer order
+        INPUTS:
+                fieldName: String, name of the field
+        OUTPUTS: List
+        """
+        fieldIndex = self.fieldIndexes[fieldName]
+        return [attributes[fieldIndex] for attributes in self.attributes]
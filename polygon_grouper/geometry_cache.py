@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+from collections import OrderedDict
+
+
+class PairDistanceCache():
+    """
+    DESCRIPTION: Bounded least recently used cache of the geometry distances between two holdings, with hit and miss counters
+    """
+
+    def __init__(self, geometries, maxSize=100000):
+        """
+        DESCRIPTION: Create the distance cache
+        INPUTS:
+                geometries: FeatureIndex, or other mapping of the holding ids to geometries
+                maxSize: Integer, maximal number of the stored pairs
+        OUTPUTS: None
+        """
+        self.geometries = geometries
+        self.maxSize = maxSize
+        self.distances = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def distance(self, holdingId, otherHoldingId):
+        """
+        DESCRIPTION: Give back the distance of two holding geometries, calculate it only if it is not in the cache
+        INPUTS:
+                holdingId: String, holding id
+                otherHoldingId: String, holding id
+        OUTPUTS: Numeric
+        """
+        if str(holdingId) <= str(otherHoldingId):
+            key = (holdingId, otherHoldingId)
+        else:
+            key = (otherHoldingId, holdingId)
+        try:
+            distance = self.distances[key]
+            self.distances.move_to_end(key)
+            self.hits += 1
+            return distance
+        except KeyError:
+            self.misses += 1
+        distance = self.geometries[holdingId].distance(self.geometries[otherHoldingId])
+        self.distances[key] = distance
+        if len(self.distances) > self.maxSize:
+            self.distances.popitem(last=False)
+        return distance
+
+    def hitRate(self):
+        """
+        DESCRIPTION: Give back the ratio of the requests served from the cache
+        INPUTS: None
+        OUTPUTS: Numeric
+        """
+        requests = self.hits + self.misses
+        if requests == 0:
+            return 0
+        return self.hits / requests
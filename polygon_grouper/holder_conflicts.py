@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+
+class HolderConflicts():
+    """
+    DESCRIPTION: Conflict graph of the holders for the parallel swap rounds. Every holder has the set of holders, which are involved in its swaps (itself and the owners of the holdings inside the distance threshold of its seed). Two holders conflict, if these sets overlap, because the swap of one can change the input of the other's evaluation. The holders without conflict can be evaluated at the same time, and their swaps give the same result in any order
+    """
+
+    def __init__(self, involvement):
+        """
+        DESCRIPTION: Create the graph
+        INPUTS:
+                involvement: Dictionary, key: holder id, values: Iterable, holder ids involved in the holder's swaps
+        OUTPUTS: None
+        """
+        self.involvement = {holder: frozenset(involved) for holder, involved in involvement.items()}
+        self.index = {}
+        for holder, involved in self.involvement.items():
+            for key in involved:
+                self.index.setdefault(key, []).append(holder)
+
+    def neighbours(self, holder):
+        """
+        DESCRIPTION: Give back the holders in conflict with a holder
+        INPUTS:
+                holder: String, holder id
+        OUTPUTS: Set, holder ids
+        """
+        neighbours = set()
+        for key in self.involvement[holder]:
+            neighbours.update(self.index[key])
+        neighbours.discard(holder)
+        return neighbours
+
+    def colourClasses(self, order):
+        """
+        DESCRIPTION: Colour the graph greedily, every holder gets the smallest colour not used by its coloured neighbours
+        INPUTS:
+                order: List, holder ids, in the order of the colouring
+        OUTPUTS: List, Lists of holder ids by colour, in the original order inside a colour
+        """
+        colours = {}
+        classes = []
+        for holder in order:
+            used = {colours[neighbour] for neighbour in self.neighbours(holder) if neighbour in colours}
+            colour = 0
+            while colour in used:
+                colour += 1
+            colours[holder] = colour
+            if colour == len(classes):
+                classes.append([])
+            classes[colour].append(holder)
+        return classes
+
+    def split(self, holders):
+        """
+        DESCRIPTION: Select the holders without conflict among each other, in order
+        INPUTS:
+                holders: List, holder ids
+        OUTPUTS:
+                accepted: List, holder ids without conflict
+                deferred: List, holder ids in conflict with an accepted one
+        """
+        accepted = []
+        deferred = []
+        used = set()
+        for holder in holders:
+            involved = self.involvement[holder]
+            if used.isdisjoint(involved):
+                accepted.append(holder)
+                used.update(involved)
+            else:
+                deferred.append(holder)
+        return accepted, deferred
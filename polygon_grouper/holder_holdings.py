@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+
+class HolderHoldings():
+    """
+    DESCRIPTION: Holdings of the holders, with copy-on-write lists. A swap replaces the lists of the two holders instead of changing them, and the replaced lists are kept in the journal of the actual snapshot, so a turn can read its starting state without copying every list
+    """
+
+    def __init__(self, holdersWithHoldings):
+        """
+        DESCRIPTION: Create the store
+        INPUTS:
+                holdersWithHoldings: Dictionary, key: holder id, values: List, holding ids
+        OUTPUTS: None
+        """
+        self.holdings = dict(holdersWithHoldings)
+        self.journal = None
+
+    def snapshot(self):
+        """
+        DESCRIPTION: Start a new snapshot of the actual state. Only the last snapshot is kept up to date
+        INPUTS: None
+        OUTPUTS: HoldingsSnapshot
+        """
+        self.journal = {}
+        return HoldingsSnapshot(self, self.journal)
+
+    def record(self, holder):
+        """
+        DESCRIPTION: Keep the list of a holder in the journal, before it is replaced the first time since the snapshot
+        INPUTS:
+                holder: String, holder id
+        OUTPUTS: None
+        """
+        if self.journal is not None and holder not in self.journal:
+            self.journal[holder] = self.holdings[holder]
+
+    def move(self, holding, holder, targetHolder):
+        """
+        DESCRIPTION: Move a holding from a holder to another
+        INPUTS:
+                holding: String, holding id
+                holder: String, holder id, the actual holder of the holding
+                targetHolder: String, holder id, the new holder of the holding
+        OUTPUTS: None, ValueError if the holder has not the holding
+        """
+        self.record(holder)
+        self.record(targetHolder)
+        holdings = list(self.holdings[holder])
+        holdings.remove(holding)
+        self.holdings[holder] = holdings
+        self.holdings[targetHolder] = self.holdings[targetHolder] + [holding]
+
+    def __getitem__(self, holder):
+        return self.holdings[holder]
+
+    def __contains__(self, holder):
+        return holder in self.holdings
+
+    def __iter__(self):
+        return iter(self.holdings)
+
+    def __len__(self):
+        return len(self.holdings)
+
+    def get(self, holder, default=None):
+        return self.holdings.get(holder, default)
+
+    def keys(self):
+        return self.holdings.keys()
+
+    def values(self):
+        return self.holdings.values()
+
+    def items(self):
+        return self.holdings.items()
+
+
+class HoldingsSnapshot():
+    """
+    DESCRIPTION: Read only view of the holdings at the time of the snapshot
+    """
+
+    def __init__(self, holderHoldings, journal):
+        """
+        DESCRIPTION: Create the view
+        INPUTS:
+                holderHoldings: HolderHoldings
+                journal: Dictionary, key: holder id, values: List, holding ids at the time of the snapshot
+        OUTPUTS: None
+        """
+        self.holderHoldings = holderHoldings
+        self.journal = journal
+
+    def __getitem__(self, holder):
+        try:
+            return self.journal[holder]
+        except KeyError:
+            return self.holderHoldings[holder]
+
+    def __contains__(self, holder):
+        return holder in self.holderHoldings
+
+    def __iter__(self):
+        return iter(self.holderHoldings)
+
+    def __len__(self):
+        return len(self.holderHoldings)
+
+    def keys(self):
+        return self.holderHoldings.keys()
+
+    def items(self):
+        """
+        DESCRIPTION: Give back the holders with their holdings at the time of the snapshot. The lists are read when they are reached, so the swaps made meanwhile are not seen
+        INPUTS: None
+        OUTPUTS: Generator, tuples of holder id and List, holding ids
+        """
+        for holder in self.holderHoldings:
+            yield holder, self[holder]
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import numpy
+
+
+class HolderRegistry():
+    """
+    DESCRIPTION: Dense index of the holders. Every distinct holder value gets an integer code once, the per holder numbers (total area, area bounds, holding number, total distance) are stored in NumPy arrays by these codes. The original holder values are kept for the output
+    """
+
+    def __init__(self, holders):
+        """
+        DESCRIPTION: Create the codes of the holders
+        INPUTS:
+                holders: List, holder ids, in the order of the codes
+        OUTPUTS: None
+        """
+        self.holders = list(holders)
+        self.codes = {}
+        for code, holder in enumerate(self.holders):
+            self.codes.setdefault(holder, code)
+        for code, holder in enumerate(self.holders):
+            # The same holder can come as String or as number from the different fields
+            self.codes.setdefault(str(holder), code)
+        self.lowerBounds = None
+        self.upperBounds = None
+
+    def __len__(self):
+        return len(self.holders)
+
+    def code(self, holder):
+        """
+        DESCRIPTION: Give back the code of a holder
+        INPUTS:
+                holder: String or Numeric, holder id
+        OUTPUTS: Integer, KeyError if the holder is unknown
+        """
+        try:
+            return self.codes[holder]
+        except KeyError:
+            return self.codes[str(holder)]
+
+    def value(self, code):
+        """
+        DESCRIPTION: Give back the original holder id of a code
+        INPUTS:
+                code: Integer, holder code
+        OUTPUTS: String or Numeric, holder id
+        """
+        return self.holders[code]
+
+    def column(self, values=None, dtype=numpy.float64):
+        """
+        DESCRIPTION: Create a per holder array with dictionary access
+        INPUTS:
+                values: Dictionary, key: holder id, values: Numeric, the holders not in it are left unset
+                dtype: NumPy dtype of the array
+        OUTPUTS: HolderColumn
+        """
+        array = numpy.zeros(len(self.holders), dtype=dtype)
+        defined = numpy.zeros(len(self.holders), dtype=bool)
+        if values:
+            for holder, value in values.items():
+                code = self.code(holder)
+                array[code] = value
+                defined[code] = True
+        return HolderColumn(self, array, defined)
+
+    def setBounds(self, totalAreas, tolerance):
+        """
+        DESCRIPTION: Calculate the allowed total area range of every holder
+        INPUTS:
+                totalAreas: HolderColumn, starting total areas
+                tolerance: Numeric, tolerance in percent
+        OUTPUTS: None
+        """
+        difference = totalAreas.array * (tolerance / 100)
+        self.lowerBounds = totalAreas.array - difference
+        self.upperBounds = totalAreas.array + difference
+
+    def inBounds(self, holder, totalArea):
+        """
+        DESCRIPTION: Check if a total area is inside the range of a holder
+        INPUTS:
+                holder: String or Numeric, holder id
+                totalArea: Numeric
+        OUTPUTS: Boolean
+        """
+        code = self.code(holder)
+        return bool(self.upperBounds[code] >= totalArea >= self.lowerBounds[code])
+
+    def transferWindow(self, holder, holderArea, targetHolder, targetArea):
+        """
+        DESCRIPTION: Calculate the range of the net area, which can move from a holder to a target holder, so both stay inside their range
+        INPUTS:
+                holder: String or Numeric, holder id
+                holderArea: Numeric, actual total area of the holder
+                targetHolder: String or Numeric, holder id of the target
+                targetArea: Numeric, actual total area of the target
+        OUTPUTS: Tuple, smallest and largest net area (given area minus received area)
+        """
+        code = self.code(holder)
+        targetCode = self.code(targetHolder)
+        lowest = max(holderArea - self.upperBounds[code], self.lowerBounds[targetCode] - targetArea)
+        highest = min(holderArea - self.lowerBounds[code], self.upperBounds[targetCode] - targetArea)
+        return float(lowest), float(highest)
+
+
+class HolderColumn():
+    """
+    DESCRIPTION: Per holder NumPy array, which can be used like a dictionary keyed by the holder ids
+    """
+
+    def __init__(self, registry, array, defined):
+        """
+        DESCRIPTION: Create the column
+        INPUTS:
+                registry: HolderRegistry
+                array: NumPy array, values by holder code
+                defined: NumPy array, Boolean, which holders have a value
+        OUTPUTS: None
+        """
+        self.registry = registry
+        self.array = array
+        self.defined = defined
+
+    def __getitem__(self, holder):
+        code = self.registry.code(holder)
+        if not self.defined[code]:
+            raise KeyError(holder)
+        return self.array[code].item()
+
+    def __setitem__(self, holder, value):
+        code = self.registry.code(holder)
+        self.array[code] = value
+        self.defined[code] = True
+
+    def __contains__(self, holder):
+        try:
+            return bool(self.defined[self.registry.code(holder)])
+        except KeyError:
+            return False
+
+    def __len__(self):
+        return int(numpy.count_nonzero(self.defined))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def get(self, holder, default=None):
+        """
+        DESCRIPTION: Give back the value of a holder, or the default if it has no value
+        INPUTS:
+                holder: String or Numeric, holder id
+                default: Default value
+        OUTPUTS: Numeric
+        """
+        try:
+            return self[holder]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """
+        DESCRIPTION: Give back the holders with value, in the order of the codes
+        INPUTS: None
+        OUTPUTS: List, holder ids
+        """
+        return [self.registry.value(code) for code in numpy.flatnonzero(self.defined).tolist()]
+
+    def values(self):
+        """
+        DESCRIPTION: Give back the values, in the order of the codes
+        INPUTS: None
+        OUTPUTS: List
+        """
+        return self.array[self.defined].tolist()
+
+    def items(self):
+        """
+        DESCRIPTION: Give back the holders with their values, in the order of the codes
+        INPUTS: None
+        OUTPUTS: List, tuples of holder id and value
+        """
+        return list(zip(self.keys(), self.values()))
+
+    def copy(self):
+        """
+        DESCRIPTION: Give back an independent copy of the column with the same registry
+        INPUTS: None
+        OUTPUTS: HolderColumn
+        """
+        return HolderColumn(self.registry, self.array.copy(), self.defined.copy())
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import numpy
+
+
+class HoldingMask():
+    """
+    DESCRIPTION: Set of holdings stored as a Boolean NumPy mask over the holding positions (e.g. the changable, seed or not changable holdings). Adding, removing and testing a holding are constant time, a list of holdings is filtered with one array lookup
+    """
+
+    def __init__(self, holdingIds, members=(), index=None):
+        """
+        DESCRIPTION: Create the mask
+        INPUTS:
+                holdingIds: List, holding ids, in the order of their positions
+                members: Iterable, holding ids in the set, the unknown ids are left out
+                index: Dictionary, key: holding id, values: Integer, position; created from the holding ids if not given
+        OUTPUTS: None
+        """
+        self.holdingIds = holdingIds
+        if index is None:
+            index = {holdingId: position for position, holdingId in enumerate(holdingIds)}
+        self.index = index
+        self.mask = numpy.zeros(len(holdingIds), dtype=bool)
+        self.update(members)
+
+    def positions(self, holdingIds):
+        """
+        DESCRIPTION: Give back the positions of holdings
+        INPUTS:
+                holdingIds: List, holding ids
+        OUTPUTS: NumPy array, positions, -1 for the unknown ids
+        """
+        index = self.index
+        return numpy.fromiter((index.get(holdingId, -1) for holdingId in holdingIds), dtype=numpy.int64, count=len(holdingIds))
+
+    def selected(self, holdingIds):
+        """
+        DESCRIPTION: Check which of the holdings are in the set
+        INPUTS:
+                holdingIds: List, holding ids
+        OUTPUTS: NumPy array, Boolean
+        """
+        positions = self.positions(holdingIds)
+        return (positions >= 0) & self.mask[positions]
+
+    def add(self, holdingId):
+        """
+        DESCRIPTION: Add a holding to the set, the unknown ids are left out
+        INPUTS:
+                holdingId: String, holding id
+        OUTPUTS: None
+        """
+        position = self.index.get(holdingId)
+        if position is not None:
+            self.mask[position] = True
+
+    def update(self, holdingIds):
+        """
+        DESCRIPTION: Add holdings to the set, the unknown ids are left out
+        INPUTS:
+                holdingIds: Iterable, holding ids
+        OUTPUTS: None
+        """
+        positions = [self.index[holdingId] for holdingId in holdingIds if holdingId in self.index]
+        self.mask[positions] = True
+
+    def remove(self, holdingId):
+        """
+        DESCRIPTION: Remove a holding from the set
+        INPUTS:
+                holdingId: String, holding id
+        OUTPUTS: None, ValueError if the holding is not in the set
+        """
+        if holdingId not in self:
+            raise ValueError(f'{holdingId} is not in the set')
+        self.mask[self.index[holdingId]] = False
+
+    def discard(self, holdingId):
+        """
+        DESCRIPTION: Remove a holding from the set, if it is in it
+        INPUTS:
+                holdingId: String, holding id
+        OUTPUTS: None
+        """
+        position = self.index.get(holdingId)
+        if position is not None:
+            self.mask[position] = False
+
+    def filter(self, holdingIds):
+        """
+        DESCRIPTION: Give back the holdings, which are in the set
+        INPUTS:
+                holdingIds: List, holding ids
+        OUTPUTS: List, holding ids, in the given order
+        """
+        return [holdingId for holdingId, selected in zip(holdingIds, self.selected(holdingIds).tolist()) if selected]
+
+    def exclude(self, holdingIds):
+        """
+        DESCRIPTION: Give back the holdings, which are not in the set
+        INPUTS:
+                holdingIds: List, holding ids
+        OUTPUTS: List, holding ids, in the given order
+        """
+        return [holdingId for holdingId, selected in zip(holdingIds, self.selected(holdingIds).tolist()) if not selected]
+
+    def intersection(self, holdingIds):
+        """
+        DESCRIPTION: Create a new set from the holdings, which are in this set
+        INPUTS:
+                holdingIds: List, holding ids
+        OUTPUTS: HoldingMask
+        """
+        intersection = HoldingMask(self.holdingIds, index=self.index)
+        positions = self.positions(holdingIds)
+        positions = positions[positions >= 0]
+        intersection.mask[positions] = self.mask[positions]
+        return intersection
+
+    def difference(self, other):
+        """
+        DESCRIPTION: Create a new set from the holdings of this set, which are not in the other set
+        INPUTS:
+                other: HoldingMask, over the same holdings
+        OUTPUTS: HoldingMask
+        """
+        difference = HoldingMask(self.holdingIds, index=self.index)
+        difference.mask = self.mask & ~other.mask
+        return difference
+
+    def copy(self):
+        """
+        DESCRIPTION: Give back an independent copy of the set
+        INPUTS: None
+        OUTPUTS: HoldingMask
+        """
+        copied = HoldingMask(self.holdingIds, index=self.index)
+        copied.mask = self.mask.copy()
+        return copied
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __contains__(self, holdingId):
+        position = self.index.get(holdingId)
+        return position is not None and bool(self.mask[position])
+
+    def __len__(self):
+        return int(numpy.count_nonzero(self.mask))
+
+    def __iter__(self):
+        return (self.holdingIds[position] for position in numpy.flatnonzero(self.mask).tolist())
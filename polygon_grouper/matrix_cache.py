@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import os, hashlib, struct, tempfile, shutil
+import numpy
+
+# Version of the stored layout, change it when the stored arrays change
+CACHE_VERSION = 2
+
+
+class MatrixCache():
+    """
+    DESCRIPTION: On disk cache of the distance data of a layer, reused across runs. The entries are keyed by a hash of the CRS and of the feature ids and geometries, and stored as NumPy arrays, which are memory-mapped read only, so several processes can share one copy
+    """
+
+    def __init__(self, directory, crs):
+        """
+        DESCRIPTION: Create the cache and start the hash of the layer
+        INPUTS:
+                directory: String, path of the cache directory
+                crs: String, WKT of the layer CRS
+        OUTPUTS: None
+        """
+        self.directory = os.path.join(directory, 'vgle_cache')
+        self.hash = hashlib.sha1()
+        self.hash.update(f'{CACHE_VERSION}|{crs}|'.encode('utf-8'))
+        self.featureNumber = 0
+        self.key = None
+
+    def addFeature(self, featureId, wkb):
+        """
+        DESCRIPTION: Add a feature to the hash of the layer. The features have to be added in the layer order
+        INPUTS:
+                featureId: Integer, feature id
+                wkb: Bytes, WKB of the feature geometry
+        OUTPUTS: None
+        """
+        wkb = bytes(wkb)
+        self.hash.update(struct.pack('<qq', featureId, len(wkb)))
+        self.hash.update(wkb)
+        self.featureNumber += 1
+
+    def getKey(self):
+        """
+        DESCRIPTION: Give back the key of the layer, after every feature was added
+        INPUTS: None
+        OUTPUTS: String
+        """
+        if self.key is None:
+            self.hash.update(struct.pack('<q', self.featureNumber))
+            self.key = self.hash.hexdigest()
+        return self.key
+
+    def entryPath(self, name):
+        """
+        DESCRIPTION: Give back the directory of a cache entry
+        INPUTS:
+                name: String, name of the entry
+        OUTPUTS: String
+        """
+        return os.path.join(self.directory, self.getKey(), name)
+
+    def load(self, name, arrayNames):
+        """
+        DESCRIPTION: Memory-map the arrays of a cache entry
+        INPUTS:
+                name: String, name of the entry
+                arrayNames: List, names of the arrays
+        OUTPUTS: Dictionary, key: array name, values: NumPy array; or None, if the entry is missing or broken
+        """
+        path = self.entryPath(name)
+        if not os.path.isdir(path):
+            return None
+        arrays = {}
+        try:
+            for arrayName in arrayNames:
+                arrayPath = os.path.join(path, f'{arrayName}.npy')
+                try:
+                    arrays[arrayName] = numpy.load(arrayPath, mmap_mode='r', allow_pickle=False)
+                except ValueError:
+                    # Empty arrays can not be memory-mapped
+                    arrays[arrayName] = numpy.load(arrayPath, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        return arrays
+
+    def save(self, name, arrays):
+        """
+        DESCRIPTION: Write the arrays of a cache entry. The entry is written into a temporary directory and renamed, so the other processes see it complete or not at all
+        INPUTS:
+                name: String, name of the entry
+                arrays: Dictionary, key: array name, values: NumPy array
+        OUTPUTS: Boolean, True if the entry was written
+        """
+        path = self.entryPath(name)
+        parent = os.path.dirname(path)
+        try:
+            os.makedirs(parent, exist_ok=True)
+            tempPath = tempfile.mkdtemp(prefix=f'.{name}_', dir=parent)
+        except OSError:
+            return False
+        try:
+            for arrayName, array in arrays.items():
+                numpy.save(os.path.join(tempPath, f'{arrayName}.npy'), numpy.ascontiguousarray(array), allow_pickle=False)
+            os.replace(tempPath, path)
+            return True
+        except OSError:
+            # Another process has written the same entry meanwhile
+            shutil.rmtree(tempPath, ignore_errors=True)
+            return os.path.isdir(path)
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import numpy
+
+
+class OwnerComponents():
+    """
+    DESCRIPTION: Connected blocks of the holdings of each holder over the adjacency graph, tracked with union-find. The swaps update the blocks incrementally, so the holdings, which are connected to their holder's seed polygons can be queried without dissolving the layer
+    """
+
+    def __init__(self, adjacencyGraph, holdingIds, holdersWithHoldings, holderRegistry=None):
+        """
+        DESCRIPTION: Create the blocks of the holders
+        INPUTS:
+                adjacencyGraph: AdjacencyGraph, touch adjacency of the holdings
+                holdingIds: List, holding ids, ordered by their position in the graph
+                holdersWithHoldings: Dictionary, key: holder id, values: List, holding ids
+                holderRegistry: HolderRegistry, if given the holder codes follow its codes
+        OUTPUTS: None
+        """
+        self.adjacencyGraph = adjacencyGraph
+        self.holdingIds = holdingIds
+        self.index = {holdingId: position for position, holdingId in enumerate(holdingIds)}
+        self.parents = list(range(len(holdingIds)))
+        self.owners = [None] * len(holdingIds)
+        # Holder code of every holding, -1 if the holding has no holder
+        self.ownerCodes = numpy.full(len(holdingIds), -1, dtype=numpy.int32)
+        self.holderValues = []
+        self.holderCodes = {}
+        if holderRegistry is not None:
+            for holder in holderRegistry.holders:
+                self.holderCode(holder)
+        self.members = {}
+        for holder, holdings in holdersWithHoldings.items():
+            self.members[holder] = set()
+            code = self.holderCode(holder)
+            for holding in holdings:
+                position = self.index[holding]
+                self.owners[position] = holder
+                self.ownerCodes[position] = code
+                self.members[holder].add(position)
+        for holder in self.members:
+            self.rebuild(holder)
+        self.dirtyHolders = set(self.members.keys())
+
+    def holderCode(self, holder):
+        """
+        DESCRIPTION: Give back the code of a holder, the unknown holders get the next code
+        INPUTS:
+                holder: String, holder id
+        OUTPUTS: Integer
+        """
+        try:
+            return self.holderCodes[holder]
+        except KeyError:
+            self.holderCodes[holder] = len(self.holderValues)
+            self.holderValues.append(holder)
+            return self.holderCodes[holder]
+
+    def find(self, position):
+        """
+        DESCRIPTION: Give back the root of the block of a holding, with path halving
+        INPUTS:
+                position: Integer, position of the holding
+        OUTPUTS: Integer
+        """
+        parents = self.parents
+        while parents[position] != position:
+            parents[position] = parents[parents[position]]
+            position = parents[position]
+        return position
+
+    def union(self, position, otherPosition):
+        """
+        DESCRIPTION: Join the blocks of two holdings
+        INPUTS:
+                position: Integer, position of the holding
+                otherPosition: Integer, position of the other holding
+        OUTPUTS: None
+        """
+        root = self.find(position)
+        otherRoot = self.find(otherPosition)
+        if root != otherRoot:
+            if root < otherRoot:
+                self.parents[otherRoot] = root
+            else:
+                self.parents[root] = otherRoot
+
+    def attach(self, position):
+        """
+        DESCRIPTION: Join a holding to the blocks of its touching holdings with the same holder
+        INPUTS:
+                position: Integer, position of the holding
+        OUTPUTS: None
+        """
+        owner = self.owners[position]
+        for neighbour in self.adjacencyGraph.neighbours(position).tolist():
+            if self.owners[neighbour] == owner:
+                self.union(position, neighbour)
+
+    def rebuild(self, holder):
+        """
+        DESCRIPTION: Calculate again the blocks of a holder, which lost holdings. Only the holdings of the holder are touched
+        INPUTS:
+                holder: String, holder id
+        OUTPUTS: None
+        """
+        members = self.members.get(holder, set())
+        for position in members:
+            self.parents[position] = position
+        for position in members:
+            self.attach(position)
+
+    def move(self, changes):
+        """
+        DESCRIPTION: Update the blocks after a swap. The holders, which lost holdings are rebuilt, the others get the new holdings incrementally
+        INPUTS:
+                changes: List, tuples of holding id and its new holder id
+        OUTPUTS: None
+        """
+        losers = set()
+        gained = []
+        for holdingId, holder in changes:
+            position = self.index[holdingId]
+            oldHolder = self.owners[position]
+            if oldHolder == holder:
+                continue
+            if oldHolder is not None:
+                self.members[oldHolder].discard(position)
+                losers.add(oldHolder)
+            self.owners[position] = holder
+            self.ownerCodes[position] = -1 if holder is None else self.holderCode(holder)
+            self.members.setdefault(holder, set()).add(position)
+            self.parents[position] = position
+            gained.append(position)
+        for holder in losers:
+            self.rebuild(holder)
+        for position in gained:
+            if self.owners[position] not in losers:
+                self.attach(position)
+        self.dirtyHolders.update(losers)
+        self.dirtyHolders.update(self.owners[position] for position in gained)
+
+    def holder(self, holdingId):
+        """
+        DESCRIPTION: Give back the actual holder of a holding
+        INPUTS:
+                holdingId: String, holding id
+        OUTPUTS: String, holder id, 'NULL' if the holding has no holder
+        """
+        owner = self.owners[self.index[holdingId]]
+        if owner is None:
+            return 'NULL'
+        return owner
+
+    def holdersOf(self, holdingIds, excluded=(), totalAreas=None, minimalArea=None):
+        """
+        DESCRIPTION: Give back the distinct holders of some holdings with one array lookup, in the order of their first holding
+        INPUTS:
+                holdingIds: List, holding ids
+                excluded: Iterable, holder ids to leave out
+                totalAreas: HolderColumn, actual total areas of the holders, with the same codes
+                minimalArea: Numeric, the holders with smaller or equal total area are left out
+        OUTPUTS: List, holder ids
+        """
+        positions = numpy.fromiter((self.index[holdingId] for holdingId in holdingIds), dtype=numpy.int64, count=len(holdingIds))
+        codes = self.ownerCodes[positions]
+        codes = codes[codes >= 0]
+        if minimalArea is not None:
+            codes = codes[totalAreas.array[codes] > minimalArea]
+        codes, firstPositions = numpy.unique(codes, return_index=True)
+        holders = [self.holderValues[code] for code in codes[numpy.argsort(firstPositions)].tolist()]
+        if excluded:
+            excluded = set(excluded)
+            holders = [holder for holder in holders if holder not in excluded]
+        return holders
+
+    def block(self, holdingId):
+        """
+        DESCRIPTION: Give back the holdings in the same block as a holding
+        INPUTS:
+                holdingId: String, holding id
+        OUTPUTS: List, holding ids, in the graph order
+        """
+        position = self.index[holdingId]
+        owner = self.owners[position]
+        if owner is None:
+            return [holdingId]
+        root = self.find(position)
+        return [self.holdingIds[member] for member in sorted(self.members[owner]) if self.find(member) == root]
+
+    def markDirty(self, holder):
+        """
+        DESCRIPTION: Mark a holder to be checked again, e.g. after it got a new seed polygon
+        INPUTS:
+                holder: String, holder id
+        OUTPUTS: None
+        """
+        self.dirtyHolders.add(holder)
+
+    def connected(self, holdingId, otherHoldingId):
+        """
+        DESCRIPTION: Check, if two holdings are in the same block
+        INPUTS:
+                holdingId: String, holding id
+                otherHoldingId: String, holding id
+        OUTPUTS: Boolean
+        """
+        return self.find(self.index[holdingId]) == self.find(self.index[otherHoldingId])
+
+    def attachedHoldings(self, seeds):
+        """
+        DESCRIPTION: Give back the holdings, which are in the same block as one of their holder's seed polygons (seeds excluded). Only the holders, which were changed since the last call are checked
+        INPUTS:
+                seeds: Dictionary, key: holder id, values: List, holding ids of the seed polygons
+        OUTPUTS: List, holding ids, in the graph order
+        """
+        attached = []
+        for holder in self.dirtyHolders:
+            holderSeeds = [self.index[seed] for seed in seeds.get(holder, []) if seed in self.index]
+            seedRoots = set(self.find(seed) for seed in holderSeeds)
+            if not seedRoots:
+                continue
+            for position in self.members.get(holder, set()):
+                if position not in holderSeeds and self.find(position) in seedRoots:
+                    attached.append(position)
+        self.dirtyHolders = set()
+        return [self.holdingIds[position] for position in sorted(attached)]
+
+    def blocks(self):
+        """
+        DESCRIPTION: Give back the blocks of every holder
+        INPUTS: None
+        OUTPUTS: List, Lists of holding positions, ordered by their first position
+        """
+        blocks = {}
+        for position in range(len(self.parents)):
+            if self.owners[position] is not None:
+                blocks.setdefault(self.find(position), []).append(position)
+        return list(blocks.values())
+
+
+def mergeGroups(adjacencyGraph, featureIds, holders):
+    """
+    DESCRIPTION: Group the features of the merged output. The features are keyed by their feature id, because the holding id of a feature without holder can be NULL (string ids are only written for the held features). The connected blocks of every holder are merged, the features without holder are left alone
+    INPUTS:
+            adjacencyGraph: AdjacencyGraph, touch adjacency of the holdings
+            featureIds: List, feature ids, ordered by their position in the graph
+            holders: Dictionary, key: feature id, values: final holder id, None for the features without holder
+    OUTPUTS:
+            blocks: List, Lists of feature ids of the blocks, ordered by their first position
+            unheld: List, feature ids without holder, in the order of the positions
+    """
+    holdersWithFeatures = {}
+    unheld = []
+    for featureId in featureIds:
+        holder = holders[featureId]
+        if holder is None:
+            unheld.append(featureId)
+        else:
+            holdersWithFeatures.setdefault(holder, []).append(featureId)
+    blocks = OwnerComponents(adjacencyGraph, featureIds, holdersWithFeatures).blocks()
+    return [[featureIds[position] for position in block] for block in blocks], unheld
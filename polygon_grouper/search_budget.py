@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import heapq
+import time
+
+
+class SearchBudget():
+    """
+    DESCRIPTION: Wall clock budget of the swap search. The remaining time of the run is split between the holders, which are still to be evaluated in the turn, so the time a holder does not use goes to the next ones. Without a time limit the budget never expires
+    """
+
+    def __init__(self, timeLimit=0, clock=time.time):
+        """
+        DESCRIPTION: Start the budget
+        INPUTS:
+                timeLimit: Numeric, seconds of the whole search, 0 for no limit
+                clock: Function, gives back the actual time in seconds, the same in every process
+        OUTPUTS: None
+        """
+        self.timeLimit = timeLimit
+        self.clock = clock
+        if timeLimit and timeLimit > 0:
+            self.deadline = clock() + timeLimit
+        else:
+            self.deadline = None
+
+    def limited(self):
+        """
+        DESCRIPTION: Check if there is a time limit
+        INPUTS: None
+        OUTPUTS: Boolean
+        """
+        return self.deadline is not None
+
+    def expired(self):
+        """
+        DESCRIPTION: Check if the time of the search is over
+        INPUTS: None
+        OUTPUTS: Boolean
+        """
+        return self.deadline is not None and self.clock() >= self.deadline
+
+    def holderDeadline(self, remainingHolders):
+        """
+        DESCRIPTION: Give the next holder an equal share of the remaining time
+        INPUTS:
+                remainingHolders: Integer, number of the holders to be evaluated in the turn, the actual one included
+        OUTPUTS: Numeric, deadline of the holder's search, None without time limit
+        """
+        if self.deadline is None:
+            return None
+        now = self.clock()
+        return now + max(0, self.deadline - now) / max(1, remainingHolders)
+
+
+def deadlinePassed(deadline, clock=time.time):
+    """
+    DESCRIPTION: Check if a deadline is passed
+    INPUTS:
+            deadline: Numeric, time in seconds, None for no deadline
+            clock: Function, gives back the actual time in seconds
+    OUTPUTS: Boolean
+    """
+    return deadline is not None and clock() > deadline
+
+
+def enumerationDeadline(deadline, clock=time.time, share=0.5):
+    """
+    DESCRIPTION: Give back the deadline of the combination enumeration inside a search. The enumeration stops earlier than the search, so the rest of the time is kept for checking the enumerated pairs, and the best pair found until the search's deadline can be used
+    INPUTS:
+            deadline: Numeric, deadline of the search in seconds, None for no deadline
+            clock: Function, gives back the actual time in seconds
+            share: Numeric, part of the remaining time for the enumeration
+    OUTPUTS: Numeric, deadline in seconds, None for no deadline
+    """
+    if deadline is None:
+        return None
+    now = clock()
+    return now + max(0, deadline - now) * share
+
+
+def untilDeadline(iterable, deadline, clock=time.time, step=256):
+    """
+    DESCRIPTION: Give back the elements of an iterable until a deadline, the time is checked at every step-th element
+    INPUTS:
+            iterable: Iterable
+            deadline: Numeric, time in seconds, None for no deadline
+            clock: Function, gives back the actual time in seconds
+            step: Integer, number of elements between the time checks
+    OUTPUTS: Generator
+    """
+    if deadline is None:
+        yield from iterable
+        return
+    for turn, element in enumerate(iterable):
+        if turn % step == 0 and clock() > deadline:
+            return
+        yield element
+
+
+def bestFirstPairs(matches, measures):
+    """
+    DESCRIPTION: Order the matched target and holder combinations by decreasing measure of the holder combination, the pairs with equal measure stay in their original order. So the first pair, which passes every check, is the one the full search would select
+    INPUTS:
+            matches: Iterable, tuples of a target combination and List of the matching holder combinations (see AreaMatching.match)
+            measures: Dictionary, key: holder combination, values: Numeric, measure (larger is better)
+    OUTPUTS: Generator, tuples of a target combination and a holder combination
+    """
+    targets = []
+    positions = {}
+    for targetPosition, (targetCombination, holderCombinations) in enumerate(matches):
+        targets.append((targetCombination, holderCombinations))
+        for holderPosition, holderCombination in enumerate(holderCombinations):
+            positions.setdefault(holderCombination, []).append((targetPosition, holderPosition))
+    groups = {}
+    for holderCombination in positions:
+        measure = measures[holderCombination]
+        # The not comparable (NaN) measures are checked last
+        groups.setdefault(measure if measure == measure else None, []).append(holderCombination)
+    values = sorted([value for value in groups if value is not None], reverse=True)
+    if None in groups:
+        values.append(None)
+    for value in values:
+        for targetPosition, holderPosition in heapq.merge(*[positions[holderCombination] for holderCombination in groups[value]]):
+            targetCombination, holderCombinations = targets[targetPosition]
+            yield targetCombination, holderCombinations[holderPosition]
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import heapq
+import itertools
+
+
+class HolderVersions():
+    """
+    DESCRIPTION: Change counters of the holders. The counter of a holder grows with every swap the holder takes part in, so the results calculated from an earlier state of the holder can be recognised as stale
+    """
+
+    def __init__(self):
+        """
+        DESCRIPTION: Create the counters, every holder starts from 0
+        INPUTS: None
+        OUTPUTS: None
+        """
+        self.versions = {}
+
+    def get(self, holder):
+        """
+        DESCRIPTION: Give back the counter of a holder
+        INPUTS:
+                holder: String, holder id
+        OUTPUTS: Integer
+        """
+        return self.versions.get(holder, 0)
+
+    def bump(self, *holders):
+        """
+        DESCRIPTION: Increase the counters of holders
+        INPUTS:
+                holders: Strings, holder ids
+        OUTPUTS: None
+        """
+        for holder in holders:
+            self.versions[holder] = self.versions.get(holder, 0) + 1
+
+
+class SwapQueue():
+    """
+    DESCRIPTION: Best swaps of the (holder, target holder) pairs, kept between the turns. Each holder has a max-heap of its pairs by composite number. An entry is reused while the versions of the two holders and the input of its evaluation are the same, the replaced entries are dropped from the heaps lazily, when they get to the top
+    """
+
+    def __init__(self, versions=None):
+        """
+        DESCRIPTION: Create the queue
+        INPUTS:
+                versions: HolderVersions, optional, shared change counters
+        OUTPUTS: None
+        """
+        if versions is None:
+            versions = HolderVersions()
+        self.versions = versions
+        self.entries = {}
+        self.heaps = {}
+        self.sizes = {}
+        self.stamps = itertools.count()
+        self.hits = 0
+        self.misses = 0
+
+    def hitRate(self):
+        """
+        DESCRIPTION: Give back the ratio of the evaluations served from the queue
+        INPUTS: None
+        OUTPUTS: Numeric
+        """
+        requests = self.hits + self.misses
+        if requests == 0:
+            return 0
+        return self.hits / requests
+
+    def signature(self, holderSide, targetSide):
+        """
+        DESCRIPTION: Create the comparable key of an evaluation input (the deadline is left out)
+        INPUTS:
+                holderSide: Dictionary, holder side of the evaluation
+                targetSide: Dictionary, target side of the evaluation
+        OUTPUTS: Tuple
+        """
+        return tuple(tuple((key, tuple(value) if isinstance(value, list) else value) for key, value in sorted(side.items()) if key != 'deadline')
+                     for side in (holderSide, targetSide))
+
+    def lookup(self, holder, targetHolder, signature):
+        """
+        DESCRIPTION: Check if the result of a pair can be reused
+        INPUTS:
+                holder: String, holder id
+                targetHolder: String, holder id of the target
+                signature: Tuple, key of the actual evaluation input
+        OUTPUTS: Boolean
+        """
+        entry = self.entries.get((holder, targetHolder))
+        if (entry is not None and entry[3] is not None and entry[1] == self.versions.get(holder)
+                and entry[2] == self.versions.get(targetHolder) and entry[3] == signature):
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def store(self, holder, targetHolder, signature, result):
+        """
+        DESCRIPTION: Keep the result of a pair's evaluation
+        INPUTS:
+                holder: String, holder id
+                targetHolder: String, holder id of the target
+                signature: Tuple, key of the evaluation input, None if the result can not be reused (e.g. it was cut by a deadline)
+                result: Tuple, result of SwapEvaluator.evaluate, the composite number first; None if there is no swap
+        OUTPUTS: None
+        """
+        stamp = next(self.stamps)
+        self.entries[(holder, targetHolder)] = (stamp, self.versions.get(holder), self.versions.get(targetHolder), signature, result)
+        if result is not None and result[0] > 0:
+            heap = self.heaps.setdefault(holder, [])
+            heapq.heappush(heap, (-result[0], stamp, targetHolder))
+            if len(heap) > 2 * self.sizes.get(holder, 32):
+                self.compact(holder)
+
+    def compact(self, holder):
+        """
+        DESCRIPTION: Drop the replaced results from the heap of a holder
+        INPUTS:
+                holder: String, holder id
+        OUTPUTS: None
+        """
+        heap = [item for item in self.heaps[holder] if self.entries[(holder, item[2])][0] == item[1]]
+        heapq.heapify(heap)
+        self.heaps[holder] = heap
+        self.sizes[holder] = max(32, len(heap))
+
+    def result(self, holder, targetHolder):
+        """
+        DESCRIPTION: Give back the kept result of a pair
+        INPUTS:
+                holder: String, holder id
+                targetHolder: String, holder id of the target
+        OUTPUTS: Tuple, result of SwapEvaluator.evaluate or None
+        """
+        entry = self.entries.get((holder, targetHolder))
+        if entry is None:
+            return None
+        return entry[4]
+
+    def invalidate(self, *holders):
+        """
+        DESCRIPTION: Mark the results of holders stale, after they swapped
+        INPUTS:
+                holders: Strings, holder ids
+        OUTPUTS: None
+        """
+        self.versions.bump(*holders)
+
+    def best(self, holder, targetHolders):
+        """
+        DESCRIPTION: Select the best swap of a holder from the results of its actual targets, as the sequential selection would do: the largest composite number wins, at equal numbers the first target in the list. The results of every target in the list have to be stored or reused before
+        INPUTS:
+                holder: String, holder id
+                targetHolders: List, holder ids of the targets, in the order of the evaluation
+        OUTPUTS: Tuple, target holder id and its result; None if there is no swap
+        """
+        first = None
+        for targetHolder in targetHolders:
+            first = self.result(holder, targetHolder)
+            if first is not None:
+                break
+        if first is None:
+            return None
+        if not first[0] > 0:
+            # Zero or not comparable numbers are selected as the former loop did
+            return self.scan(holder, targetHolders)
+
+        positions = {}
+        for position, targetHolder in enumerate(targetHolders):
+            positions.setdefault(targetHolder, position)
+        heap = self.heaps[holder]
+        kept = []
+        chosen = None
+        while heap:
+            negativeMeasure, stamp, targetHolder = heap[0]
+            entry = self.entries.get((holder, targetHolder))
+            if entry is None or entry[0] != stamp:
+                # Replaced by a newer result
+                heapq.heappop(heap)
+                continue
+            if chosen is not None and negativeMeasure != chosen[0]:
+                break
+            item = heapq.heappop(heap)
+            kept.append(item)
+            if targetHolder in positions and (chosen is None or positions[targetHolder] < positions[chosen[2]]):
+                chosen = item
+        for item in kept:
+            heapq.heappush(heap, item)
+        if chosen is None:
+            return None
+        return chosen[2], self.result(holder, chosen[2])
+
+    def scan(self, holder, targetHolders):
+        """
+        DESCRIPTION: Select the best swap of a holder by checking every target in order
+        INPUTS:
+                holder: String, holder id
+                targetHolders: List, holder ids of the targets
+        OUTPUTS: Tuple, target holder id and its result; None if there is no swap
+        """
+        best = None
+        for targetHolder in targetHolders:
+            result = self.result(holder, targetHolder)
+            if result is None:
+                continue
+            if best is None or not best[1][0] or best[1][0] < result[0]:
+                best = (targetHolder, result)
+        return best
+
+
+class InfeasiblePairs():
+    """
+    DESCRIPTION: Memo of the (holder, target holder) evaluations, which gave no feasible swap, kept between the turns. An entry is valid while the versions of the two holders and the input of the evaluation are the same, so the pair is not evaluated again until one of its sides changes
+    """
+
+    def __init__(self, versions=None):
+        """
+        DESCRIPTION: Create the memo
+        INPUTS:
+                versions: HolderVersions, optional, shared change counters
+        OUTPUTS: None
+        """
+        if versions is None:
+            versions = HolderVersions()
+        self.versions = versions
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def known(self, key, holder, targetHolder, signature):
+        """
+        DESCRIPTION: Check if an evaluation is known to give no feasible swap
+        INPUTS:
+                key: Tuple, identifier of the evaluation, it contains the holder ids
+                holder: String, holder id
+                targetHolder: String, holder id of the target
+                signature: Tuple, input of the evaluation
+        OUTPUTS: Boolean
+        """
+        entry = self.entries.get(key)
+        if entry is not None and entry == (self.versions.get(holder), self.versions.get(targetHolder), signature):
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def record(self, key, holder, targetHolder, signature):
+        """
+        DESCRIPTION: Record an evaluation without feasible swap
+        INPUTS:
+                key: Tuple, identifier of the evaluation, it contains the holder ids
+                holder: String, holder id
+                targetHolder: String, holder id of the target
+                signature: Tuple, input of the evaluation
+        OUTPUTS: None
+        """
+        self.entries[key] = (self.versions.get(holder), self.versions.get(targetHolder), signature)
+
+    def hitRate(self):
+        """
+        DESCRIPTION: Give back the ratio of the evaluations skipped by the memo
+        INPUTS: None
+        OUTPUTS: Numeric
+        """
+        requests = self.hits + self.misses
+        if requests == 0:
+            return 0
+        return self.hits / requests
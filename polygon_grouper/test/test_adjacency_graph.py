@@ -0,0 +1,47 @@
+# coding=utf-8
+"""Adjacency graph test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import unittest
+
+from adjacency_graph import AdjacencyGraph
+
+
+class AdjacencyGraphTest(unittest.TestCase):
+    """Test the compressed adjacency lists."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.graph = AdjacencyGraph.fromPairs([10, 11, 12, 13], [0, 2, 1, 0], [1, 1, 0, 0])
+
+    def test_neighbours(self):
+        """Test the pairs are symmetric, sorted and without duplicates."""
+        self.assertEqual(self.graph.neighbours(0).tolist(), [1])
+        self.assertEqual(self.graph.neighbours(1).tolist(), [0, 2])
+        self.assertEqual(self.graph.neighbours(3).tolist(), [])
+        self.assertEqual(self.graph.degree(1), 2)
+
+    def test_feature_ids(self):
+        """Test the neighbours are given back by feature id."""
+        self.assertEqual(self.graph.neighbourFeatureIds(1), [10, 12])
+
+    def test_empty(self):
+        """Test a layer without touching holdings."""
+        graph = AdjacencyGraph.fromPairs([0, 1], [], [])
+        self.assertEqual(graph.neighbours(1).tolist(), [])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(AdjacencyGraphTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
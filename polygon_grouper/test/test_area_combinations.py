@@ -0,0 +1,128 @@
+# coding=utf-8
+"""Area combinations test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import itertools
+import random
+import unittest
+
+from area_combinations import AreaCombinations, AreaMatching
+
+
+class AreaCombinationsTest(unittest.TestCase):
+    """Test the pruned lazy combination enumeration."""
+
+    def setUp(self):
+        """Runs before each test."""
+        random.seed(5)
+        self.elements = [f'h{index}' for index in range(12)]
+        self.areas = {element: random.uniform(0.5, 10) for element in self.elements}
+        self.areas['c'] = 3.0
+
+    def expected(self, elements, minimalArea, maximalArea, constant=None, maxSize=10):
+        """Filter the full enumeration, as the former implementation did."""
+        combinations = []
+        for size in range(1, len(elements) + 1):
+            for combination in itertools.combinations(elements, size):
+                if constant is not None:
+                    combination = (constant,) + combination
+                area = sum(self.areas[element] for element in combination)
+                if len(combination) <= maxSize and minimalArea <= area <= maximalArea:
+                    combinations.append(combination)
+        return combinations
+
+    def test_without_range(self):
+        """Test the order and the size cap without pruning."""
+        elements = self.elements[:11]
+        combinations = list(AreaCombinations(elements, self.areas))
+        self.assertEqual(combinations, self.expected(elements, 0, float('inf')))
+        self.assertEqual(max(len(combination) for combination in combinations), 10)
+
+    def test_range(self):
+        """Test the pruning keeps every combination inside the range, in the same order."""
+        for minimalArea, maximalArea in ((12.0, 20.0), (0.0, 4.0), (50.0, 55.0), (200.0, 300.0)):
+            combinations = list(AreaCombinations(self.elements, self.areas, minimalArea, maximalArea))
+            self.assertEqual(combinations, self.expected(self.elements, minimalArea, maximalArea))
+
+    def test_constant(self):
+        """Test the constant is in every combination and counts into the size and the area."""
+        elements = self.elements[:10]
+        combinations = list(AreaCombinations(elements, self.areas, 10.0, 25.0, 'c'))
+        self.assertEqual(combinations, self.expected(elements, 10.0, 25.0, 'c'))
+        self.assertEqual(list(AreaCombinations([], self.areas, constant='c')), [])
+
+    def test_sizes(self):
+        """Test only the requested sizes are enumerated, and the enumeration can be repeated."""
+        combinations = AreaCombinations(self.elements[:5], self.areas, sizes=[2])
+        self.assertEqual(list(combinations), list(itertools.combinations(self.elements[:5], 2)))
+        self.assertEqual(len(list(combinations)), 10)
+
+    def test_ranks(self):
+        """Test the positions are the positions in the enumeration without pruning."""
+        full = list(AreaCombinations(self.elements, self.areas))
+        self.assertEqual(len(full), AreaCombinations(self.elements, self.areas).count())
+        combinations = AreaCombinations(self.elements, self.areas, 12.0, 20.0)
+        for rank, combination in combinations.ranked():
+            self.assertEqual(full[rank], combination)
+        self.assertEqual(AreaCombinations(self.elements[:6], self.areas, sizes=[3]).count(), 20)
+
+    def test_simply_cap(self):
+        """Test the Simplfy cap counts the pruned combinations, as the cap of the former full enumeration."""
+        for limit in (0, 1, 100, 1500, 4000):
+            expected = [combination for combination in itertools.islice(self.expected(self.elements, 0, float('inf')), limit)
+                        if 12.0 <= sum(self.areas[element] for element in combination) <= 20.0]
+            combinations = AreaCombinations(self.elements, self.areas, 12.0, 20.0)
+            self.assertEqual(list(combinations.limited(limit)), expected)
+
+
+class AreaMatchingTest(unittest.TestCase):
+    """Test the area based pairing of the combinations."""
+
+    def test_match(self):
+        """Test the matched pairs are the pairs inside the net area range, in the original orders."""
+        random.seed(7)
+        targets = [('t%d' % index,) for index in range(30)]
+        targetAreas = [random.uniform(0, 20) for target in targets]
+        holders = [('h%d' % index,) for index in range(8)]
+        holderAreas = [random.uniform(0, 20) for holder in holders]
+        expected = []
+        for target, targetArea in zip(targets, targetAreas):
+            matched = [holder for holder, holderArea in zip(holders, holderAreas) if -2.0 <= holderArea - targetArea <= 3.0]
+            if matched:
+                expected.append((target, matched))
+        areas = dict(zip(targets, targetAreas))
+        matching = AreaMatching(holders, holderAreas)
+        self.assertEqual(list(matching.match(targets, areas.get, -2.0, 3.0)), expected)
+        self.assertEqual(list(matching.match(targets, areas.get, 1.0, -1.0)), [])
+
+    def test_one_pass(self):
+        """Test the targets are read once, lazily, and only the matched ones are given back."""
+        read = []
+
+        def targets():
+            for index in range(1000):
+                read.append(index)
+                yield ('t%d' % index,)
+        matches = AreaMatching([('h0',), ('h1',)], [3.0, 1.0]).match(targets(), lambda target: int(target[0][1:]) % 10, 0.0, 0.5)
+        self.assertEqual(next(matches), (('t1',), [('h1',)]))
+        self.assertEqual(read, [0, 1])
+        matches = list(matches)
+        self.assertEqual(len(read), 1000)
+        self.assertEqual(len(matches), 199)
+        self.assertEqual(matches[:2], [(('t3',), [('h0',)]), (('t11',), [('h1',)])])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(AreaCombinationsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
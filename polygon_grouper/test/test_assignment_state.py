@@ -0,0 +1,69 @@
+# coding=utf-8
+"""Assignment state test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import unittest
+
+from assignment_state import AssignmentBuffer
+
+
+class RecordingProvider():
+    """Data provider, which records the bulk writes."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.writes = []
+
+    def fieldNameIndex(self, field):
+        return self.fields.index(field)
+
+    def changeAttributeValues(self, attributeMap):
+        self.writes.append(attributeMap)
+        return True
+
+
+class RecordingLayer():
+    """Layer with a recording data provider."""
+
+    def __init__(self, fields):
+        self.provider = RecordingProvider(fields)
+
+    def dataProvider(self):
+        return self.provider
+
+    def triggerRepaint(self):
+        pass
+
+
+class AssignmentBufferTest(unittest.TestCase):
+    """Test the buffered attribute changes."""
+
+    def test_flush(self):
+        """Test the changes are written with one call, by feature id."""
+        layer = RecordingLayer(['temp_id', '1_id', '1_holder'])
+        buffer = AssignmentBuffer(['a', 'b'], [10, 11])
+        buffer.setValue('a', '1_holder', 'Y')
+        buffer.setValue('a', '1_id', 'b')
+        buffer.setValue('b', '1_holder', 'X')
+        buffer.setValue('a', '1_holder', 'Z')
+        self.assertEqual(len(buffer), 2)
+        self.assertTrue(buffer.flush(layer))
+        self.assertEqual(layer.provider.writes, [{10: {2: 'Z', 1: 'b'}, 11: {2: 'X'}}])
+        buffer.flush(layer)
+        self.assertEqual(len(layer.provider.writes), 1)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(AssignmentBufferTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
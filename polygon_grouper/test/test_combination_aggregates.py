@@ -0,0 +1,79 @@
+# coding=utf-8
+"""Combination aggregates test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import itertools
+import random
+import unittest
+
+from combination_aggregates import CombinationAggregates
+
+
+class CombinationAggregatesTest(unittest.TestCase):
+    """Test the precalculated combination totals."""
+
+    def setUp(self):
+        """Runs before each test."""
+        random.seed(7)
+        self.holdings = [f'h{index}' for index in range(5)]
+        self.areas = {holding: random.uniform(0.5, 10) for holding in self.holdings}
+        self.distances = {seed: {holding: random.uniform(0, 100) for holding in self.holdings} for seed in ['s1', 's2']}
+        self.calls = []
+
+    def distance(self, seed, holding):
+        self.calls.append((seed, holding))
+        return self.distances[seed][holding]
+
+    def test_totals_equal_direct_calculation(self):
+        """Every total is equal to the one by one calculation."""
+        aggregates = CombinationAggregates(self.holdings, self.areas, self.distance)
+        for size in range(1, len(self.holdings) + 1):
+            for combination in itertools.combinations(self.holdings, size):
+                area = 0
+                sumDistance = 0
+                maxDistance = 0
+                composite = 0
+                for holding in combination:
+                    distance = self.distances['s1'][holding]
+                    area += self.areas[holding]
+                    sumDistance += distance
+                    if distance > maxDistance:
+                        maxDistance = distance
+                    composite += self.areas[holding] * distance
+                self.assertEqual(aggregates.area(combination), area)
+                self.assertEqual(aggregates.distanceSum(combination, 's1'), sumDistance)
+                self.assertEqual(aggregates.maxDistance(combination, 's1'), maxDistance)
+                self.assertEqual(aggregates.avgDistance(combination, 's1'), sumDistance / size)
+                self.assertEqual(aggregates.compositeNumber(combination, 's1'), composite)
+
+    def test_seed_tables_are_cached(self):
+        """The distances of a seed are read once."""
+        aggregates = CombinationAggregates(self.holdings, self.areas, self.distance)
+        aggregates.maxDistance(('h0', 'h1'), 's1')
+        aggregates.avgDistance(('h2',), 's1')
+        self.assertEqual(len(self.calls), len(self.holdings))
+        aggregates.distanceSum(('h2',), 's2')
+        self.assertEqual(len(self.calls), 2 * len(self.holdings))
+        self.assertEqual(aggregates.distanceSum(('h2',), 's2'), self.distances['s2']['h2'])
+
+    def test_unknown_holding(self):
+        """A holding outside of the list raises KeyError."""
+        aggregates = CombinationAggregates(self.holdings, self.areas, self.distance)
+        with self.assertRaises(KeyError):
+            aggregates.area(('h0', 'x'))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(CombinationAggregatesTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,146 @@
+# coding=utf-8
+"""Swap evaluator test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import random
+import unittest
+
+from area_combinations import AreaCombinations
+from combination_subproces import SwapEvaluator, SwapPool
+from distance_matrix import DistanceMatrix
+from holder_registry import HolderRegistry
+
+
+class Clock():
+    """Manually moved clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TickingAreas(dict):
+    """Holding areas, every read moves the clock, as if the enumeration took time."""
+
+    def __init__(self, areas, clock):
+        super().__init__(areas)
+        self.clock = clock
+
+    def __getitem__(self, holdingId):
+        self.clock.now += 0.001
+        return super().__getitem__(holdingId)
+
+
+class SwapEvaluatorTest(unittest.TestCase):
+    """Test the closer swap evaluation and the worker pool."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.holdingIds = ['a0', 'a1', 'b0', 'b1']
+        coordinates = [(0, 0), (100, 0), (100, 10), (1, 0)]
+        self.areas = {'a0': 5.0, 'a1': 1.0, 'b0': 5.0, 'b1': 1.0}
+        self.matrix = DistanceMatrix(self.holdingIds, coordinates)
+        registry = HolderRegistry(['A', 'B'])
+        registry.setBounds(registry.column({'A': 6.0, 'B': 6.0}), 5)
+        self.evaluator = SwapEvaluator(self.areas, self.matrix, registry)
+        self.holderSide = {'holder': 'A', 'seed': 'a0', 'holdings': ['a1'], 'totalArea': 6.0,
+                           'totalDistance': self.matrix['a0']['a1'], 'holdingNumber': 2}
+        self.targetSide = {'holder': 'B', 'seed': 'b0', 'holdings': ['b1'], 'totalArea': 6.0,
+                           'totalDistance': self.matrix['b0']['b1'], 'holdingNumber': 2}
+
+    def test_swap(self):
+        """Both holdings get closer to the seed of their new holder."""
+        result = self.evaluator.evaluate(self.holderSide, self.targetSide)
+        self.assertEqual(result, (self.areas['a1'] * self.matrix['a0']['a1'], ('a1',), ('b1',), 6.0, 6.0))
+
+    def test_target_without_seed(self):
+        """A target without seed is only checked on the holder's side."""
+        self.targetSide['seed'] = None
+        self.targetSide['totalDistance'] = None
+        result = self.evaluator.evaluate(self.holderSide, self.targetSide)
+        self.assertEqual(result[1:3], (('a1',), ('b1',)))
+
+    def test_area_threshold(self):
+        """No swap, which moves the total areas outside of the tolerance."""
+        self.areas['b1'] = 2.0
+        self.assertIsNone(self.evaluator.evaluate(self.holderSide, self.targetSide))
+
+    def test_deadline(self):
+        """No combination is checked after the deadline."""
+        self.holderSide['deadline'] = 0.0
+        self.assertIsNone(self.evaluator.evaluate(self.holderSide, self.targetSide))
+
+    def test_slow_enumeration(self):
+        """A swap is given back, even if the whole target enumeration would take longer than the deadline."""
+        clock = Clock()
+        targetHoldings = [f'b{index}' for index in range(1, 13)]
+        holdingIds = ['a0', 'a1', 'b0'] + targetHoldings
+        coordinates = [(0, 0), (100, 0), (100, 10)] + [(1, index) for index in range(1, 13)]
+        matrix = DistanceMatrix(holdingIds, coordinates)
+        registry = HolderRegistry(['A', 'B'])
+        # Wide bounds, so every target combination is enumerated and matched
+        registry.setBounds(registry.column({'A': 2.0, 'B': 13.0}), 1000)
+        areas = TickingAreas({holdingId: 1.0 for holdingId in holdingIds}, clock)
+        evaluator = SwapEvaluator(areas, matrix, registry, clock=clock)
+        holderSide = {'holder': 'A', 'seed': 'a0', 'holdings': ['a1'], 'totalArea': 2.0,
+                      'totalDistance': matrix['a0']['a1'], 'holdingNumber': 2, 'deadline': clock.now + 10.0}
+        targetSide = {'holder': 'B', 'seed': 'b0', 'holdings': targetHoldings, 'totalArea': 13.0,
+                      'totalDistance': sum(matrix['b0'][holding] for holding in targetHoldings), 'holdingNumber': 13}
+        start = clock.now
+        for combination in AreaCombinations(targetHoldings, areas, maxSize=10):
+            evaluator.combinationArea(combination)
+        self.assertGreater(clock.now - start, 10.0)
+        clock.now = start
+        result = evaluator.evaluate(holderSide, targetSide)
+        self.assertEqual(result[1:3], (('a1',), ('b1',)))
+        self.assertLess(clock.now, holderSide['deadline'])
+
+    def test_pool(self):
+        """The worker processes give the same results as the main process."""
+        random.seed(3)
+        holdingIds = [f'h{index}' for index in range(40)]
+        coordinates = [(random.uniform(0, 100), random.uniform(0, 100)) for holdingId in holdingIds]
+        areas = {holdingId: float(random.randint(1, 4)) for holdingId in holdingIds}
+        matrix = DistanceMatrix(holdingIds, coordinates)
+        holders = {holder: holdingIds[turn::4] for turn, holder in enumerate(['A', 'B', 'C', 'D'])}
+        totalAreas = {holder: sum(areas[holding] for holding in holdings) for holder, holdings in holders.items()}
+        registry = HolderRegistry(list(holders))
+        registry.setBounds(registry.column(totalAreas), 20)
+        evaluator = SwapEvaluator(areas, matrix, registry)
+        tasks = []
+        for holder, holdings in holders.items():
+            seed = holdings[0]
+            holderSide = {'holder': holder, 'seed': seed, 'holdings': holdings[1:6], 'totalArea': totalAreas[holder],
+                          'totalDistance': sum(matrix[seed][holding] for holding in holdings), 'holdingNumber': len(holdings)}
+            for targetHolder, targetHoldings in holders.items():
+                if targetHolder != holder:
+                    targetSeed = targetHoldings[0]
+                    targetSide = {'holder': targetHolder, 'seed': targetSeed, 'holdings': targetHoldings[1:], 'totalArea': totalAreas[targetHolder],
+                                  'totalDistance': sum(matrix[targetSeed][holding] for holding in targetHoldings), 'holdingNumber': len(targetHoldings)}
+                    tasks.append((holderSide, targetSide))
+        expected = SwapPool(evaluator, 1).evaluate(tasks)
+        self.assertTrue(any(result is not None for result in expected))
+        pool = SwapPool(evaluator, 2)
+        try:
+            self.assertEqual(pool.evaluate(tasks), expected)
+        finally:
+            pool.close()
+        self.assertIsNone(pool.pool)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SwapEvaluatorTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,128 @@
+# coding=utf-8
+"""Distance matrix test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import pickle
+import unittest
+
+from distance_matrix import DistanceMatrix, RadiusMatrix
+
+
+class DistanceMatrixTest(unittest.TestCase):
+    """Test the array backed distance matrix."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.matrix = DistanceMatrix(['a', 'b', 'c'], [(0, 0), (3, 4), (6, 8)])
+
+    def test_lookup(self):
+        """Test the nested lookup of the distances."""
+        self.assertAlmostEqual(self.matrix['a']['b'], 5.0)
+        self.assertAlmostEqual(self.matrix['c']['a'], 10.0)
+        self.assertAlmostEqual(self.matrix['b']['b'], 0.0)
+
+    def test_row(self):
+        """Test the row view behaves like a dictionary."""
+        row = self.matrix['a']
+        self.assertEqual(list(row.keys()), ['a', 'b', 'c'])
+        self.assertIn('c', row)
+        self.assertEqual(len(row), 3)
+
+    def test_seed_rows(self):
+        """Test only the requested rows are materialised."""
+        self.assertEqual(len(self.matrix.rows), 0)
+        self.matrix.addRows(['b'])
+        self.assertEqual(list(self.matrix.rows.keys()), ['b'])
+        self.assertAlmostEqual(self.matrix['c']['b'], 5.0)
+        self.assertEqual(set(self.matrix.rows.keys()), {'b', 'c'})
+
+    def test_missing(self):
+        """Test the missing pairs raise KeyError and can be set."""
+        row = self.matrix['a']
+        with self.assertRaises(KeyError):
+            row['d']
+        row['d'] = 12.5
+        self.assertEqual(self.matrix['a']['d'], 12.5)
+
+    def test_pickle(self):
+        """Test only the centroids are pickled, the rows are calculated again."""
+        self.matrix.addRows(['a', 'b'])
+        copied = pickle.loads(pickle.dumps(self.matrix))
+        self.assertEqual(len(copied.rows), 0)
+        self.assertEqual(copied['a']['c'], self.matrix['a']['c'])
+        self.assertEqual(len(self.matrix.rows), 2)
+
+    def test_precision(self):
+        """Test the distances keep the precision of projected coordinates."""
+        matrix = DistanceMatrix(['a', 'b'], [(500000.0, 6000000.0), (500100.001, 6000000.0)])
+        self.assertAlmostEqual(matrix['a']['b'], 100.001, places=6)
+        self.assertEqual(dict(matrix['a'].items()), {'a': 0.0, 'b': matrix['a']['b']})
+
+
+class RadiusMatrixTest(unittest.TestCase):
+    """Test the radius limited sparse distance matrix."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.matrix = RadiusMatrix(['a', 'b', 'c', 'd'], [(0, 0), (3, 4), (6, 8), (1, 0)], 5)
+
+    def test_threshold(self):
+        """Test only the pairs inside the threshold are kept."""
+        self.assertEqual(set(self.matrix['a'].keys()), {'a', 'b', 'd'})
+        self.assertEqual(set(self.matrix['c'].keys()), {'b', 'c'})
+
+    def test_sorted(self):
+        """Test the rows are sorted by distance."""
+        self.assertEqual(list(self.matrix['a'].keys()), ['a', 'd', 'b'])
+        distances = list(self.matrix['a'].values())
+        self.assertEqual(distances, sorted(distances))
+
+    def test_cached(self):
+        """Test the cached neighbourhoods are reused and the ties follow the actual holding ids."""
+        matrix = RadiusMatrix(['a', 'b', 'c', 'e'], [(0, 0), (3, 4), (10, 10), (-1, 0)], 5)
+        neighbourhoods = (matrix.indptr, matrix.indices, matrix.distances)
+        cachedMatrix = RadiusMatrix(['a', 'b', 'c', 'd'], matrix.coordinates, 5, neighbourhoods=neighbourhoods)
+        self.assertIs(cachedMatrix.distances, matrix.distances)
+        tiedMatrix = RadiusMatrix(['z', 'b', 'c', 'd', 'a'], [(0, 0), (3, 4), (6, 8), (1, 0), (-1, 0)], 5)
+        neighbourhoods = (tiedMatrix.indptr, tiedMatrix.indices, tiedMatrix.distances)
+        cachedMatrix = RadiusMatrix(['a', 'b', 'c', 'd', 'z'], tiedMatrix.coordinates, 5, neighbourhoods=neighbourhoods)
+        self.assertEqual(list(tiedMatrix['z'].keys()), ['z', 'a', 'd', 'b'])
+        self.assertEqual(list(cachedMatrix['a'].keys()), ['a', 'd', 'z', 'b'])
+
+    def test_integer_ties(self):
+        """Test the equal distances are ordered by the integer holding ids, not by their text."""
+        matrix = RadiusMatrix([9, 10, 2], [(0, 0), (1, 0), (-1, 0)], 5)
+        self.assertEqual(list(matrix[9].keys()), [9, 2, 10])
+
+    def test_row_view(self):
+        """Test the row views are cached."""
+        row = self.matrix['a']
+        self.assertIs(self.matrix['a'], row)
+        self.assertEqual(dict(row.items()), {'a': 0.0, 'd': 1.0, 'b': 5.0})
+        self.assertIn('d', row)
+        self.assertEqual(len(row), 3)
+
+    def test_threshold_edge(self):
+        """Test the pairs just inside and just outside of the threshold at projected coordinate scale."""
+        coordinates = [(500000.0, 6000000.0), (500100.0, 6000000.0), (500000.0, 6000100.001)]
+        matrix = RadiusMatrix(['a', 'b', 'c'], coordinates, 100.0005)
+        self.assertEqual(list(matrix['a'].keys()), ['a', 'b'])
+        matrix = RadiusMatrix(['a', 'b', 'c'], coordinates, 100.0015)
+        self.assertEqual(list(matrix['a'].keys()), ['a', 'b', 'c'])
+        self.assertAlmostEqual(matrix['a']['c'], 100.001, places=6)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite([unittest.makeSuite(DistanceMatrixTest), unittest.makeSuite(RadiusMatrixTest)])
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,88 @@
+# coding=utf-8
+"""Feature index test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import unittest
+
+from feature_index import FeatureIndex
+
+
+class NamedField():
+    """Field with a name."""
+
+    def __init__(self, name):
+        self.fieldName = name
+
+    def name(self):
+        return self.fieldName
+
+
+class StoredFeature():
+    """Feature with an id, attributes and a geometry."""
+
+    def __init__(self, featureId, attributes, geometry):
+        self.featureIdValue = featureId
+        self.attributeValues = attributes
+        self.geometryValue = geometry
+
+    def id(self):
+        return self.featureIdValue
+
+    def attributes(self):
+        return list(self.attributeValues)
+
+    def geometry(self):
+        return self.geometryValue
+
+
+class StoredLayer():
+    """Layer with stored features."""
+
+    def __init__(self, fieldNames, features):
+        self.fieldList = [NamedField(fieldName) for fieldName in fieldNames]
+        self.features = features
+
+    def fields(self):
+        return self.fieldList
+
+    def getFeatures(self):
+        return iter(self.features)
+
+
+class FeatureIndexTest(unittest.TestCase):
+    """Test the holding id index."""
+
+    def setUp(self):
+        """Runs before each test."""
+        layer = StoredLayer(['owner', 'temp_id'], [StoredFeature(7, [1, 'a'], 'A'), StoredFeature(9, [2, 'b'], 'B')])
+        self.index = FeatureIndex(layer, 'temp_id')
+
+    def test_lookup(self):
+        """Test the lookups by holding id."""
+        self.assertEqual(self.index.featureId('b'), 9)
+        self.assertEqual(self.index.geometry('a'), 'A')
+        self.assertEqual(self.index['b'], 'B')
+        self.assertEqual(self.index.attribute('b', 'owner'), 2)
+        self.assertIn('a', self.index)
+        self.assertNotIn('c', self.index)
+
+    def test_column(self):
+        """Test the values of a field in the layer order."""
+        self.assertEqual(self.index.column('owner'), [1, 2])
+        self.assertEqual(self.index.holdingIds, ['a', 'b'])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(FeatureIndexTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,62 @@
+# coding=utf-8
+"""Geometry cache test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import unittest
+
+from geometry_cache import PairDistanceCache
+
+
+class PointGeometry():
+    """Minimal geometry with a distance method."""
+
+    def __init__(self, x):
+        self.x = x
+        self.calls = 0
+
+    def distance(self, other):
+        self.calls += 1
+        return abs(self.x - other.x)
+
+
+class PairDistanceCacheTest(unittest.TestCase):
+    """Test the bounded pair distance cache."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.geometries = {'a': PointGeometry(0), 'b': PointGeometry(3), 'c': PointGeometry(10)}
+        self.cache = PairDistanceCache(self.geometries, maxSize=2)
+
+    def test_hits(self):
+        """Test a pair is calculated only once, in both directions."""
+        self.assertEqual(self.cache.distance('a', 'b'), 3)
+        self.assertEqual(self.cache.distance('b', 'a'), 3)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+        self.assertEqual(self.geometries['a'].calls + self.geometries['b'].calls, 1)
+
+    def test_bounded(self):
+        """Test the least recently used pair is dropped."""
+        self.cache.distance('a', 'b')
+        self.cache.distance('a', 'c')
+        self.cache.distance('a', 'b')
+        self.cache.distance('b', 'c')
+        self.assertEqual(len(self.cache.distances), 2)
+        self.assertNotIn(('a', 'c'), self.cache.distances)
+        self.assertIn(('a', 'b'), self.cache.distances)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(PairDistanceCacheTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
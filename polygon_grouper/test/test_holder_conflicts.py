@@ -0,0 +1,55 @@
+# coding=utf-8
+"""Holder conflict graph test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import random
+import unittest
+
+from holder_conflicts import HolderConflicts
+
+
+class HolderConflictsTest(unittest.TestCase):
+    """Test the colouring of the holders."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.involvement = {'A': {'A', 'B'}, 'B': {'B', 'C'}, 'C': {'C'}, 'D': {'D', 'E'}, 'E': set()}
+        self.conflicts = HolderConflicts(self.involvement)
+
+    def test_neighbours(self):
+        """Holders conflict, if their involved holders overlap."""
+        self.assertEqual(self.conflicts.neighbours('A'), {'B'})
+        self.assertEqual(self.conflicts.neighbours('B'), {'A', 'C'})
+        self.assertEqual(self.conflicts.neighbours('E'), set())
+
+    def test_colour_classes(self):
+        """The classes keep the order and have no conflict inside."""
+        self.assertEqual(self.conflicts.colourClasses(['A', 'B', 'C', 'D', 'E']), [['A', 'C', 'D', 'E'], ['B']])
+        random.seed(7)
+        involvement = {f'h{index}': {f'h{index}'} | {f'h{random.randrange(60)}' for turn in range(3)} for index in range(60)}
+        conflicts = HolderConflicts(involvement)
+        order = sorted(involvement)
+        classes = conflicts.colourClasses(order)
+        self.assertEqual(sorted(holder for colourClass in classes for holder in colourClass), order)
+        for colourClass in classes:
+            self.assertEqual(conflicts.split(colourClass), (colourClass, []))
+
+    def test_split(self):
+        """The holders in conflict with an earlier one are deferred."""
+        self.assertEqual(self.conflicts.split(['B', 'A', 'C', 'E']), (['B', 'E'], ['A', 'C']))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(HolderConflictsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
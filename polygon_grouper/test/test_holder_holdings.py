@@ -0,0 +1,57 @@
+# coding=utf-8
+"""Holder holdings test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import unittest
+
+from holder_holdings import HolderHoldings
+
+
+class HolderHoldingsTest(unittest.TestCase):
+    """Test the copy-on-write holdings of the holders."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.holdings = HolderHoldings({'X': ['a', 'b'], 'Y': ['c'], 'Z': ['d']})
+
+    def test_move(self):
+        """Test a swap replaces the lists and keeps the old ones intact."""
+        oldHoldings = self.holdings['X']
+        self.holdings.move('b', 'X', 'Y')
+        self.assertEqual(self.holdings['X'], ['a'])
+        self.assertEqual(self.holdings['Y'], ['c', 'b'])
+        self.assertEqual(oldHoldings, ['a', 'b'])
+        with self.assertRaises(ValueError):
+            self.holdings.move('b', 'X', 'Y')
+
+    def test_snapshot(self):
+        """Test the snapshot gives back the starting state during the swaps."""
+        self.holdings.move('d', 'Z', 'X')
+        snapshot = self.holdings.snapshot()
+        seen = {}
+        for holder, holdings in snapshot.items():
+            seen[holder] = holdings
+            if holder == 'X':
+                self.holdings.move('c', 'Y', 'Z')
+                self.holdings.move('a', 'X', 'Y')
+        self.assertEqual(seen, {'X': ['a', 'b', 'd'], 'Y': ['c'], 'Z': []})
+        self.assertEqual(snapshot['Y'], ['c'])
+        self.assertEqual(self.holdings['Y'], ['a'])
+        self.holdings.snapshot()
+        self.assertEqual(self.holdings.snapshot()['Y'], ['a'])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(HolderHoldingsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,78 @@
+# coding=utf-8
+"""Holder registry test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import copy
+import unittest
+
+import numpy
+
+from holder_registry import HolderRegistry
+
+
+class HolderRegistryTest(unittest.TestCase):
+    """Test the dense holder index."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.registry = HolderRegistry([12, 'b', 3.5])
+
+    def test_codes(self):
+        """The holders get dense codes, number holders are found by their text too."""
+        self.assertEqual(self.registry.code(12), 0)
+        self.assertEqual(self.registry.code('12'), 0)
+        self.assertEqual(self.registry.code('b'), 1)
+        self.assertEqual(self.registry.value(2), 3.5)
+        with self.assertRaises(KeyError):
+            self.registry.code('x')
+
+    def test_column(self):
+        """The column works like a dictionary of the holders with value."""
+        column = self.registry.column({12: 4, 'b': 6}, numpy.int32)
+        self.assertEqual(column[12], 4)
+        self.assertIsInstance(column['12'], int)
+        self.assertNotIn(3.5, column)
+        with self.assertRaises(KeyError):
+            column[3.5]
+        column[3.5] = 0
+        self.assertEqual(column.items(), [(12, 4), ('b', 6), (3.5, 0)])
+
+    def test_copy(self):
+        """A deep copy does not change the original column."""
+        column = self.registry.column({12: 1.5, 'b': 2.0, 3.5: 3.0})
+        localColumn = copy.deepcopy(column)
+        localColumn['b'] = 10.0
+        self.assertEqual(column['b'], 2.0)
+        self.assertEqual(localColumn['b'], 10.0)
+
+    def test_bounds(self):
+        """The area range is the tolerance around the starting total area."""
+        column = self.registry.column({12: 100.0, 'b': 50.0, 3.5: 0.0})
+        self.registry.setBounds(column, 10)
+        self.assertTrue(self.registry.inBounds(12, 110.0))
+        self.assertTrue(self.registry.inBounds('12', 90.0))
+        self.assertFalse(self.registry.inBounds(12, 110.5))
+        self.assertFalse(self.registry.inBounds('b', 44.0))
+
+    def test_transfer_window(self):
+        """The net transfer keeps both holders inside their range."""
+        column = self.registry.column({12: 100.0, 'b': 50.0, 3.5: 0.0})
+        self.registry.setBounds(column, 10)
+        self.assertEqual(self.registry.transferWindow(12, 100.0, 'b', 50.0), (-5.0, 5.0))
+        self.assertEqual(self.registry.transferWindow(12, 105.0, 'b', 45.0), (0.0, 10.0))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(HolderRegistryTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
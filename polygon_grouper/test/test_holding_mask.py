@@ -0,0 +1,63 @@
+# coding=utf-8
+"""Holding mask test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import copy
+import unittest
+
+from holding_mask import HoldingMask
+
+
+class HoldingMaskTest(unittest.TestCase):
+    """Test the Boolean mask sets of holdings."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.holdingIds = ['a', 'b', 'c', 'd', 'e']
+        self.mask = HoldingMask(self.holdingIds, ['b', 'd', 'x'])
+
+    def test_membership(self):
+        """Test adding, removing and testing holdings."""
+        self.assertIn('b', self.mask)
+        self.assertNotIn('x', self.mask)
+        self.assertEqual(len(self.mask), 2)
+        self.mask.add('e')
+        self.mask.remove('b')
+        self.assertEqual(list(self.mask), ['d', 'e'])
+        with self.assertRaises(ValueError):
+            self.mask.remove('b')
+        self.mask.discard('b')
+        self.mask.discard('x')
+        self.assertEqual(list(self.mask), ['d', 'e'])
+
+    def test_filter(self):
+        """Test a list of holdings is filtered in its own order."""
+        self.assertEqual(self.mask.filter(['d', 'x', 'a', 'b']), ['d', 'b'])
+        self.assertEqual(self.mask.exclude(['d', 'x', 'a', 'b']), ['x', 'a'])
+        self.assertEqual(self.mask.filter({'b': 1.0, 'c': 2.0}), ['b'])
+        self.assertEqual(self.mask.filter([]), [])
+
+    def test_set_operations(self):
+        """Test the new sets do not change the original one."""
+        notChangables = HoldingMask(self.holdingIds, ['d'], self.mask.index)
+        local = self.mask.intersection(['a', 'b', 'd']).difference(notChangables)
+        self.assertEqual(list(local), ['b'])
+        copied = copy.deepcopy(self.mask)
+        copied.remove('d')
+        self.assertIn('d', self.mask)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(HoldingMaskTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,70 @@
+# coding=utf-8
+"""Matrix cache test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import unittest
+import shutil
+import tempfile
+
+import numpy
+
+from matrix_cache import MatrixCache
+
+
+class MatrixCacheTest(unittest.TestCase):
+    """Test the on disk distance cache."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.directory)
+
+    def createCache(self, geometries, crs='EPSG:23700'):
+        cache = MatrixCache(self.directory, crs)
+        for featureId, wkb in enumerate(geometries):
+            cache.addFeature(featureId, wkb)
+        return cache
+
+    def test_key(self):
+        """Test the key depends on the geometries and the CRS."""
+        key = self.createCache([b'a', b'b']).getKey()
+        self.assertEqual(key, self.createCache([b'a', b'b']).getKey())
+        self.assertNotEqual(key, self.createCache([b'a', b'c']).getKey())
+        self.assertNotEqual(key, self.createCache([b'ab']).getKey())
+        self.assertNotEqual(key, self.createCache([b'a', b'b'], 'EPSG:4326').getKey())
+
+    def test_roundtrip(self):
+        """Test the saved arrays are memory-mapped back by another run."""
+        coordinates = numpy.array([[0, 0], [3, 4]], dtype=numpy.float64)
+        self.assertIsNone(self.createCache([b'a', b'b']).load('centroids', ['coordinates']))
+        self.assertTrue(self.createCache([b'a', b'b']).save('centroids', {'coordinates': coordinates}))
+        cached = self.createCache([b'a', b'b']).load('centroids', ['coordinates'])
+        self.assertIsInstance(cached['coordinates'], numpy.memmap)
+        numpy.testing.assert_array_equal(cached['coordinates'], coordinates)
+        self.assertIsNone(self.createCache([b'a', b'c']).load('centroids', ['coordinates']))
+
+    def test_existing(self):
+        """Test a second writer of the same entry keeps the first copy."""
+        cache = self.createCache([b'a'])
+        self.assertTrue(cache.save('radius_10', {'indptr': numpy.array([0, 1])}))
+        self.assertTrue(cache.save('radius_10', {'indptr': numpy.array([0, 1])}))
+        numpy.testing.assert_array_equal(cache.load('radius_10', ['indptr'])['indptr'], [0, 1])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(MatrixCacheTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
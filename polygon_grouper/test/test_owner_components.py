@@ -0,0 +1,100 @@
+# coding=utf-8
+"""Owner components test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import unittest
+
+from adjacency_graph import AdjacencyGraph
+from owner_components import OwnerComponents, mergeGroups
+from holder_registry import HolderRegistry
+from holding_mask import HoldingMask
+
+
+class OwnerComponentsTest(unittest.TestCase):
+    """Test the union-find blocks of the holders."""
+
+    def setUp(self):
+        """Runs before each test."""
+        # Five holdings in a row: a - b - c - d - e
+        graph = AdjacencyGraph.fromPairs(range(5), [0, 1, 2, 3], [1, 2, 3, 4])
+        holdings = {'X': ['a', 'b', 'd'], 'Y': ['c', 'e']}
+        self.components = OwnerComponents(graph, ['a', 'b', 'c', 'd', 'e'], holdings)
+        self.seeds = {'X': ['a'], 'Y': ['e']}
+
+    def test_blocks(self):
+        """Test the blocks of the starting state."""
+        self.assertTrue(self.components.connected('a', 'b'))
+        self.assertFalse(self.components.connected('a', 'd'))
+        self.assertEqual(self.components.attachedHoldings(self.seeds), ['b'])
+        self.assertEqual(self.components.attachedHoldings(self.seeds), [])
+        self.assertEqual(self.components.blocks(), [[0, 1], [2], [3], [4]])
+
+    def test_move(self):
+        """Test a swap joins and splits the blocks."""
+        self.components.attachedHoldings(self.seeds)
+        self.components.move([('c', 'X'), ('b', 'Y')])
+        self.assertFalse(self.components.connected('a', 'c'))
+        self.assertTrue(self.components.connected('c', 'd'))
+        self.components.move([('b', 'X'), ('c', 'Y')])
+        self.components.move([('c', 'X'), ('e', 'X')])
+        self.assertTrue(self.components.connected('a', 'e'))
+        self.assertEqual(self.components.attachedHoldings(self.seeds), ['b', 'c', 'd', 'e'])
+        self.assertEqual(self.components.block('c'), ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(self.components.holder('e'), 'X')
+
+    def test_holders_of(self):
+        """Test the target holders are found from the owner array and follow the swaps."""
+        registry = HolderRegistry(['Y', 'X'])
+        totalAreas = registry.column({'X': 30.0, 'Y': 10.0})
+        graph = AdjacencyGraph.fromPairs(range(5), [0, 1, 2, 3], [1, 2, 3, 4])
+        components = OwnerComponents(graph, ['a', 'b', 'c', 'd', 'e'], {'X': ['a', 'b', 'd'], 'Y': ['c', 'e']}, registry)
+        self.assertEqual(components.holdersOf(['e', 'a', 'c', 'b']), ['Y', 'X'])
+        self.assertEqual(components.holdersOf(['e', 'a'], ['Y']), ['X'])
+        self.assertEqual(components.holdersOf(['e', 'a'], (), totalAreas, 20.0), ['X'])
+        components.move([('e', 'X')])
+        self.assertEqual(components.holdersOf(['e']), ['X'])
+        components.move([('e', None)])
+        self.assertEqual(components.holdersOf(['e']), [])
+
+    def test_changables_filter(self):
+        """Test the end of turn filter: the holdings attached to their seed block are not changable any more (the former layer based filter removed none)."""
+        holdingIds = ['a', 'b', 'c', 'd', 'e']
+        changables = HoldingMask(holdingIds, ['b', 'c', 'd'])
+        for holdingId in self.components.attachedHoldings(self.seeds):
+            changables.discard(holdingId)
+        self.assertEqual(list(changables), ['c', 'd'])
+        # After a swap only the attached holdings of the changed holders leave the changables
+        self.components.move([('c', 'X'), ('d', 'Y')])
+        for holdingId in self.components.attachedHoldings(self.seeds):
+            changables.discard(holdingId)
+        self.assertEqual(list(changables), [])
+
+    def test_merge_groups_unheld(self):
+        """Test the unheld parcels of the string id mode (NULL holding ids) are kept one by one, and never merged."""
+        # Feature ids of six parcels in a row, the third and the fourth have no holder, so no holding id either
+        featureIds = [10, 11, 12, 13, 14, 15]
+        holdingIds = ['k1', 'k2', None, None, 'k5', 'k6']
+        graph = AdjacencyGraph.fromPairs(featureIds, [0, 1, 2, 3, 4], [1, 2, 3, 4, 5])
+        holders = dict(zip(featureIds, ['X', 'X', None, None, 'X', 'Y']))
+        blocks, unheld = mergeGroups(graph, featureIds, holders)
+        self.assertEqual(blocks, [[10, 11], [14], [15]])
+        self.assertEqual(unheld, [12, 13])
+        self.assertEqual(sorted([featureId for block in blocks for featureId in block] + unheld), featureIds)
+        # Keyed by the holding ids, the unheld parcels would collapse into one entry
+        self.assertEqual(len(set(holdingIds)), len(featureIds) - 1)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(OwnerComponentsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
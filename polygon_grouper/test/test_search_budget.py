@@ -0,0 +1,87 @@
+# coding=utf-8
+"""Search budget test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import math
+import unittest
+
+from search_budget import SearchBudget, bestFirstPairs, deadlinePassed, enumerationDeadline, untilDeadline
+
+
+class Clock():
+    """Manually moved clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class SearchBudgetTest(unittest.TestCase):
+    """Test the time budget and the best first order."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.clock = Clock()
+
+    def test_no_limit(self):
+        """Without time limit the budget never expires."""
+        budget = SearchBudget(0, self.clock)
+        self.assertFalse(budget.limited())
+        self.clock.now += 1e9
+        self.assertFalse(budget.expired())
+        self.assertIsNone(budget.holderDeadline(3))
+        self.assertFalse(deadlinePassed(None, self.clock))
+
+    def test_holder_share(self):
+        """The remaining time is shared by the remaining holders."""
+        budget = SearchBudget(60, self.clock)
+        self.assertTrue(budget.limited())
+        self.assertEqual(budget.holderDeadline(4), 115.0)
+        self.clock.now = 110.0
+        self.assertEqual(budget.holderDeadline(2), 135.0)
+        self.clock.now = 160.0
+        self.assertTrue(budget.expired())
+        self.assertEqual(budget.holderDeadline(2), 160.0)
+
+    def test_until_deadline(self):
+        """The enumeration stops after the deadline."""
+        def counter():
+            for number in range(100):
+                self.clock.now = 100.0 + number
+                yield number
+        self.assertEqual(list(untilDeadline(counter(), 109.5, self.clock, 5)), list(range(10)))
+        self.assertEqual(list(untilDeadline(range(7), None, self.clock)), list(range(7)))
+        self.assertEqual(list(untilDeadline(range(7), 50.0, self.clock)), [])
+
+    def test_enumeration_deadline(self):
+        """The enumeration gets a part of the remaining time, the rest is kept for the pairs."""
+        self.assertEqual(enumerationDeadline(110.0, self.clock), 105.0)
+        self.assertEqual(enumerationDeadline(140.0, self.clock, 0.25), 110.0)
+        self.assertEqual(enumerationDeadline(90.0, self.clock), 100.0)
+        self.assertIsNone(enumerationDeadline(None, self.clock))
+
+    def test_best_first(self):
+        """The pairs come by decreasing measure, the equal ones in the original order."""
+        matches = [('t1', ['a', 'b', 'c']), ('t2', ['b', 'd']), ('t3', ['a', 'c', 'd'])]
+        measures = {'a': 1.0, 'b': 3.0, 'c': 3.0, 'd': math.nan}
+        self.assertEqual(list(bestFirstPairs(matches, measures)),
+                         [('t1', 'b'), ('t1', 'c'), ('t2', 'b'), ('t3', 'c'), ('t1', 'a'), ('t3', 'a'), ('t2', 'd'), ('t3', 'd')])
+        self.assertEqual(list(bestFirstPairs([], measures)), [])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SearchBudgetTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,98 @@
+# coding=utf-8
+"""Swap queue test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import math
+import random
+import unittest
+
+from swap_queue import HolderVersions, InfeasiblePairs, SwapQueue
+
+
+class SwapQueueTest(unittest.TestCase):
+    """Test the reuse and the selection of the kept swaps."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.queue = SwapQueue()
+        self.holderSide = {'holder': 'A', 'seed': 'a0', 'holdings': ['a1'], 'totalArea': 6.0, 'deadline': None}
+        self.targetSide = {'holder': 'B', 'seed': 'b0', 'holdings': ['b1', 'b2'], 'totalArea': 6.0}
+
+    def test_versions(self):
+        """The counters grow with the swaps."""
+        versions = HolderVersions()
+        self.assertEqual(versions.get('A'), 0)
+        versions.bump('A', 'B')
+        versions.bump('A')
+        self.assertEqual((versions.get('A'), versions.get('B')), (2, 1))
+
+    def test_reuse(self):
+        """A result is reused while the input and the versions are the same."""
+        signature = self.queue.signature(self.holderSide, self.targetSide)
+        self.assertFalse(self.queue.lookup('A', 'B', signature))
+        self.queue.store('A', 'B', signature, (2.0, ('a1',), ('b1',), 6.0, 6.0))
+        self.holderSide['deadline'] = 123.0
+        self.assertTrue(self.queue.lookup('A', 'B', self.queue.signature(self.holderSide, self.targetSide)))
+        self.targetSide['holdings'] = ['b1']
+        self.assertFalse(self.queue.lookup('A', 'B', self.queue.signature(self.holderSide, self.targetSide)))
+        self.assertTrue(self.queue.lookup('A', 'B', signature))
+        self.queue.invalidate('B')
+        self.assertFalse(self.queue.lookup('A', 'B', signature))
+        self.queue.store('A', 'C', None, None)
+        self.assertFalse(self.queue.lookup('A', 'C', None))
+        self.assertEqual((self.queue.hits, self.queue.misses), (2, 4))
+
+    def test_best(self):
+        """The heap selects the same swap as the ordered scan of the targets."""
+        random.seed(5)
+        targets = [f't{index}' for index in range(12)]
+        for trial in range(300):
+            for target in random.sample(targets, 6):
+                measure = random.choice([None, 0.0, math.nan, 1.0, 2.0, 2.0, 3.0, random.random()])
+                result = None if measure is None else (measure, (trial,), (target,), 1.0, 1.0)
+                self.queue.store('A', target, None, result)
+            order = random.choices(targets, k=8)
+            expected = None
+            for target in order:
+                result = self.queue.result('A', target)
+                if result is not None and (expected is None or not expected[1][0] or expected[1][0] < result[0]):
+                    expected = (target, result)
+            best = self.queue.best('A', order)
+            if expected is None:
+                self.assertIsNone(best)
+            else:
+                self.assertEqual(best[0], expected[0])
+                self.assertIs(best[1], expected[1])
+        self.assertLessEqual(len(self.queue.heaps['A']), 2 * self.queue.sizes['A'])
+
+    def test_infeasible_pairs(self):
+        """A pair without swap is skipped until one of its holders swaps or its input changes."""
+        pairs = InfeasiblePairs(self.queue.versions)
+        key = ('A', 'a0', 'B')
+        signature = (('a1',), ('b1', 'b2'), 6.0, 6.0)
+        self.assertFalse(pairs.known(key, 'A', 'B', signature))
+        pairs.record(key, 'A', 'B', signature)
+        self.assertTrue(pairs.known(key, 'A', 'B', signature))
+        self.assertFalse(pairs.known(key, 'A', 'B', (('a1',), ('b1',), 6.0, 6.0)))
+        self.queue.versions.bump('C')
+        self.assertTrue(pairs.known(key, 'A', 'B', signature))
+        self.queue.invalidate('A')
+        self.assertFalse(pairs.known(key, 'A', 'B', signature))
+        self.assertEqual(pairs.hitRate(), 2 / 5)
+        self.assertEqual(InfeasiblePairs().hitRate(), 0)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SwapQueueTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,85 @@
+# coding=utf-8
+"""Turn history test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'gudmandras@gmail.com'
+__date__ = '2024-09-05'
+__copyright__ = 'Copyright 2024, GOPA'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from turn_history import TurnHistory
+
+
+class TurnHistoryTest(unittest.TestCase):
+    """Test the columnar turn store."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.history = TurnHistory(['a', 'b', 'c'], 'owner', [1, 2, 2])
+        self.history.startTurn('1_id', '1_holder', 'owner')
+        self.history.setValue('a', '1_holder', 2)
+        self.history.setValue('a', '1_id', 'b')
+        self.history.setValue('b', '1_holder', 1)
+        self.history.setValue('b', '1_id', 'a')
+
+    def test_turns(self):
+        """Test the holders are copied from the former turn."""
+        self.history.startTurn('2_id', '2_holder', '1_holder')
+        self.assertEqual(self.history.holderColumn('2_holder'), ['2', '1', '2'])
+        self.assertEqual(self.history.labelColumn('2_id'), [None, None, None])
+        self.assertEqual(self.history.labelColumn('1_id'), ['b', 'a', None])
+        self.assertEqual(self.history.names(), ['1_id', '1_holder', '2_id', '2_holder'])
+        self.history.dropTurn()
+        self.assertEqual(self.history.names(), ['1_id', '1_holder'])
+
+    def test_final_name(self):
+        """Test the final column is the former turn's after a turn without change, and the actual one after the last step."""
+        self.history.startTurn('2_id', '2_holder', '1_holder')
+        self.history.dropTurn()
+        self.assertEqual(self.history.finalName('2_holder', 20), '1_holder')
+        self.assertEqual(self.history.finalName('2_id', 20), '1_id')
+        self.assertEqual(self.history.finalName('18_holder', 20), '18_holder')
+        self.assertEqual(self.history.finalName('10_holder0', 20), '9_holder0')
+
+    def test_time_limit_first_turn(self):
+        """Test a stop by the time limit in the first turn keeps that turn as the final one."""
+        self.history.stop()
+        self.assertEqual(self.history.finalName('1_holder', 20), '1_holder')
+        self.assertEqual(self.history.finalName('1_id', 20), '1_id')
+        self.assertEqual(self.history.holderColumn(self.history.finalName('1_holder', 20)), ['2', '1', '2'])
+        # A later turn (e.g. of the next algorithm step) is resolved again
+        self.history.startTurn('2_id', '2_holder', '1_holder')
+        self.assertEqual(self.history.finalName('2_holder', 20), '1_holder')
+        self.history.stop()
+        self.assertEqual(self.history.finalName('2_holder', 20), '2_holder')
+
+    def test_save(self):
+        """Test the turns are saved into a .npz file."""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'turns.npz')
+            self.history.save(path)
+            with numpy.load(path) as arrays:
+                holders = arrays['holder_values'][arrays['holder_1_holder']].tolist()
+                self.assertEqual(holders, ['2', '1', '2'])
+                self.assertEqual(arrays['id_1_id'].tolist(), ['b', 'a', ''])
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TurnHistoryTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
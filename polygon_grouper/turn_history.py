@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+__author__ = 'GOPA'
+__date__ = '2024-09-05'
+__copyright__ = '(C) 2024 by GOPA'
+__revision__ = '$Format:%H$'
+
+import numpy
+
+
+class TurnHistory():
+    """
+    DESCRIPTION: Columnar side store of the turn results (holder and exchange label of every holding in every turn), instead of two new layer fields per turn. The holders are stored as integer codes, the labels only for the changed holdings
+    """
+
+    def __init__(self, holdingIds, sourceName, sourceHolders):
+        """
+        DESCRIPTION: Create the store with the starting holders
+        INPUTS:
+                holdingIds: List, holding ids
+                sourceName: String, name of the starting holder field
+                sourceHolders: List, starting holders, in the order of the holding ids
+        OUTPUTS: None
+        """
+        self.holdingIds = holdingIds
+        self.index = {holdingId: position for position, holdingId in enumerate(holdingIds)}
+        self.holderValues = []
+        self.holderCodes = {}
+        self.holderColumns = {sourceName: numpy.array([self.holderCode(holder) for holder in sourceHolders], dtype=numpy.int32)}
+        self.labelColumns = {}
+        self.turns = []
+        # Turn stopped by the time limit, its columns are final
+        self.finalTurn = None
+
+    def holderCode(self, holder):
+        """
+        DESCRIPTION: Give back the integer code of a holder value
+        INPUTS:
+                holder: String, holder id
+        OUTPUTS: Integer
+        """
+        holder = str(holder)
+        try:
+            return self.holderCodes[holder]
+        except KeyError:
+            self.holderCodes[holder] = len(self.holderValues)
+            self.holderValues.append(holder)
+            return self.holderCodes[holder]
+
+    def names(self):
+        """
+        DESCRIPTION: Give back the names of the stored turn columns
+        INPUTS: None
+        OUTPUTS: List
+        """
+        return [name for turn in self.turns for name in turn]
+
+    def startTurn(self, idName, holderName, sourceName):
+        """
+        DESCRIPTION: Start a new turn, its holders are copied from a former column
+        INPUTS:
+                idName: String, name of the exchange label column
+                holderName: String, name of the holder column
+                sourceName: String, name of the copied holder column
+        OUTPUTS: None
+        """
+        self.holderColumns[holderName] = self.holderColumns[sourceName].copy()
+        self.labelColumns[idName] = {}
+        self.turns.append((idName, holderName))
+        self.finalTurn = None
+
+    def dropTurn(self):
+        """
+        DESCRIPTION: Remove the last turn (e.g. a turn without change)
+        INPUTS: None
+        OUTPUTS: None
+        """
+        idName, holderName = self.turns.pop()
+        del self.holderColumns[holderName]
+        del self.labelColumns[idName]
+        if self.finalTurn == (idName, holderName):
+            self.finalTurn = None
+
+    def stop(self):
+        """
+        DESCRIPTION: Mark the last turn as the final one, when the time limit stops the run after it. The turn is kept, because its changes are made
+        INPUTS: None
+        OUTPUTS: None
+        """
+        self.finalTurn = self.turns[-1]
+
+    def finalName(self, attribute, steps):
+        """
+        DESCRIPTION: Give back the name of the last turn column with change. After a stop by the time limit it is the actual turn column, otherwise the former turn's column (the actual turn was dropped without change), or the actual one after the last step
+        INPUTS:
+                attribute: String, name of the actual turn column
+                steps: Integer, number of the steps of the algorithm
+        OUTPUTS: String
+        """
+        if self.finalTurn is not None and attribute in self.finalTurn:
+            return attribute
+        lastTurn = int(attribute.split('_')[0])
+        if lastTurn == steps-2:
+            return attribute
+        return str(lastTurn-1) + attribute[len(str(lastTurn)):]
+
+    def setValue(self, holdingId, field, newValue):
+        """
+        DESCRIPTION: Set the holder or the label of a holding in a turn column
+        INPUTS:
+                holdingId: String, holding id
+                field: String, name of the column
+                newValue: String or Integer
+        OUTPUTS: None
+        """
+        position = self.index[holdingId]
+        if field in self.labelColumns:
+            self.labelColumns[field][position] = str(newValue)
+        else:
+            self.holderColumns[field][position] = self.holderCode(newValue)
+
+    def holderColumn(self, name):
+        """
+        DESCRIPTION: Give back the holders of a column
+        INPUTS:
+                name: String, name of the holder column
+        OUTPUTS: List, holders, in the order of the holding ids
+        """
+        return [self.holderValues[code] for code in self.holderColumns[name].tolist()]
+
+    def labelColumn(self, name):
+        """
+        DESCRIPTION: Give back the labels of a column
+        INPUTS:
+                name: String, name of the label column
+        OUTPUTS: List, labels or None, in the order of the holding ids
+        """
+        labels = self.labelColumns[name]
+        return [labels.get(position) for position in range(len(self.holdingIds))]
+
+    def save(self, path):
+        """
+        DESCRIPTION: Save every turn column into a NumPy .npz file
+        INPUTS:
+                path: String, path of the file
+        OUTPUTS: None
+        """
+        arrays = {
+            'holding_ids': numpy.array([str(holdingId) for holdingId in self.holdingIds]),
+            'holder_values': numpy.array(self.holderValues),
+            'turns': numpy.array(self.turns).reshape(-1, 2)
+        }
+        for idName, holderName in self.turns:
+            arrays[f'holder_{holderName}'] = self.holderColumns[holderName]
+            arrays[f'id_{idName}'] = numpy.array([label or '' for label in self.labelColumn(idName)])
+        numpy.savez_compressed(path, **arrays)
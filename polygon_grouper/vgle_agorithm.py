@@ -27,6 +27,7 @@ from qgis.core import (Qgis,
                         QgsVectorFileWriter, 
                         QgsVectorLayer,
                         QgsFeatureRequest, 
+                        QgsSpatialIndex,
                         QgsExpression,
                         QgsCoordinateReferenceSystem,
                         QgsWkbTypes)
@@ -34,7 +35,26 @@ import processing
 import qgis.core
 import os.path
 from datetime import datetime
-import time, copy, uuid, logging, itertools, sys, random, math, statistics, tempfile
+import time, copy, uuid, logging, itertools, sys, random, math, statistics, tempfile, collections
+import numpy
+from concurrent.futures import ThreadPoolExecutor
+from .distance_matrix import DistanceMatrix, RadiusMatrix
+from .geometry_cache import PairDistanceCache
+from .feature_index import FeatureIndex
+from .matrix_cache import MatrixCache
+from .adjacency_graph import AdjacencyGraph
+from .owner_components import OwnerComponents, mergeGroups
+from .assignment_state import AssignmentBuffer
+from .turn_history import TurnHistory
+from .holder_registry import HolderRegistry
+from .holding_mask import HoldingMask
+from .holder_holdings import HolderHoldings
+from .area_combinations import AreaCombinations, AreaMatching
+from .combination_aggregates import CombinationAggregates
+from .combination_subproces import SwapEvaluator, SwapPool
+from .search_budget import SearchBudget, bestFirstPairs, deadlinePassed, enumerationDeadline, untilDeadline
+from .swap_queue import HolderVersions, InfeasiblePairs, SwapQueue
+from .holder_conflicts import HolderConflicts
 
 class PolygonGrouper(QgsProcessingAlgorithm):
 
@@ -65,6 +85,21 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         stats = QgsProcessingParameterBoolean('Stats', "Generate statistics", defaultValue=False)
         stats.setFlags(stats.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
         self.addParameter(stats)
+        cacheDirectory = QgsProcessingParameterFile('CacheDirectory', 'Cache directory (default: output directory)', behavior=QgsProcessingParameterFile.Folder, optional=True, defaultValue=None)
+        cacheDirectory.setFlags(cacheDirectory.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(cacheDirectory)
+        integerIds = QgsProcessingParameterBoolean('IntegerIds', "Use integer holding ids", defaultValue=False)
+        integerIds.setFlags(integerIds.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(integerIds)
+        workers = QgsProcessingParameterNumber('Workers', 'Number of worker processes (0: all processors)', type=QgsProcessingParameterNumber.Integer, minValue=0, defaultValue=1)
+        workers.setFlags(workers.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(workers)
+        timeLimit = QgsProcessingParameterNumber('TimeLimit', 'Time limit (s, 0: no limit)', type=QgsProcessingParameterNumber.Double, minValue=0, defaultValue=0)
+        timeLimit.setFlags(timeLimit.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(timeLimit)
+        parallelRounds = QgsProcessingParameterBoolean('ParallelRounds', "Evaluate the holders without conflict in parallel rounds", defaultValue=False)
+        parallelRounds.setFlags(parallelRounds.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(parallelRounds)
 
     def name(self):
         return 'polygon_grouper'
@@ -119,6 +154,12 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         <p>Simplified algorithm for processing large datasets. Recommended when the input dataset contains more than 4000 polygons. The simplified algorithm only involves swapping holders between two polygons.</p>
         <h3>Generate statistics</h3>
         <p>Generate statistics about the run: indicators statistics, change logs, holder relations log</p>
+        <h3>Number of worker processes</h3>
+        <p>The swaps of the Closer method are evaluated in this many parallel processes. 1 runs everything in the QGIS process, 0 uses all processors.</p>
+        <h3>Time limit</h3>
+        <p>Time of the swap search in seconds. The time is shared between the holders, every holder uses the best swap found in its share, and no new turn is started after the limit. 0 keeps the fixed search limits of the Simplfy option.</p>
+        <h3>Parallel rounds</h3>
+        <p>The holders of the Closer method are grouped into rounds, where the holders' swaps can not affect each other (no common holders among the holders of their seed's surroundings). The swaps of a round are evaluated together by the worker processes. The result is the same as processing the holders one by one in the order of the rounds, which is written to the log.</p>
         <br></body></html>"""
 
     def createInstance(self):
@@ -151,9 +192,17 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         self.simply = parameters['Simplfy']
         self.strict = parameters['Strict']
         self.stats = parameters['Stats']
+        self.integerIds = parameters.get('IntegerIds', False)
+        self.workers = parameters.get('Workers', 1)
+        self.timeLimit = parameters.get('TimeLimit', 0)
+        self.parallelRounds = parameters.get('ParallelRounds', False)
         inputLayer = self.parameterAsVectorLayer(parameters, 'Inputlayer', context)
         if parameters['OutputDirectory'] == 'TEMPORARY_OUTPUT':
             parameters['OutputDirectory'] = tempfile.mkdtemp()
+        if parameters.get('CacheDirectory'):
+            self.cacheDirectory = parameters['CacheDirectory']
+        else:
+            self.cacheDirectory = parameters['OutputDirectory']
        
         self.startLogging(inputLayer, parameters, timeStamp)
         #Create work file and get the starting dictionaries
@@ -163,11 +212,15 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         holdersWithHoldings, holdersHoldingNumber = self.getHoldersHoldings(layer)
         layer, self.idAttribute, holdersWithHoldings = self.createIdField(layer, holdersWithHoldings)
         layer.dataProvider().createSpatialIndex()
+        self.featureIndex = FeatureIndex(layer, self.idAttribute)
+        self.pairDistances = PairDistanceCache(self.featureIndex)
         holdingsWithArea = self.getHoldingsAreas(layer, parameters["BalancedByField"])
-        self.holdersWithHoldings = holdersWithHoldings
-        self.holdersHoldingNumber = holdersHoldingNumber
+        self.holdersWithHoldings = HolderHoldings(holdersWithHoldings)
+        self.holderRegistry = HolderRegistry(holdersWithHoldings.keys())
+        self.holdersHoldingNumber = self.holderRegistry.column(holdersHoldingNumber, numpy.int32)
         self.holdingsWithArea = holdingsWithArea
         self.holdersTotalArea = self.calculateTotalArea()
+        self.holderRegistry.setBounds(self.holdersTotalArea, self.tolerance)
 
         if parameters['Preference']:
             selectedFeatures = self.getSelectedFeatures(inputLayer)
@@ -179,6 +232,10 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         self.distanceMatrix = self.createDistanceMatrix(layer)
         self.filteredDistanceMatrix = self.filterDistanceMatrix(self.distanceMatrix)
         feedback.pushInfo('Distance matrix calculated')
+        self.adjacencyGraph = self.createAdjacencyGraph(layer)
+        self.ownerComponents = OwnerComponents(self.adjacencyGraph, self.distanceMatrix.holdingIds, self.holdersWithHoldings, self.holderRegistry)
+        self.assignments = AssignmentBuffer(self.distanceMatrix.holdingIds, self.featureIds)
+        self.turnHistory = self.createTurnHistory(layer)
 
         self.calculateTotalDistances(layer)
 
@@ -190,6 +247,9 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         if feedback.isCanceled():
             self.endLogging()
             return {}
+        self.searchBudget = SearchBudget(self.timeLimit)
+        self.holderVersions = HolderVersions()
+        self.infeasiblePairs = InfeasiblePairs(self.holderVersions)
         #Start one of the functions
         if self.algorithmIndex == 0:
             swapedLayer, totalAreas = self.neighbours(layer, feedback)
@@ -202,7 +262,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         elif self.algorithmIndex == 2:
             oneSeedBoolean = self.checkSeedNumber(feedback)
             if oneSeedBoolean:
-                originalSeeds = copy.deepcopy(self.seeds)
+                originalSeeds = {holder: list(seedList) for holder, seedList in self.seeds.items()}
                 swapedLayer, totalAreas = self.neighbours(layer, feedback)
                 swapedLayer, totalAreas = self.closer(swapedLayer, feedback, originalSeeds, totalAreas)
             else:
@@ -220,6 +280,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         if swapedLayer:
             feedback.setCurrentStep(self.steps-1)
 
+            self.materialiseTurnAttributes(swapedLayer)
             swapedLayer.commitChanges()
             swapedLayer.removeSelection()
             QgsProject.instance().addMapLayer(swapedLayer, False)
@@ -240,17 +301,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
             layer.removeSelection()
 
             if parameters['Stats']:
-                lastHolderAttribute = int(self.actualHolderAttribute.split('_')[0])
-                if lastHolderAttribute == self.steps-2:
-                    if self.steps-2 >= 10:
-                        attributeName = str(lastHolderAttribute) + self.actualHolderAttribute[2:]
-                    else:
-                        attributeName = str(lastHolderAttribute) + self.actualHolderAttribute[1:]
-                else:
-                    if lastHolderAttribute >= 10:
-                        attributeName = str(lastHolderAttribute-1) + self.actualHolderAttribute[2:]
-                    else:
-                        attributeName = str(lastHolderAttribute-1) + self.actualHolderAttribute[1:]
+                attributeName = self.getFinalAttribute(self.actualHolderAttribute)
                 afterData = self.calculateStatData(swapedLayer, attributeName)
                 mergedData = self.calculateStatData(mergedLayer, attributeName)
                 self.createIndicesStat(beforeData, afterData, mergedData)
@@ -264,6 +315,8 @@ class PolygonGrouper(QgsProcessingAlgorithm):
 
             mainEndTime = time.time()
             logging.debug(f'Script time:{mainEndTime-mainStartTime}')
+            logging.debug(f'Distance cache hits: {self.pairDistances.hits}, misses: {self.pairDistances.misses}, hit rate: {self.pairDistances.hitRate():.2%}')
+            logging.debug(f'Infeasible pair hits: {self.infeasiblePairs.hits}, misses: {self.infeasiblePairs.misses}, hit rate: {self.infeasiblePairs.hitRate():.2%}')
 
             feedback.setCurrentStep(self.steps)
             self.endLogging()   
@@ -447,53 +500,25 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         #import ptvsd
         #ptvsd.debug_this_thread()
         fieldNameId = [turn for turn, field in enumerate(layer.fields()) if field.name() == fieldName][0]
-        allUniqueCombination = []
-        features = layer.getFeatures()
-        for turn, feature in enumerate(features):
-            tempListWithValues = []
-            for attr in attributes:
-                value = feature.attribute(attr)
-                if value != qgis.core.NULL:
-                    tempListWithValues.append(value)
-            tempString = ''
-            for turn, tempValue in enumerate(tempListWithValues):
-                if len(tempListWithValues) > 1:
-                    if tempValue != '' and tempValue  != qgis.core.NULL:
-                        if tempValue != tempListWithValues[-1]:
-                            tempString += f'{tempValue},'
-                        else:
-                            tempString += f'{tempValue}'
-                else:
-                    if tempValue and tempValue != '' and tempValue != qgis.core.NULL:
-                        tempString += f'{tempValue}'
-            if len(tempString) > 0:
-                if tempString not in allUniqueCombination:
-                    allUniqueCombination.append(tempString)
+        attributeIds = [layer.fields().indexFromName(attr) for attr in attributes]
+        # One pass: the tuple of the holder values gets a dense integer id, in the order of appearance
+        holderIds = {}
+        newValues = {}
         counter = 1
-        for uniqueString in allUniqueCombination:
-            expression = ''
-            uniqueValueList = uniqueString.split(',')
-            for turn, uniqueValue in enumerate(uniqueValueList):
-                if uniqueValue != qgis.core.NULL:
-                    if type(uniqueValue) == str:
-                        if turn+1 != len(uniqueValueList):
-                            expression += '"{field}"=\'{value}\' AND '.format(field=attributes[turn],value=str(uniqueValue))
-                        else:
-                            expression += '"{field}"=\'{value}\''.format(field=attributes[turn],value=str(uniqueValue))
-                    else:
-                        if turn+1 != len(uniqueValueList):
-                            expression += '"{field}"={value} AND '.format(field=attributes[turn],value=str(uniqueValue))
-                        else:
-                            expression += '"{field}"={value}'.format(field=attributes[turn],value=str(uniqueValue))
-            layer.selectByExpression(expression)
-            selectedFeatures = layer.selectedFeatures()
-            if layer.selectedFeatureCount() > 0:
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes(attributeIds)
+        for feature in layer.getFeatures(request):
+            values = feature.attributes()
+            holderKey = tuple(None if values[attributeId] == qgis.core.NULL or values[attributeId] == '' else values[attributeId] for attributeId in attributeIds)
+            if all(value is None for value in holderKey):
+                continue
+            try:
+                holderId = holderIds[holderKey]
+            except KeyError:
                 counter += 1
-                if (layer.isEditable() == False):
-                    layer.startEditing()
-                for feature in selectedFeatures:
-                    layer.changeAttributeValue(feature.id(), fieldNameId, counter)
-                layer.removeSelection()
+                holderId = counter
+                holderIds[holderKey] = holderId
+            newValues[feature.id()] = {fieldNameId: holderId}
+        layer.dataProvider().changeAttributeValues(newValues)
         layer.commitChanges()
 
         return layer
@@ -516,7 +541,10 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         if (layer.isEditable() == False):
             layer.startEditing()
         dataProvider = layer.dataProvider()
-        dataProvider.addAttributes([QgsField(fieldName, QVariant.String, len=10)])
+        if self.integerIds:
+            dataProvider.addAttributes([QgsField(fieldName, QVariant.Int)])
+        else:
+            dataProvider.addAttributes([QgsField(fieldName, QVariant.String, len=10)])
         layer.updateFields()
         layer, holdersWithHoldingId = self.setIdField(layer, fieldName, holders)
         return layer, fieldName, holdersWithHoldingId
@@ -532,19 +560,23 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         """
         attributeId = self.getAttributesNames(layer).index(attribute)
         holdersWithHoldingId = {}
-        if (layer.isEditable() == False):
-            layer.startEditing()
+        newValues = {}
+        if self.integerIds:
+            # Dense ids in the layer order, equal to the position of the holding in the layer
+            request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setNoAttributes()
+            integerIds = {feature.id(): turn for turn, feature in enumerate(layer.getFeatures(request))}
+            for featureId, newId in integerIds.items():
+                newValues[featureId] = {attributeId: newId}
         for holder, holdings in holders.items():
-            counter = 0
+            holdersWithHoldingId[holder] = []
             for featureId in holdings:
-                newId = str(uuid.uuid4())[:10]
-                layer.changeAttributeValue(featureId, attributeId, newId)
-                counter += 1
-                if holder in list(holdersWithHoldingId.keys()):
-                    holdersWithHoldingId[holder].append(newId)
+                if self.integerIds:
+                    newId = integerIds[featureId]
                 else:
-                    holdersWithHoldingId[holder] = list()
-                    holdersWithHoldingId[holder].append(newId)
+                    newId = str(uuid.uuid4())[:10]
+                    newValues[featureId] = {attributeId: newId}
+                holdersWithHoldingId[holder].append(newId)
+        layer.dataProvider().changeAttributeValues(newValues)
         layer.commitChanges()
         return layer, holdersWithHoldingId
 
@@ -578,11 +610,11 @@ class PolygonGrouper(QgsProcessingAlgorithm):
 
     def calculateTotalArea(self):
         """
-        DESCRIPTION: Create a dictionary for holder total areas
+        DESCRIPTION: Create a per holder array for holder total areas
         INPUTS: None
-        OUTPUTS: Dictionary, key: holders ids, values: Integer
+        OUTPUTS: HolderColumn, key: holders ids, values: Numeric
         """
-        holderTotalArea = {}
+        holderTotalArea = self.holderRegistry.column()
         for holder, holdings in self.holdersWithHoldings.items():
             totalArea = 0
             for holding in holdings:
@@ -593,14 +625,13 @@ class PolygonGrouper(QgsProcessingAlgorithm):
 
     def calculateTotalDistances(self, layer):
         """
-        DESCRIPTION: Create two dictionaries for holder total distances and holding distances to seed
+        DESCRIPTION: Create the per holder total distances and a dictionary for holding distances to seed
         INPUTS: None
         OUTPUTS: 
-            Dictionaries, 
-                key: holders ids, values: Integer
-                key: holding ids, values: Integer
+            HolderColumn, key: holders ids, values: Numeric
+            Dictionary, key: holding ids, values: Numeric
         """
-        totalDistances = {}
+        totalDistances = self.holderRegistry.column()
         holdingWithSeedDistance = {}
         for holder, holdings in self.holdersWithHoldings.items():
             if self.useSingle or self.onlySelected:
@@ -616,17 +647,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                     distance = self.distanceMatrix[seed][holding]
                     sumDistance += distance
                 except KeyError:
-                    expression = f'"{self.idAttribute}" = \'{seed}\''
-                    layer.selectByExpression(expression)
-                    featureSeed = layer.selectedFeatures()[0]
-                    expression = f'"{self.idAttribute}" = \'{holding}\''
-                    layer.selectByExpression(expression)
-                    featureTarget = layer.selectedFeatures()[0]
-                    # Get geometries of the features
-                    geometrySeed = featureSeed.geometry()
-                    geometryTarget = featureTarget.geometry()
-                    # Calculate the distance
-                    distance = geometrySeed.distance(geometryTarget)
+                    distance = self.pairDistances.distance(seed, holding)
                     sumDistance += distance
                 holdingWithSeedDistance[holding] = distance
             totalDistances[holder] = sumDistance
@@ -642,12 +663,10 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         OUTPUTS: Dictionary, key: holding id, values: Integer, area
         """
         holdingsWithAreas = {}
-        features = layer.getFeatures()
-        for feature in features:
-            area = feature.attribute(areaId)
+        for holdingId in self.featureIndex.holdingIds:
+            area = self.featureIndex.attribute(holdingId, areaId)
             if area == qgis.core.NULL:
-                area = feature.geometry().area()/10000
-            holdingId = feature.attribute(self.idAttribute)
+                area = self.featureIndex.geometry(holdingId).area()/10000
             holdingsWithAreas[holdingId] = area
         return holdingsWithAreas
 
@@ -711,172 +730,171 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                     largestFeatureId = holding
                             holdersWithSeeds[holder] = [largestFeatureId]
         
-        self.seeds = holdersWithSeeds
+        self.setSeeds(holdersWithSeeds)
+
+    def setSeeds(self, seeds):
+        """
+        DESCRIPTION: Store the seed polygons of the holders, and the mask of every seed polygon
+        INPUTS:
+                seeds: Dictionary, key: holder id, values: List, holding ids
+        OUTPUTS: None
+        """
+        self.seeds = seeds
+        self.seedMask = HoldingMask(self.featureIndex.holdingIds, [seed for seedList in seeds.values() for seed in seedList], self.featureIndex.index)
+
+    def addSeed(self, holder, holding):
+        """
+        DESCRIPTION: Mark a holding as a seed polygon of its holder, and materialise its distance matrix row
+        INPUTS:
+                holder: String, holder id
+                holding: String, holding id
+        OUTPUTS: None
+        """
+        self.seeds[holder].append(holding)
+        self.seedMask.add(holding)
+        self.distanceMatrix.addRows([holding])
+        self.ownerComponents.markDirty(holder)
 
     def createDistanceMatrix(self, layer):
         """
-        DESCRIPTION: Create a distance matrix of the input layer features
+        DESCRIPTION: Create a distance matrix of the input layer features, based on their centroids. Only the rows of the seed polygons are calculated in advance. The centroids are read from the cache, if the layer was already processed
         INPUTS:
                 layer: QgsVectorLayer
-        OUTPUTS: Dictionary, key: holding id, values: Distionary (nested), key: holding ids, values: Float, distances
-        """
-        if self.simply:
-            nearestPoints = 1000
-            """
-            epsg = layer.crs().geographicCrsAuthId()[-4:]
-            bufferLayer = QgsVectorLayer(f"Polygon?crs=epsg:{epsg}","buffer", "memory")
-
-            for seed in self.seeds:
-                expression = f'"{self.idAttribute}" = \'{self.seeds[seed][0]}\''
-                layer.selectByExpression(expression)
-                selectedFeature = layer.selectedFeatures()
-                geomBuffer = selectedFeature[0].geometry().buffer(self.distance+100,-1)
-                f = QgsFeature()
-                f.setGeometry(geomBuffer)
-                bufferLayer.dataProvider().addFeatures([f])      
-                features = layer.getFeatures()
-                inputs = [f for f in features]
-                tempCalculator = 0
-                for feat in inputs:
-                    if feat.geometry().intersects(geomBuffer):
-                        tempCalculator += 1
-                if tempCalculator > nearestPoints:
-                    nearestPoints = tempCalculator
-                layer.removeSelection()
-            """
-        algParams = {
-        'INPUT':layer,
-        'ALL_PARTS': False,
-        'OUTPUT':'TEMPORARY_OUTPUT'
-        }
-        centroids = processing.run("native:centroids", algParams)['OUTPUT']
-        algParams = {
-        'INPUT':centroids,
-        'INPUT_FIELD': self.idAttribute,
-        'TARGET': centroids,
-        'TARGET_FIELD': self.idAttribute,
-        'MATRIX_TYPE': 1,
-        'NEAREST_POINTS': 0,
-        'OUTPUT':'TEMPORARY_OUTPUT'
-        }
-        if self.simply:
-            algParams['MATRIX_TYPE'] = 0
-            algParams['NEAREST_POINTS'] = nearestPoints
-        matrix = processing.run("qgis:distancematrix", algParams)['OUTPUT']
-        if self.simply:
-            distanceMatrix = {}
-            names = self.getAttributesNames(matrix)
-            features = matrix.getFeatures()
-            for feature in features:
-                featureId = feature.attribute('InputID')
-                targetId = feature.attribute('TargetID')
-                distance = feature.attribute('Distance')
-                if featureId in list(distanceMatrix.keys()):
-                    distanceMatrix[featureId][targetId] = distance
-                else:
-                    distanceMatrix[featureId] = {}
-                    distanceMatrix[featureId][targetId] = distance
+        OUTPUTS: DistanceMatrix, key: holding id, values: DistanceRow, key: holding ids, values: Float, distances
+        """
+        holdingIds = self.featureIndex.holdingIds
+        self.featureIds = self.featureIndex.featureIds
+        self.matrixCache = MatrixCache(self.cacheDirectory, layer.crs().toWkt())
+        for featureId, geometry in zip(self.featureIds, self.featureIndex.geometries):
+            self.matrixCache.addFeature(featureId, geometry.asWkb())
+        cached = self.matrixCache.load('centroids', ['coordinates'])
+        if cached is not None and len(cached['coordinates']) == len(holdingIds):
+            coordinates = cached['coordinates']
+            logging.debug(f'Centroids loaded from cache: {self.matrixCache.getKey()}')
         else:
-            distanceMatrix = {}
-            names = self.getAttributesNames(matrix)
-            features = matrix.getFeatures()
-            for feature in features:
-                tempDict = {}
-                for field in names:
-                    value = feature.attribute(field)
-                    tempDict[field] = value
-                distanceMatrix[feature.attribute('ID')] = tempDict
-
+            coordinates = []
+            for geometry in self.featureIndex.geometries:
+                centroid = geometry.centroid()
+                if centroid.isNull():
+                    coordinates.append((math.nan, math.nan))
+                else:
+                    point = centroid.asPoint()
+                    coordinates.append((point.x(), point.y()))
+            coordinates = numpy.array(coordinates, dtype=numpy.float64).reshape(-1, 2)
+            self.matrixCache.save('centroids', {'coordinates': coordinates})
+        distanceMatrix = DistanceMatrix(holdingIds, coordinates)
+        distanceMatrix.addRows([seed for seedList in self.seeds.values() for seed in seedList])
         return distanceMatrix
 
     def filterDistanceMatrix(self, distanceMatrix):
         """
-        DESCRIPTION: Filter a distance matrix based on the distance threshold 
+        DESCRIPTION: Filter a distance matrix based on the distance threshold. Only the pairs inside the threshold are calculated, with a grid based radius query. The pairs are read from the cache, if the layer was already processed with the same threshold
         INPUTS:
-                distanceMatrix: Dictionary, distance matrix
-        OUTPUTS: Dictionary, key: holding id, values: Distionary (nested), key: holding ids, values: Float, distances
-        """
-        filteredMatrix = {}
-        for key, value in distanceMatrix.items():
-            sortedDistances = [(y, x) for y, x in zip(list(value.values()), list(value.keys())) if x != 'ID']
-            sortedDistances.sort()
-            subFilteredMatrix = {}
-            for value2, key2 in sortedDistances:
-                if value2 <= self.distance:
-                    subFilteredMatrix[key2] = value2
-                else:
-                    break
-            filteredMatrix[key] = subFilteredMatrix
+                distanceMatrix: DistanceMatrix, distance matrix
+        OUTPUTS: RadiusMatrix, key: holding id, values: Distionary (nested, sorted by distance), key: holding ids, values: Float, distances
+        """
+        entryName = f'radius_{self.distance}'
+        cached = self.matrixCache.load(entryName, ['indptr', 'indices', 'distances'])
+        if cached is not None and len(cached['indptr']) == len(distanceMatrix.holdingIds) + 1:
+            neighbourhoods = (cached['indptr'], cached['indices'], cached['distances'])
+            filteredMatrix = RadiusMatrix(distanceMatrix.holdingIds, distanceMatrix.coordinates, self.distance, neighbourhoods=neighbourhoods)
+            logging.debug(f'Filtered distance matrix loaded from cache: {self.matrixCache.getKey()}')
+        else:
+            filteredMatrix = RadiusMatrix(distanceMatrix.holdingIds, distanceMatrix.coordinates, self.distance)
+            self.matrixCache.save(entryName, {'indptr': filteredMatrix.indptr, 'indices': filteredMatrix.indices, 'distances': filteredMatrix.distances})
         return filteredMatrix
 
+    def createAdjacencyGraph(self, layer):
+        """
+        DESCRIPTION: Create the touch adjacency graph of the holdings once, with a spatial index. The geometries do not change during the run, so the graph is valid for every turn. The graph is read from the cache, if the layer was already processed
+        INPUTS:
+                layer: QgsVectorLayer
+        OUTPUTS: AdjacencyGraph
+        """
+        cached = self.matrixCache.load('adjacency', ['indptr', 'indices'])
+        if cached is not None and len(cached['indptr']) == len(self.featureIds) + 1:
+            logging.debug(f'Adjacency graph loaded from cache: {self.matrixCache.getKey()}')
+            return AdjacencyGraph(self.featureIds, cached['indptr'], cached['indices'])
+
+        geometries = self.featureIndex.geometries
+        index = QgsSpatialIndex()
+        for position, geometry in enumerate(geometries):
+            if not geometry.isNull():
+                index.addFeature(position, geometry.boundingBox())
+        firstPositions = []
+        secondPositions = []
+        for position, geometry in enumerate(geometries):
+            if geometry.isNull():
+                continue
+            engine = QgsGeometry.createGeometryEngine(geometry.constGet())
+            engine.prepareGeometry()
+            for candidate in index.intersects(geometry.boundingBox()):
+                if candidate > position and engine.touches(geometries[candidate].constGet()):
+                    firstPositions.append(position)
+                    secondPositions.append(candidate)
+        adjacencyGraph = AdjacencyGraph.fromPairs(self.featureIds, firstPositions, secondPositions)
+        self.matrixCache.save('adjacency', {'indptr': adjacencyGraph.indptr, 'indices': adjacencyGraph.indices})
+        return adjacencyGraph
+
     def getChangableHoldings(self, inDistance=None):
         """
-        DESCRIPTION: Get a list, which can be used for changes (not a seed)
+        DESCRIPTION: Get the holdings, which can be used for changes (not a seed)
         INPUTS:
                 inDistance: List, holding ids, which are inside the distance threshold
-        OUTPUTS: List, holding ids
+        OUTPUTS: List, holding ids, if inDistance is given; otherwise HoldingMask of every changable holding
         """
-        changableHoldings = []
         if inDistance:
-            for holding in inDistance:
-                listedSeeds = [seed for seedList in list(self.seeds.values()) for seed in seedList]
-                if holding not in listedSeeds:
+            return self.seedMask.exclude(inDistance)
+        changableHoldings = []
+        for holder, holdings in self.holdersWithHoldings.items():
+            holderSeeds = set(self.seeds[holder])
+            for holding in holdings:
+                if holding not in holderSeeds:
                     changableHoldings.append(holding)
-        else:
-            for holder, holdings in self.holdersWithHoldings.items():
-                for holding in holdings:
-                    if holding not in self.seeds[holder]:
-                        changableHoldings.append(holding)
-        return changableHoldings
+        return HoldingMask(self.featureIndex.holdingIds, changableHoldings, self.featureIndex.index)
 
     def getNeighbours(self, layer, seed):
         """
-        DESCRIPTION: Get neighbours holdings of a certain polygon
+        DESCRIPTION: Get neighbours holdings of a certain polygon, from the adjacency graph
         INPUTS:
                 layer: QgsVectorLayer
                 seed: holding id of the holder's seed polygon
         OUTPUTS:
                 neighboursIds: List, holding ids
-                neighbours: QgsVectorLayer
+                neighbours: List, QgsFeatures of the neighbours, with their actual attributes
         """
-        expression = f'"{self.idAttribute}" = \'{seed}\''
-        layer.selectByExpression(expression)
-        algParams = {
-            'INPUT': layer,
-            'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        seedFeatures = processing.run('native:saveselectedfeatures', algParams)["OUTPUT"]
-        algParams = {
-            'INPUT': layer,
-            'INTERSECT': seedFeatures,
-            'PREDICATE': 4,
-            'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        neighbours = processing.run('native:extractbylocation', algParams)["OUTPUT"]
-        layer.removeSelection()
-
-        neighboursFeatures = neighbours.getFeatures()
-        neighboursIds = [neighboursFeature.attribute(self.idAttribute) for neighboursFeature in neighboursFeatures]
+        position = self.distanceMatrix.index[seed]
+        neighboursIds = [self.distanceMatrix.holdingIds[neighbour] for neighbour in self.adjacencyGraph.neighbours(position).tolist()]
+        if neighboursIds:
+            request = QgsFeatureRequest().setFilterFids(self.adjacencyGraph.neighbourFeatureIds(position))
+            neighbours = sorted(layer.getFeatures(request), key=lambda feature: feature.id())
+        else:
+            neighbours = []
 
         return neighboursIds, neighbours
 
+    def isHolding(self, holdingId):
+        """
+        DESCRIPTION: Check, if a value is a holding id, and not a marker of a missing seed polygon (False, empty list or string). The integer holding ids start from 0, so the truth value can not be used
+        INPUTS:
+                holdingId: String or Integer, holding id, or marker
+        OUTPUTS: Boolean
+        """
+        return holdingId is not False and holdingId is not None and holdingId != '' and not isinstance(holdingId, list)
+
     def idsForChange(self, holdingList, changables):
         """
         DESCRIPTION: Get holding ids, which are on the changables list
         INPUTS:
                 holdingList: List, holding ids
-                changables: List, holding ids
+                changables: HoldingMask or List, holding ids
         OUTPUTS:
                 ids: List, holding ids
         """
-        try:
-            ids = []
-            for holdingId in holdingList:
-                if holdingId in changables:
-                    ids.append(holdingId)
-            return ids
-        except ValueError:
-            return None
+        if isinstance(changables, HoldingMask):
+            return changables.filter(holdingList)
+        changables = set(changables)
+        return [holdingId for holdingId in holdingList if holdingId in changables]
 
     def neighbours(self, layer, feedback, totalAreas=None):
         """
@@ -894,7 +912,8 @@ class PolygonGrouper(QgsProcessingAlgorithm):
 
         try:
             turn = int(self.actualHolderAttribute.split('_')[0])
-            if self.algorithmIndex == 3:
+            # After a stop by the time limit the actual turn is kept, the next turn continues from it
+            if self.algorithmIndex == 3 and self.turnHistory.finalTurn is None:
                 if turn == (self.steps/2)-3:
                     self.actualHolderAttribute = str(int(self.actualHolderAttribute.split('_')[0])) + self.actualHolderAttribute[2:]
                     self.actualIdAttribute = str(int(self.actualIdAttribute.split('_')[0])) + self.actualIdAttribute[2:]
@@ -912,36 +931,39 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         if totalAreas:
             holdersLocalTotalArea = totalAreas
         else:
-            holdersLocalTotalArea = copy.deepcopy(self.holdersTotalArea)
+            holdersLocalTotalArea = self.holdersTotalArea.copy()
         feedback.pushInfo('Neighbours algorithm start')
 
         while changer:
             turn += 1
             layer = self.setTurnAttributes(layer, turn)
-            not_changables = []
+            not_changables = HoldingMask(self.featureIndex.holdingIds, index=self.featureIndex.index)
             feedback.pushInfo(f'Turn {turn}')
-            for holder, holdings in self.holdersWithHoldings.items():
+            holderNumber = len(self.holdersWithHoldings)
+            for holderTurn, (holder, holdings) in enumerate(self.holdersWithHoldings.items()):
+                if self.searchBudget.expired():
+                    break
                 if holder != 'NULL':
+                    holderDeadline = self.searchBudget.holderDeadline(holderNumber - holderTurn)
                     seeds = self.seeds[holder]
                     if len(seeds) >= 1:
                         for seed in seeds:
                             #feedback.info(seed)
-                            neighboursIds, neighboursLayer = self.getNeighbours(layer, seed)
+                            neighboursIds, neighboursFeatures = self.getNeighbours(layer, seed)
                             inDistance = self.filteredDistanceMatrix[seed]
                             distanceChanges = self.getChangableHoldings(inDistance)
-                            localChangables = [distance for distance in distanceChanges if distance in self.globalChangables and distance not in not_changables]
+                            localChangables = self.globalChangables.intersection(distanceChanges).difference(not_changables)
                             if len(localChangables) > 0:
                                 holdingsIds = []
                                 changesIds = []
                                 
-                                for holdingId in holdings:
+                                for holdingId in self.holdersWithHoldings[holder]:
                                     if holdingId in neighboursIds:
                                         if holdingId not in self.seeds[holder]:
-                                            self.seeds[holder].append(holdingId)
+                                            self.addSeed(holder, holdingId)
                                     else:
                                         holdingsIds.append(holdingId)
 
-                                neighboursFeatures = neighboursLayer.getFeatures()
                                 for nghfeat in neighboursFeatures:
                                     # Get holder total area
                                     holderTotalArea = holdersLocalTotalArea[holder]
@@ -949,7 +971,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                     filteredHolderHoldingsIds = self.idsForChange(holdingsIds, localChangables)
                                     if filteredHolderHoldingsIds:
                                         # Get ngh holder name
-                                        neighbourHolder = nghfeat.attribute(self.actualHolderAttribute)
+                                        neighbourHolder = self.ownerComponents.holder(nghfeat.attribute(self.idAttribute))
                                         if neighbourHolder != 'NULL' and neighbourHolder != holder:
                                             try:
                                                 targetHolderSeed = self.seeds[neighbourHolder][0]
@@ -959,14 +981,10 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                 else:
                                                     continue
                                             except KeyError:
-                                                try:
-                                                    neighbourHolder = int(neighbourHolder)
-                                                    targetHolderSeed = self.seeds[int(neighbourHolder)][0]
-                                                except KeyError:
-                                                    if self.useSingle:
-                                                        targetHolderSeed = False
-                                                    else:
-                                                        continue
+                                                if self.useSingle:
+                                                    targetHolderSeed = False
+                                                else:
+                                                    continue
                                             # Get holder total area
                                             neighbourHolderTotalArea = holdersLocalTotalArea[neighbourHolder]
                                             # Get holders holdings
@@ -979,10 +997,24 @@ class PolygonGrouper(QgsProcessingAlgorithm):
 
                                                 neighbourTargetFeatureId = nghfeat.attribute(self.idAttribute)
                                                 if neighbourTargetFeatureId in localChangables:
-                                                    if not targetHolderSeed:
+                                                    # Skip the pairs, which gave no swap with the same input before
+                                                    pairKey = (holder, seed, neighbourTargetFeatureId, neighbourHolder)
+                                                    pairSignature = (tuple(filteredHolderHoldingsIds), tuple(filteredNeighbourHoldingsIds), holderTotalArea, neighbourHolderTotalArea,
+                                                                     self.totalDistances.get(holder), self.totalDistances.get(neighbourHolder), targetHolderSeed)
+                                                    pairMemo = holderDeadline is None and self.isHolding(targetHolderSeed)
+                                                    if pairMemo and self.infeasiblePairs.known(pairKey, holder, neighbourHolder, pairSignature):
+                                                        continue
+                                                    holderAreas = sorted([self.holdingsWithArea[holdingId] for holdingId in filteredHolderHoldingsIds])
+                                                    if holderAreas[0] >= 0:
+                                                        holderAreaRange = (holderAreas[0], sum(holderAreas[-10:]))
+                                                    else:
+                                                        holderAreaRange = (-math.inf, math.inf)
+                                                    if not self.isHolding(targetHolderSeed):
                                                         neighbourHoldingsCombinations = [[neighbourTargetFeatureId]]
                                                     else: 
-                                                        neighbourHoldingsCombinations = self.combine_with_constant_in_all(filteredNeighbourHoldingsIds, neighbourTargetFeatureId)
+                                                        neighbourMinimalArea, neighbourMaximalArea = self.areaWindow(holder, holderTotalArea, neighbourHolder, neighbourHolderTotalArea, holderAreaRange, False)
+                                                        neighbourHoldingsCombinations = list(self.combine_with_constant_in_all(filteredNeighbourHoldingsIds, neighbourTargetFeatureId, neighbourMinimalArea, neighbourMaximalArea))
+                                                    holderMinimalArea, holderMaximalArea = self.areaWindow(holder, holderTotalArea, neighbourHolder, neighbourHolderTotalArea, self.combinationAreaRange(neighbourHoldingsCombinations), True)
                                                     holderCombinationForChange = None
                                                     neighbourCombinationForChange = None
                                                     lenTurn = 0
@@ -992,15 +1024,18 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                     for combinationLenght in range(1,len(filteredHolderHoldingsIds) + 1):
                                                         if combinationLenght <= 10:
                                                             combTurn = 0
-                                                            for combination in itertools.combinations(filteredHolderHoldingsIds, combinationLenght):
+                                                            lenghtStart = lenTurn
+                                                            lenghtCombinations = self.combine_with_constant_in_all(filteredHolderHoldingsIds, None, holderMinimalArea, holderMaximalArea, [combinationLenght])
+                                                            for combinationRank, combination in lenghtCombinations.ranked():
                                                                 if self.simply:
-                                                                    if combTurn < 10000*combinationLenght and lenTurn < 20000:
-                                                                        lenTurn += 1
+                                                                    # The pruned combinations before this one count into the cap, as in the full enumeration
+                                                                    if self.searchAllowed(holderDeadline, combTurn, combinationLenght, lenghtStart + combinationRank):
+                                                                        lenTurn = lenghtStart + combinationRank + 1
                                                                         temporaryHolderArea = self.calculateCombinationArea(combination)
                                                                         for neighbourCombination in neighbourHoldingsCombinations:
                                                                             if self.strict:
                                                                                 #Distance conditions
-                                                                                if self.useSingle and not targetHolderSeed:
+                                                                                if self.useSingle and not self.isHolding(targetHolderSeed):
                                                                                     holderMaxDistance = self.maxDistance(combination, seed, layer)
                                                                                     holderAvgDistanceOld = self.avgDistance(combination, seed, layer)
                                                                                     holderAvgDistanceNew = self.avgDistance(neighbourCombination, seed, layer)
@@ -1054,11 +1089,13 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                                     else:
                                                                         break
                                                                 else:
+                                                                    if deadlinePassed(holderDeadline):
+                                                                        break
                                                                     temporaryHolderArea = self.calculateCombinationArea(combination)
                                                                     for neighbourCombination in neighbourHoldingsCombinations:
                                                                         if self.strict:
                                                                             #Distance conditions
-                                                                            if self.useSingle and not targetHolderSeed:
+                                                                            if self.useSingle and not self.isHolding(targetHolderSeed):
                                                                                 holderMaxDistance = self.maxDistance(combination, seed, layer)
                                                                                 holderAvgDistanceOld = self.avgDistance(combination, seed, layer)
                                                                                 holderAvgDistanceNew = self.avgDistance(neighbourCombination, seed, layer)
@@ -1107,7 +1144,12 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                                                             holderNewTotalArea = newHolderTotalArea
                                                                                             neighbourNewTotalArea = newNeighbourTotalArea
                                                                                             totalAreaDifference = difference
+                                                            if self.simply and combTurn < 10000*combinationLenght:
+                                                                # The pruned combinations after the last checked one count as well, until the cap
+                                                                lenTurn = min(lenghtStart + lenghtCombinations.count(), 20000)
 
+                                                    if pairMemo and not (holderCombinationForChange and neighbourCombinationForChange):
+                                                        self.infeasiblePairs.record(pairKey, holder, neighbourHolder, pairSignature)
                                                     if holderCombinationForChange and neighbourCombinationForChange:
                                                         self.setAttributeValues(layer, holder, neighbourHolder, holderCombinationForChange, neighbourCombinationForChange)
                                                         if self.stats:
@@ -1116,19 +1158,19 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                         if len(holderCombinationForChange) > 1 and len(neighbourCombinationForChange) > 1:
                                                             #many to many change
                                                             for holding in holderCombinationForChange:
-                                                                localChangables.pop(localChangables.index(holding))
+                                                                localChangables.remove(holding)
                                                                 changesIds.append(holding)
                                                                 self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[holding]
                                                                 self.holdingWithSeedDistance[holding] = self.distanceMatrix[targetHolderSeed][holding]
                                                                 self.totalDistances[neighbourHolder] += self.holdingWithSeedDistance[holding]
                                                             for ngh in neighbourCombinationForChange:
-                                                                localChangables.pop(localChangables.index(ngh))
+                                                                localChangables.remove(ngh)
                                                                 changesIds.append(ngh)
                                                                 self.totalDistances[neighbourHolder] = self.totalDistances[neighbourHolder] - self.holdingWithSeedDistance[ngh]
                                                                 self.holdingWithSeedDistance[ngh] = self.distanceMatrix[seed][ngh]
                                                                 self.totalDistances[holder] += self.holdingWithSeedDistance[ngh]
-                                                            self.globalChangables.pop(self.globalChangables.index(neighbourTargetFeatureId))
-                                                            self.seeds[holder].append(neighbourTargetFeatureId)
+                                                            self.globalChangables.remove(neighbourTargetFeatureId)
+                                                            self.addSeed(holder, neighbourTargetFeatureId)
                                                             holdersLocalTotalArea[holder] = holderNewTotalArea
                                                             holdersLocalTotalArea[neighbourHolder] = neighbourNewTotalArea
                                                             commitMessage = f'Change {str(self.counter)} for {neighbourTargetFeatureId} (holder:{neighbourHolder}) as neighbour of {seed} (holder:{holder}): {holderCombinationForChange} for {neighbourCombinationForChange}'
@@ -1138,14 +1180,14 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                             #many to one change
                                                             if len(holderCombinationForChange) > 1:
                                                                 for hold in holderCombinationForChange:
-                                                                    localChangables.pop(localChangables.index(hold))
+                                                                    localChangables.remove(hold)
                                                                     changesIds.append(hold)
                                                                     self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[hold] 
-                                                                    if targetHolderSeed:
+                                                                    if self.isHolding(targetHolderSeed):
                                                                         self.holdingWithSeedDistance[hold] = self.distanceMatrix[targetHolderSeed][hold]
                                                                     else:
                                                                         self.holdingWithSeedDistance[hold] = self.distanceMatrix[neighbourTargetFeatureId][hold]
-                                                                    if targetHolderSeed:
+                                                                    if self.isHolding(targetHolderSeed):
                                                                         self.totalDistances[neighbourHolder] += self.holdingWithSeedDistance[hold]
                                                                     else:
                                                                         if self.useSingle:
@@ -1154,9 +1196,9 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                                             except KeyError:
                                                                                 self.totalDistances[neighbourHolder] = 0
                                                                                 self.totalDistances[neighbourHolder] = self.holdingWithSeedDistance[hold]
-                                                                localChangables.pop(localChangables.index(neighbourTargetFeatureId))
+                                                                localChangables.remove(neighbourTargetFeatureId)
                                                                 changesIds.append(neighbourTargetFeatureId)
-                                                                if targetHolderSeed:
+                                                                if self.isHolding(targetHolderSeed):
                                                                     self.totalDistances[neighbourHolder] = self.totalDistances[neighbourHolder] - self.holdingWithSeedDistance[neighbourTargetFeatureId]
                                                                 else:
                                                                     if self.useSingle:
@@ -1165,18 +1207,18 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                                 self.totalDistances[holder] += self.holdingWithSeedDistance[neighbourTargetFeatureId]
                                                             else:
                                                                 for ngh in neighbourCombinationForChange:
-                                                                    localChangables.pop(localChangables.index(ngh))
+                                                                    localChangables.remove(ngh)
                                                                     changesIds.append(ngh)
                                                                     self.totalDistances[neighbourHolder] = self.totalDistances[neighbourHolder] - self.holdingWithSeedDistance[ngh] 
                                                                     self.holdingWithSeedDistance[ngh] = self.distanceMatrix[seed][ngh]
                                                                     self.totalDistances[holder] += self.holdingWithSeedDistance[ngh]
-                                                                localChangables.pop(localChangables.index(holderCombinationForChange[0]))
+                                                                localChangables.remove(holderCombinationForChange[0])
                                                                 changesIds.append(holderCombinationForChange[0])
                                                                 self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[holderCombinationForChange[0]] 
                                                                 self.holdingWithSeedDistance[holderCombinationForChange[0]] = self.distanceMatrix[targetHolderSeed][holderCombinationForChange[0]]
                                                                 self.totalDistances[neighbourHolder] += self.holdingWithSeedDistance[holderCombinationForChange[0]]
-                                                            self.globalChangables.pop(self.globalChangables.index(neighbourTargetFeatureId))
-                                                            self.seeds[holder].append(neighbourTargetFeatureId)
+                                                            self.globalChangables.remove(neighbourTargetFeatureId)
+                                                            self.addSeed(holder, neighbourTargetFeatureId)
                                                             holdersLocalTotalArea[holder] = holderNewTotalArea
                                                             holdersLocalTotalArea[neighbourHolder] = neighbourNewTotalArea
                                                             commitMessage = f'Change {str(self.counter)} for {neighbourTargetFeatureId} (holder:{neighbourHolder}) as neighbour of {seed} (holder:{holder}): {holderCombinationForChange} for {neighbourCombinationForChange}'
@@ -1184,17 +1226,17 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                             feedback.pushInfo(commitMessage)
                                                         else:
                                                             #one to one change
-                                                            localChangables.pop(localChangables.index(neighbourTargetFeatureId))
-                                                            localChangables.pop(localChangables.index(holderCombinationForChange[0]))
+                                                            localChangables.remove(neighbourTargetFeatureId)
+                                                            localChangables.remove(holderCombinationForChange[0])
                                                             changesIds.append(holderCombinationForChange[0])
                                                             changesIds.append(neighbourTargetFeatureId)
-                                                            self.globalChangables.pop(self.globalChangables.index(neighbourTargetFeatureId))
-                                                            self.seeds[holder].append(neighbourTargetFeatureId)
+                                                            self.globalChangables.remove(neighbourTargetFeatureId)
+                                                            self.addSeed(holder, neighbourTargetFeatureId)
                                                             self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[holderCombinationForChange[0]] + self.distanceMatrix[seed][neighbourTargetFeatureId]
-                                                            if targetHolderSeed:
+                                                            if self.isHolding(targetHolderSeed):
                                                                 self.totalDistances[neighbourHolder] = self.totalDistances[neighbourHolder] - self.holdingWithSeedDistance[neighbourTargetFeatureId] + self.distanceMatrix[targetHolderSeed][holderCombinationForChange[0]]
                                                             self.holdingWithSeedDistance[neighbourTargetFeatureId] = self.distanceMatrix[seed][neighbourTargetFeatureId]
-                                                            if targetHolderSeed:
+                                                            if self.isHolding(targetHolderSeed):
                                                                 self.holdingWithSeedDistance[holderCombinationForChange[0]] = self.distanceMatrix[targetHolderSeed][holderCombinationForChange[0]]
                                                             else:
                                                                 if self.useSingle:
@@ -1204,7 +1246,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                                             commitMessage = f'Change {str(self.counter)} for {neighbourTargetFeatureId} (holder:{neighbourHolder}) as neighbour of {seed} (holder:{holder}): {holderCombinationForChange} for {neighbourCombinationForChange}'
                                                             logging.debug(commitMessage)
                                                             feedback.pushInfo(commitMessage)
-                                not_changables.extend(changesIds)
+                                not_changables.update(changesIds)
                     elif len(seeds) == 0:
                         continue
             if turn == 1:
@@ -1213,9 +1255,9 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 if changes == 0:
                     changer = False
                 else:
-                    changes = copy.deepcopy(self.counter)
+                    changes = self.counter
             elif self.algorithmIndex == 3 and changes == 1 and turn <= (self.steps/2)-2:
-                changes = copy.deepcopy(self.counter)
+                changes = self.counter
                 feedback.pushInfo(f'Changes in turn {turn}: {self.counter}') 
                 logging.debug(f'Changes in turn {turn}: {self.counter}')
             else:
@@ -1223,19 +1265,18 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 feedback.pushInfo(f'Changes in turn {turn}: {self.counter-changes}')
                 if changes == self.counter:
                     changer = False
-                    layer.startEditing()
-                    indexes = []
-                    indexes.append(layer.fields().indexFromName(self.actualIdAttribute))
-                    indexes.append(layer.fields().indexFromName(self.actualHolderAttribute))
-                    layer.deleteAttributes(indexes)
-                    layer.updateFields()
-                    layer.commitChanges()
+                    self.turnHistory.dropTurn()
                 elif (self.algorithmIndex == 0 or self.algorithmIndex == 3) and (turn == self.steps-3):
                     changer = False
                 elif self.algorithmIndex == 2 and turn == (self.steps/2)-3:
                     changer = False
                 else:
-                    changes = copy.deepcopy(self.counter)
+                    changes = self.counter
+            if changer and self.searchBudget.expired():
+                feedback.pushInfo('Time limit reached, no more turns')
+                changer = False
+                # The changes of the turn are kept, so it is the final one
+                self.turnHistory.stop()
             feedback.setCurrentStep(1 + turn)
             feedback.pushInfo(f'Save turn results to the file')
             if feedback.isCanceled():
@@ -1251,15 +1292,37 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 seeds: List, holding ids
         OUTPUTS: QgsVectorLayer
         """
+        evaluator = SwapEvaluator(self.holdingsWithArea, self.distanceMatrix, self.holderRegistry, self.simply)
+        self.swapPool = SwapPool(evaluator, self.workers)
+        self.swapQueue = SwapQueue(self.holderVersions)
+        if self.swapPool.workers > 1:
+            feedback.pushInfo(f'Swaps are evaluated with {self.swapPool.workers} worker processes')
+        try:
+            return self.closerTurns(layer, feedback, seeds, totalAreas)
+        finally:
+            self.swapPool.close()
+            logging.debug(f'Swap queue hits: {self.swapQueue.hits}, misses: {self.swapQueue.misses}, hit rate: {self.swapQueue.hitRate():.2%}')
+
+    def closerTurns(self, layer, feedback, seeds=None, totalAreas=None):
+        """
+        DESCRIPTION: Make the turns of the closer function, the swaps of each holder's targets are evaluated by the swap pool
+        INPUTS:
+                layer: QgsVectorLayer
+                feedback: QgsProcessingMultiStepFeedback
+                seeds: List, holding ids
+                totalAreas: Dictionary, optional, actual total areas of the holders
+        OUTPUTS: QgsVectorLayer
+        """
         #import ptvsd
         #ptvsd.debug_this_thread()
         changes = 1
         changer = True
 
         if seeds:
-            self.seeds = seeds
+            self.setSeeds(seeds)
             turn = int(self.actualHolderAttribute.split('_')[0])
-            if self.algorithmIndex == 2:
+            # After a stop by the time limit the actual turn is kept, the next turn continues from it
+            if self.algorithmIndex == 2 and self.turnHistory.finalTurn is None:
                 if turn == (self.steps/2)-3:
                     self.actualHolderAttribute = str(int(self.actualHolderAttribute.split('_')[0])) + self.actualHolderAttribute[2:]
                     self.actualIdAttribute = str(int(self.actualIdAttribute.split('_')[0])) + self.actualIdAttribute[2:]
@@ -1278,38 +1341,30 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         if totalAreas:
             holdersLocalTotalArea = totalAreas
         else:
-            holdersLocalTotalArea = copy.deepcopy(self.holdersTotalArea)
+            holdersLocalTotalArea = self.holdersTotalArea.copy()
         feedback.pushInfo('Closer algorithm started')
 
         while changer:
             turn += 1
             layer = self.setTurnAttributes(layer, turn)
-            localHoldersWithHoldings = copy.deepcopy(self.holdersWithHoldings)
-            localChangables = copy.deepcopy(self.globalChangables)
+            localHoldersWithHoldings = self.holdersWithHoldings.snapshot()
+            localChangables = self.globalChangables.copy()
             feedback.pushInfo(f'Turn {turn}')
-            for holder, holdings in localHoldersWithHoldings.items():
-                if holder != 'NULL':
-                    holderTotalArea = holdersLocalTotalArea[holder]
-                    seedList = self.seeds[holder]
-                    if len(seedList) == 1:
-                        seed = seedList[0]
-                    else:
-                        continue
-                    # List of all holdings, with distance to the current seed
-                    inDistance = self.filteredDistanceMatrix[seed]
-                    # List of holdings, which are not seeds, with distance to the current seed
-                    distanceChanges = self.getChangableHoldings(inDistance)
-                    # List of holder's holdings, which are suitable for change
-                    filteredHolderHoldingsIds = self.idsForChange(holdings, distanceChanges)
-                    filteredHolderHoldingsIds = self.idsForChange(filteredHolderHoldingsIds, localChangables)
-                    filteredHolderHoldingsIds = self.idsForChange(filteredHolderHoldingsIds, self.holdersWithHoldings[holder])
-                    sortedDistances = [(y, x) for y, x in zip(list(inDistance.values()), list(inDistance.keys())) if x in filteredHolderHoldingsIds]
-                    sortedDistances.sort()
-                    filteredHolderHoldingsIds = [key for value, key in sortedDistances[:5]]
-                    minAreaHolding = min([self.holdingsWithArea[hold] for hold in holdings])
-
-                    holderHoldingsCombinations = self.combine_with_constant_in_all(filteredHolderHoldingsIds)
-
+            holderNumber = len(localHoldersWithHoldings)
+            holderTurn = 0
+            for roundHolders in self.closerRounds(localHoldersWithHoldings):
+                if self.searchBudget.expired():
+                    break
+                # The holders of a round do not change each other's input, so their targets are evaluated together
+                prepared = []
+                for holder in roundHolders:
+                    holderTasks = self.closerTasks(holder, localHoldersWithHoldings[holder], localChangables, holdersLocalTotalArea,
+                                                   self.searchBudget.holderDeadline(holderNumber - holderTurn))
+                    holderTurn += 1
+                    if holderTasks is not None:
+                        prepared.append(holderTasks)
+                self.evaluateSwaps(prepared)
+                for holder, seed, tasks in prepared:
                     tempHolderCombination = None
                     tempTargetCombination = None
                     tempHolderTotalArea = None
@@ -1317,133 +1372,13 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                     targetHolder = None
                     measure = None
 
-                    filteredLocalChangables = []
-                    for distance in distanceChanges:
-                        if distance not in filteredHolderHoldingsIds and distance in localChangables:
-                            filteredLocalChangables.append(distance)
-
-                    targetHolders = []
-                    for changable in filteredLocalChangables:
-                        for allHolder, allHoldings in self.holdersWithHoldings.items():
-                            if changable in allHoldings and allHolder not in targetHolders and allHolder != 'NULL' and holdersLocalTotalArea[allHolder] > minAreaHolding:
-                                targetHolders.append(allHolder)
-                    if self.simply:
-                        if len(targetHolders) > 50:
-                            targetHolders = random.choices(targetHolders, k=50)
-
-                    for tempTargetHolder in targetHolders:
-                        targetHolderSeed = self.seeds[tempTargetHolder]
-                        if len(targetHolderSeed) > 0:
-                            targetHolderSeed = self.seeds[tempTargetHolder][0]
-                            filteredLocalTargetHoldings = [hold for hold in self.holdersWithHoldings[tempTargetHolder] if
-                                                            hold in filteredLocalChangables and hold != targetHolderSeed]
-                            
-                            targetAllCombinations = self.combine_with_constant_in_all(filteredLocalTargetHoldings)
-                            targetCombinations = []
-                            originCombinations = []
-                            combTurn = 0
-                            for sortedCombination in targetAllCombinations:
-                                if self.simply:
-                                    if combTurn < 200000:
-                                        combTurn += 1
-                                    else:
-                                        break
-                                targetMaxDistance = self.maxDistance(sortedCombination, targetHolderSeed, layer)
-                                targetAvgDistanceOld = self.avgDistance(sortedCombination, targetHolderSeed, layer)
-                                for holderCombination in holderHoldingsCombinations:
-                                    holderMaxDistance = self.maxDistance(holderCombination, seed, layer)
-                                    holderAvgDistanceOld = self.avgDistance(holderCombination, seed, layer)
-                                    holderAvgDistanceNew = self.avgDistance(sortedCombination, seed, layer)
-                                    targetAvgDistanceNew = self.avgDistance(holderCombination, targetHolderSeed, layer)
-                                    targetCloser = self.isCloser(holderMaxDistance, sortedCombination, seed, holder)
-                                    holderCloser = self.isCloser(targetMaxDistance, holderCombination, targetHolderSeed, tempTargetHolder)
-                                    if targetCloser and holderCloser:
-                                        if (targetAvgDistanceNew < targetAvgDistanceOld) and (holderAvgDistanceNew < holderAvgDistanceOld):
-                                            targetCombinations.append(sortedCombination)
-                                            originCombinations.append(holderCombination)                                     
-
-                            if len(originCombinations) > 0 and len(targetCombinations) > 0:
-                                for turned, targetCombination in enumerate(targetCombinations):
-                                    holderCombination = originCombinations[turned]
-                                    newHolderTotalArea = holderTotalArea - self.calculateCombinationArea(holderCombination) + self.calculateCombinationArea(targetCombination)
-                                    if self.checkTotalAreaThreshold(newHolderTotalArea, holder):
-                                        newTargetTotalArea = holdersLocalTotalArea[tempTargetHolder] - self.calculateCombinationArea(targetCombination) + self.calculateCombinationArea(holderCombination)
-                                        if self.checkTotalAreaThreshold(newTargetTotalArea, tempTargetHolder):
-                                            localMeasure = sum([self.calculateCompositeNumber(seed, tempId) for tempId in holderCombination])
-                                            holderNewHoldignNum = self.holdersHoldingNumber[holder] - len(holderCombination) + len(targetCombination)
-                                            targetNewHoldingNum = self.holdersHoldingNumber[tempTargetHolder] - len(targetCombination) + len(holderCombination)
-                                            if holderNewHoldignNum <= self.holdersHoldingNumber[holder] and targetNewHoldingNum <= self.holdersHoldingNumber[tempTargetHolder]:
-                                                if not measure:
-                                                    targetHolder = copy.copy(tempTargetHolder)
-                                                    tempHolderCombination = copy.copy(holderCombination)
-                                                    tempTargetCombination = copy.copy(targetCombination)
-                                                    measure = copy.copy(localMeasure)
-                                                    tempHolderTotalArea = copy.copy(newHolderTotalArea)
-                                                    tempTargetTotalArea = copy.copy(newTargetTotalArea)
-                                                else:
-                                                    if measure < localMeasure:
-                                                        targetHolder = copy.copy(tempTargetHolder)
-                                                        tempHolderCombination = copy.copy(holderCombination)
-                                                        tempTargetCombination = copy.copy(targetCombination)
-                                                        measure = copy.copy(localMeasure)
-                                                        tempHolderTotalArea = copy.copy(newHolderTotalArea)
-                                                        tempTargetTotalArea = copy.copy(newTargetTotalArea)
-                        else:
-                            if self.useSingle:
-                                if self.onlySelected:
-                                    if tempTargetHolder not in self.selectedHolders:
-                                        continue
-                                filteredLocalTargetHoldings = [hold for hold in self.holdersWithHoldings[tempTargetHolder] if
-                                                                hold in filteredLocalChangables]
-                                
-                                targetAllCombinations = self.combine_with_constant_in_all(filteredLocalTargetHoldings)
-                                targetCombinations = []
-                                originCombinations = []
-                                combTurn = 0
-                                for sortedCombination in targetAllCombinations:
-                                    if self.simply:
-                                        if combTurn < 200000:
-                                            combTurn += 1
-                                        else:
-                                            break
-                                    for holderCombination in holderHoldingsCombinations:
-                                        holderMaxDistance = self.maxDistance(holderCombination, seed, layer)
-                                        holderAvgDistanceOld = self.avgDistance(holderCombination, seed, layer)
-                                        holderAvgDistanceNew = self.avgDistance(sortedCombination, seed, layer)
-                                        targetCloser = self.isCloser(holderMaxDistance, sortedCombination, seed, holder)
-                                        holderCloser = True
-                                        if targetCloser and holderCloser:
-                                            if holderAvgDistanceNew < holderAvgDistanceOld:
-                                                targetCombinations.append(sortedCombination)
-                                                originCombinations.append(holderCombination)                                     
-
-                                if len(originCombinations) > 0 and len(targetCombinations) > 0:
-                                    for turned, targetCombination in enumerate(targetCombinations):
-                                        holderCombination = originCombinations[turned]
-                                        newHolderTotalArea = holderTotalArea - self.calculateCombinationArea(holderCombination) + self.calculateCombinationArea(targetCombination)
-                                        if self.checkTotalAreaThreshold(newHolderTotalArea, holder):
-                                            newTargetTotalArea = holdersLocalTotalArea[tempTargetHolder] - self.calculateCombinationArea(targetCombination) + self.calculateCombinationArea(holderCombination)
-                                            if self.checkTotalAreaThreshold(newTargetTotalArea, tempTargetHolder):
-                                                localMeasure = sum([self.calculateCompositeNumber(seed, tempId) for tempId in holderCombination])
-                                                holderNewHoldignNum = self.holdersHoldingNumber[holder] - len(holderCombination) + len(targetCombination)
-                                                targetNewHoldingNum = self.holdersHoldingNumber[tempTargetHolder] - len(targetCombination) + len(holderCombination)
-                                                if holderNewHoldignNum <= self.holdersHoldingNumber[holder] and targetNewHoldingNum <= self.holdersHoldingNumber[tempTargetHolder]:
-                                                    if not measure:
-                                                        targetHolder = copy.copy(tempTargetHolder)
-                                                        tempHolderCombination = copy.copy(holderCombination)
-                                                        tempTargetCombination = copy.copy(targetCombination)
-                                                        measure = copy.copy(localMeasure)
-                                                        tempHolderTotalArea = copy.copy(newHolderTotalArea)
-                                                        tempTargetTotalArea = copy.copy(newTargetTotalArea)
-                                                    else:
-                                                        if measure < localMeasure:
-                                                            targetHolder = copy.copy(tempTargetHolder)
-                                                            tempHolderCombination = copy.copy(holderCombination)
-                                                            tempTargetCombination = copy.copy(targetCombination)
-                                                            measure = copy.copy(localMeasure)
-                                                            tempHolderTotalArea = copy.copy(newHolderTotalArea)
-                                                            tempTargetTotalArea = copy.copy(newTargetTotalArea)
-
+                    targetSides = {}
+                    for holderSide, targetSide in tasks:
+                        targetSides.setdefault(targetSide['holder'], targetSide)
+                    best = self.swapQueue.best(holder, [targetSide['holder'] for holderSide, targetSide in tasks])
+                    if best is not None:
+                        targetHolder, (measure, tempHolderCombination, tempTargetCombination, tempHolderTotalArea, tempTargetTotalArea) = best
+                        filteredLocalTargetHoldings = targetSides[targetHolder]['holdings']
                     if measure:
                         targetHolderSeed = self.seeds[targetHolder]
                         if len(targetHolderSeed) > 0:
@@ -1460,12 +1395,12 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                         if len(tempHolderCombination) > 1 and len(tempTargetCombination) > 1:
                             #many to many change
                             for hold in tempHolderCombination:
-                                localChangables.pop(localChangables.index(hold))
+                                localChangables.remove(hold)
                                 self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[hold]
                                 self.holdingWithSeedDistance[hold] = self.distanceMatrix[targetHolderSeed][hold]
                                 self.totalDistances[targetHolder] += self.holdingWithSeedDistance[hold]
                             for ch in tempTargetCombination:
-                                localChangables.pop(localChangables.index(ch))
+                                localChangables.remove(ch)
                                 self.totalDistances[targetHolder] = self.totalDistances[targetHolder] - self.holdingWithSeedDistance[ch]
                                 self.holdingWithSeedDistance[ch] = self.distanceMatrix[seed][ch]
                                 self.totalDistances[holder] += self.holdingWithSeedDistance[ch]
@@ -1478,15 +1413,15 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                             #many to one change
                             if len(tempHolderCombination) > 1:
                                 for hold in tempHolderCombination:
-                                    localChangables.pop(localChangables.index(hold))
+                                    localChangables.remove(hold)
                                     self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[hold]
-                                    if targetHolderSeed:
+                                    if self.isHolding(targetHolderSeed):
                                         self.holdingWithSeedDistance[hold] = self.distanceMatrix[targetHolderSeed][hold]
                                     else:
                                         if self.useSingle:
                                             self.holdingWithSeedDistance[hold] = self.distanceMatrix[tempTargetCombination[0]][hold]
                                     self.totalDistances[targetHolder] += self.holdingWithSeedDistance[hold]
-                                localChangables.pop(localChangables.index(tempTargetCombination[0]))
+                                localChangables.remove(tempTargetCombination[0])
                                 self.totalDistances[targetHolder] = self.totalDistances[targetHolder] - self.holdingWithSeedDistance[tempTargetCombination[0]]
                                 self.holdingWithSeedDistance[tempTargetCombination[0]] = self.distanceMatrix[seed][tempTargetCombination[0]]
                                 self.totalDistances[holder] += self.holdingWithSeedDistance[tempTargetCombination[0]]
@@ -1495,11 +1430,11 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                                 feedback.pushInfo(commitMessage)
                             else:
                                 for ch in tempTargetCombination:
-                                    localChangables.pop(localChangables.index(ch))
+                                    localChangables.remove(ch)
                                     self.totalDistances[targetHolder] = self.totalDistances[targetHolder] - self.holdingWithSeedDistance[ch] 
                                     self.holdingWithSeedDistance[ch] = self.distanceMatrix[seed][ch]
                                     self.totalDistances[holder] += self.holdingWithSeedDistance[ch]
-                                localChangables.pop(localChangables.index(tempHolderCombination[0]))
+                                localChangables.remove(tempHolderCombination[0])
                                 self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[tempHolderCombination[0]]
                                 self.holdingWithSeedDistance[tempHolderCombination[0]] = self.distanceMatrix[targetHolderSeed][tempHolderCombination[0]]
                                 self.totalDistances[targetHolder] += self.holdingWithSeedDistance[tempHolderCombination[0]]
@@ -1510,13 +1445,13 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                             holdersLocalTotalArea[targetHolder] = tempTargetTotalArea
                         else:
                             #one to one change
-                            localChangables.pop(localChangables.index(tempTargetCombination[0]))
-                            localChangables.pop(localChangables.index(tempHolderCombination[0]))
+                            localChangables.remove(tempTargetCombination[0])
+                            localChangables.remove(tempHolderCombination[0])
                             self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[tempHolderCombination[0]] + self.distanceMatrix[seed][tempTargetCombination[0]]
-                            if targetHolderSeed:
+                            if self.isHolding(targetHolderSeed):
                                 self.totalDistances[targetHolder] = self.totalDistances[targetHolder] - self.holdingWithSeedDistance[tempTargetCombination[0]] + self.distanceMatrix[targetHolderSeed][tempHolderCombination[0]]
                             self.holdingWithSeedDistance[tempTargetCombination[0]] = self.distanceMatrix[seed][tempTargetCombination[0]]
-                            if targetHolderSeed:
+                            if self.isHolding(targetHolderSeed):
                                 self.holdingWithSeedDistance[tempHolderCombination[0]] = self.distanceMatrix[targetHolderSeed][tempHolderCombination[0]]
                             else:
                                 if self.useSingle:
@@ -1540,7 +1475,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                     changer = False
                     return None
                 else:
-                    changes = copy.deepcopy(self.counter)
+                    changes = self.counter
                     self.filterTouchinFeatures(layer) 
             else:
                 logging.debug(f'Changes in turn {turn}: {self.counter - changes}')
@@ -1548,13 +1483,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 if changes == self.counter:
                     changer = False
                     if self.algorithmIndex != 3:
-                        layer.startEditing()
-                        indexes = []
-                        indexes.append(layer.fields().indexFromName(self.actualIdAttribute))
-                        indexes.append(layer.fields().indexFromName(self.actualHolderAttribute))
-                        layer.deleteAttributes(indexes)
-                        layer.updateFields()
-                        layer.commitChanges()
+                        self.turnHistory.dropTurn()
                 elif (self.algorithmIndex == 1 or self.algorithmIndex == 2) and (turn == self.steps-3):
                     self.filterTouchinFeatures(layer)
                     changer = False
@@ -1562,108 +1491,333 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                     self.filterTouchinFeatures(layer)
                     changer = False
                 else:
-                    changes = copy.deepcopy(self.counter)
+                    changes = self.counter
                     self.filterTouchinFeatures(layer)
+            if changer and self.searchBudget.expired():
+                feedback.pushInfo('Time limit reached, no more turns')
+                changer = False
+                # The changes of the turn are kept, so it is the final one
+                self.turnHistory.stop()
             feedback.setCurrentStep(1+turn)
             feedback.pushInfo('Save turn results to the file')
 
         return layer, holdersLocalTotalArea
 
-    def createNewAttribute(self, layer, turn, adj, typer=QVariant.String, lenght=50):
+    def closerRounds(self, holders):
         """
-        DESCRIPTION: Create new attribute field in a layer
+        DESCRIPTION: Give the holders of a closer turn in rounds. Without parallel rounds every holder is a round, in the order of the holders. With parallel rounds the holders are coloured by their conflicts (see HolderConflicts) and the colour classes are the rounds; the holders of a class, which got in conflict because of the swaps of the earlier rounds, go to the next round. The result is the same as the holders' swaps one by one, in the order of the rounds (logged for every round)
+        INPUTS:
+                holders: Iterable, holder ids
+        OUTPUTS: Generator, Lists of holder ids
+        """
+        order = list(holders)
+        if not self.parallelRounds:
+            for holder in order:
+                yield [holder]
+            return
+        colourClasses = collections.deque(HolderConflicts({holder: self.swapInvolvement(holder) for holder in order}).colourClasses(order))
+        roundNumber = 0
+        while colourClasses:
+            colourClass = colourClasses.popleft()
+            # The conflicts are checked again with the actual holders of the holdings
+            roundHolders, deferred = HolderConflicts({holder: self.swapInvolvement(holder) for holder in colourClass}).split(colourClass)
+            if deferred:
+                colourClasses.appendleft(deferred)
+            roundNumber += 1
+            logging.debug(f'Round {roundNumber}: {roundHolders}')
+            yield roundHolders
+
+    def swapInvolvement(self, holder):
+        """
+        DESCRIPTION: Get the holders, whose holdings or total area are read or changed by the closer swaps of a holder: the holder and the holders of the holdings inside the distance threshold of its seed
+        INPUTS:
+                holder: String, holder id
+        OUTPUTS: Set, holder ids, empty if the holder makes no swap
+        """
+        seedList = self.seeds[holder]
+        if holder == 'NULL' or len(seedList) != 1:
+            return set()
+        involved = {holder}
+        for holdingId in self.filteredDistanceMatrix[seedList[0]].keys():
+            involved.add(self.ownerComponents.holder(holdingId))
+        # The holdings without holder are never swapped
+        involved.discard('NULL')
+        return involved
+
+    def closerTasks(self, holder, holdings, localChangables, holdersLocalTotalArea, deadline):
+        """
+        DESCRIPTION: Collect the swap evaluations of a holder's targets for the closer function
+        INPUTS:
+                holder: String, holder id
+                holdings: List, holding ids of the holder at the start of the turn
+                localChangables: HoldingMask, holding ids, which can be changed in the turn
+                holdersLocalTotalArea: Dictionary, actual total areas of the holders
+                deadline: Numeric, deadline of the holder's search, None without time limit
+        OUTPUTS: Tuple, holder id, seed and List of the holder and target sides of the evaluations; None if the holder makes no swap
+        """
+        if holder == 'NULL':
+            return None
+        holderTotalArea = holdersLocalTotalArea[holder]
+        seedList = self.seeds[holder]
+        if len(seedList) == 1:
+            seed = seedList[0]
+        else:
+            return None
+        # List of all holdings, with distance to the current seed
+        inDistance = self.filteredDistanceMatrix[seed]
+        # List of holdings, which are not seeds, with distance to the current seed
+        distanceChanges = self.getChangableHoldings(inDistance)
+        # List of holder's holdings, which are suitable for change
+        filteredHolderHoldingsIds = self.idsForChange(holdings, distanceChanges)
+        filteredHolderHoldingsIds = self.idsForChange(filteredHolderHoldingsIds, localChangables)
+        filteredHolderHoldingsIds = self.idsForChange(filteredHolderHoldingsIds, self.holdersWithHoldings[holder])
+        sortedDistances = [(y, x) for y, x in zip(list(inDistance.values()), list(inDistance.keys())) if x in filteredHolderHoldingsIds]
+        sortedDistances.sort()
+        filteredHolderHoldingsIds = [key for value, key in sortedDistances[:5]]
+        minAreaHolding = min([self.holdingsWithArea[hold] for hold in holdings])
+
+        filteredLocalChangables = []
+        for distance in distanceChanges:
+            if distance not in filteredHolderHoldingsIds and distance in localChangables:
+                filteredLocalChangables.append(distance)
+
+        targetHolders = self.ownerComponents.holdersOf(filteredLocalChangables, ['NULL'], holdersLocalTotalArea, minAreaHolding)
+        if self.simply:
+            if len(targetHolders) > 50:
+                targetHolders = random.choices(targetHolders, k=50)
+
+        holderSide = {'holder': holder, 'seed': seed, 'holdings': filteredHolderHoldingsIds, 'totalArea': holderTotalArea,
+                      'totalDistance': self.totalDistances[holder], 'holdingNumber': self.holdersHoldingNumber[holder],
+                      'deadline': deadline}
+        tasks = []
+        for tempTargetHolder in targetHolders:
+            if len(filteredHolderHoldingsIds) == 0:
+                break
+            targetHolderSeed = self.seeds[tempTargetHolder]
+            if len(targetHolderSeed) > 0:
+                targetHolderSeed = self.seeds[tempTargetHolder][0]
+                filteredLocalTargetHoldings = [hold for hold in self.holdersWithHoldings[tempTargetHolder] if
+                                                hold in filteredLocalChangables and hold != targetHolderSeed]
+            else:
+                if not self.useSingle:
+                    continue
+                if self.onlySelected:
+                    if tempTargetHolder not in self.selectedHolders:
+                        continue
+                targetHolderSeed = None
+                filteredLocalTargetHoldings = [hold for hold in self.holdersWithHoldings[tempTargetHolder] if
+                                                hold in filteredLocalChangables]
+            targetSide = {'holder': tempTargetHolder, 'seed': targetHolderSeed, 'holdings': filteredLocalTargetHoldings, 'totalArea': holdersLocalTotalArea[tempTargetHolder],
+                          'totalDistance': self.totalDistances.get(tempTargetHolder), 'holdingNumber': self.holdersHoldingNumber[tempTargetHolder]}
+            tasks.append((holderSide, targetSide))
+        return holder, seed, tasks
+
+    def evaluateSwaps(self, prepared):
+        """
+        DESCRIPTION: Evaluate the targets of holders in one call of the swap pool. Only the targets with changed input are evaluated, the others are reused from the swap queue
+        INPUTS:
+                prepared: List, tuples of holder id, seed and List of the evaluations (see closerTasks)
+        OUTPUTS: None, the results are kept in the swap queue
+        """
+        pendingHolders = []
+        pendingTasks = []
+        pendingSignatures = []
+        for holder, seed, tasks in prepared:
+            for holderSide, targetSide in tasks:
+                signature = self.swapQueue.signature(holderSide, targetSide)
+                if not self.swapQueue.lookup(holder, targetSide['holder'], signature):
+                    pendingHolders.append(holder)
+                    pendingTasks.append((holderSide, targetSide))
+                    # The results cut by the time limit are not reused
+                    pendingSignatures.append(signature if holderSide['deadline'] is None else None)
+        for holder, (holderSide, targetSide), signature, result in zip(pendingHolders, pendingTasks, pendingSignatures, self.swapPool.evaluate(pendingTasks)):
+            self.swapQueue.store(holder, targetSide['holder'], signature, result)
+
+    def createNewAttribute(self, layer, turn, adj, existing=None):
+        """
+        DESCRIPTION: Create the name of a new turn column, which is not used in the layer nor in the turn history
         INPUTS:
                 layer: QgsVectorLayer
                 turn: Integer
                 adj: String
-                typer: QVariant
-                lenght: Integer
+                existing: List, other names to avoid
         OUTPUTS: 
                 layer: QgsVectorLayer
                 fieldName: String
         """
-        #import ptvsd
-        #ptvsd.debug_this_thread()
         fieldName = f'{turn}_{adj}'
-        layerAttributes = self.getAttributesNames(layer)
+        layerAttributes = self.getAttributesNames(layer) + self.turnHistory.names()
+        if existing:
+            layerAttributes.extend(existing)
         if fieldName in layerAttributes:
             counter = 0
             while fieldName in layerAttributes:
                 fieldName = f"{fieldName}{counter}"
                 counter += 1
-        layer.startEditing()
-        dataProvider = layer.dataProvider()
-        if typer == QVariant.Int:
-            dataProvider.addAttributes([QgsField(fieldName, typer)])
-        else:
-            dataProvider.addAttributes([QgsField(fieldName, typer, len=lenght)])
-        layer.updateFields()
-        layer.commitChanges()
         return layer, fieldName
 
     def setNewAttribute(self, layer, featureId, newValue, field):
         """
-        DESCRIPTION: Set the value of a field in a layer
+        DESCRIPTION: Set the value of a field in a layer. The value is stored in the turn history, only the final columns are written to the layer
         INPUTS:
                 layer: QgsVectorLayer
-                featureId: Integer
+                featureId: String, holding id
                 newValue: String or Integer
                 field: String, attribute name
         OUTPUTS: None
         """
-        expression = ''
-        expression += f'"{self.idAttribute}" = \'{featureId}\''
-        layer.selectByExpression(expression)
-        index = self.getAttributesNames(layer).index(field)
-        layer.startEditing()
-        for feature in layer.selectedFeatures():
-            layer.changeAttributeValue(feature.id(), index, newValue)
-        layer.commitChanges()
+        self.turnHistory.setValue(featureId, field, newValue)
 
     def setTurnAttributes(self, layer, turn):
         """
-        DESCRIPTION: Set the values of a fields in a layer
+        DESCRIPTION: Start the columns of a new turn in the turn history, with the holders of the former turn
         INPUTS:
                 layer: QgsVectorLayer
                 turn: Integer
         OUTPUTS: QgsVectorLayer
         """
-        layer, newId = self.createNewAttribute(layer, turn, 'id', lenght=255)
-        layer, newHolder = self.createNewAttribute(layer, turn, 'holder', typer=self.holderAttributeType, lenght=self.holderAttributeLenght)
+        layer, newId = self.createNewAttribute(layer, turn, 'id')
+        layer, newHolder = self.createNewAttribute(layer, turn, 'holder', [newId])
         if turn == 1:
-            layer.startEditing()
-            for feature in layer.getFeatures():
-                layer.changeAttributeValue(feature.id(), self.getAttributesNames(layer).index(newHolder),
-                                           str(feature.attribute(self.holderAttribute)))
-            layer.commitChanges()
+            self.turnHistory.startTurn(newId, newHolder, self.holderAttribute)
         else:
-            layer.startEditing()
-            for feature in layer.getFeatures():
-                layer.changeAttributeValue(feature.id(), self.getAttributesNames(layer).index(newHolder),
-                                           str(feature.attribute(self.actualHolderAttribute)))
-            layer.commitChanges()
+            self.turnHistory.startTurn(newId, newHolder, self.actualHolderAttribute)
         self.actualIdAttribute = newId
         self.actualHolderAttribute = newHolder
         return layer
 
-    def combine_with_constant_in_all(self, elements, constant=None):
+    def createTurnHistory(self, layer):
+        """
+        DESCRIPTION: Create the turn history with the starting holders of the holdings
+        INPUTS:
+                layer: QgsVectorLayer
+        OUTPUTS: TurnHistory
+        """
+        holders = self.featureIndex.column(self.holderAttribute)
+        return TurnHistory(self.distanceMatrix.holdingIds, self.holderAttribute, holders)
+
+    def getFinalAttribute(self, attribute):
+        """
+        DESCRIPTION: Give back the name of the last turn column with change
+        INPUTS:
+                attribute: String, name of the actual turn column
+        OUTPUTS: String
+        """
+        return self.turnHistory.finalName(attribute, self.steps)
+
+    def materialiseTurnAttributes(self, layer):
         """
-        DESCRIPTION: Create of a list with nested lists of all of the possible combinations
+        DESCRIPTION: Create the fields of the final turn in the layer, and write their values from the turn history with one bulk write. Every turn is saved to a .npz file next to the layer
+        INPUTS:
+                layer: QgsVectorLayer
+        OUTPUTS: None
+        """
+        self.turnHistory.save(f'{os.path.splitext(layer.source())[0]}_turns.npz')
+        idName = self.getFinalAttribute(self.actualIdAttribute)
+        holderName = self.getFinalAttribute(self.actualHolderAttribute)
+        if holderName not in self.turnHistory.holderColumns or idName not in self.turnHistory.labelColumns:
+            return
+        if self.holderAttributeType == QVariant.Int:
+            holderField = QgsField(holderName, self.holderAttributeType)
+        else:
+            holderField = QgsField(holderName, self.holderAttributeType, len=self.holderAttributeLenght)
+        layer.startEditing()
+        dataProvider = layer.dataProvider()
+        dataProvider.addAttributes([QgsField(idName, QVariant.String, len=255), holderField])
+        layer.updateFields()
+        layer.commitChanges()
+        labels = self.turnHistory.labelColumn(idName)
+        holders = self.turnHistory.holderColumn(holderName)
+        for holdingId, label, holder in zip(self.turnHistory.holdingIds, labels, holders):
+            self.assignments.setValue(holdingId, holderName, holder)
+            if label is not None:
+                self.assignments.setValue(holdingId, idName, label)
+        self.assignments.flush(layer)
+
+    def combine_with_constant_in_all(self, elements, constant=None, minimalArea=None, maximalArea=None, sizes=None):
+        """
+        DESCRIPTION: Create a lazy enumeration of the possible combinations (at most 10 holdings), the combinations outside of the area range are not created
         INPUTS:
                 elements: List of strings,
                 constant: String, optional (need to be in every combination)
-        OUTPUTS: List
+                minimalArea: Numeric, optional, smallest total area of a combination
+                maximalArea: Numeric, optional, largest total area of a combination
+                sizes: List, optional, the enumerated combination lengths (without the constant)
+        OUTPUTS: AreaCombinations, iterable of tuples
         """
-        all_combinations = []
-        for r in range(1, len(elements) + 1):
-            for combination in itertools.combinations(elements, r):
-                if constant:
-                    all_combinations.append(((constant,) + combination))
-                else:
-                    all_combinations.append(combination)
-        # Remove the empty combination, as we want at least one element from `elements`
-        all_combinations = [combo for combo in all_combinations if len(combo) <= 10]
-        return all_combinations
+        return AreaCombinations(elements, self.holdingsWithArea, minimalArea, maximalArea, constant, 10, sizes)
+
+    def limitSearch(self, combinations, deadline):
+        """
+        DESCRIPTION: Limit the enumeration of the target combinations, if there is a time limit before the holder's deadline (the rest of its time is kept for checking the pairs), otherwise at the first 200000 combinations (the pruned ones counted too)
+        INPUTS:
+                combinations: AreaCombinations, combinations of holding ids
+                deadline: Numeric, time in seconds, None without time limit
+        OUTPUTS: Iterable
+        """
+        if deadline is not None:
+            return untilDeadline(combinations, enumerationDeadline(deadline))
+        return combinations.limited(200000)
+
+    def searchAllowed(self, deadline, combinationTurn, combinationLenght, lenghtTurn):
+        """
+        DESCRIPTION: Check if the simplified neighbours search can go on, until the holder's deadline if there is a time limit, otherwise until the fixed combination counts
+        INPUTS:
+                deadline: Numeric, time in seconds, None without time limit
+                combinationTurn: Integer, number of the accepted combinations with the actual length
+                combinationLenght: Integer, actual length of the combinations
+                lenghtTurn: Integer, number of the checked combinations, the pruned ones counted too
+        OUTPUTS: Boolean
+        """
+        if deadline is not None:
+            return not deadlinePassed(deadline)
+        return combinationTurn < 10000*combinationLenght and lenghtTurn < 20000
+
+    def combinationAreaRange(self, combinations):
+        """
+        DESCRIPTION: Give back the smallest and the largest total area of combinations
+        INPUTS:
+                combinations: List, combinations of holding ids
+        OUTPUTS: Tuple, smallest and largest area; infinite and negative infinite, if there is no combination
+        """
+        areas = [self.calculateCombinationArea(combination) for combination in combinations]
+        if not areas:
+            return math.inf, -math.inf
+        return min(areas), max(areas)
+
+    def matchCombinations(self, targetCombinations, holderCombinations, holderAreas, holder, holderArea, targetHolder, targetArea):
+        """
+        DESCRIPTION: Pair the target and the holder combinations, which can pass the area threshold check of the two holders. The holder areas are sorted and searched, while the target combinations are read in one pass
+        INPUTS:
+                targetCombinations: Iterable, combinations of the target holder
+                holderCombinations: List, combinations of the holder
+                holderAreas: List, total area of each holder combination
+                holder: String, holder id
+                holderArea: Numeric, actual total area of the holder
+                targetHolder: String, holder id of the target
+                targetArea: Numeric, actual total area of the target
+        OUTPUTS: Generator, tuples of a target combination and List of the matching holder combinations, in the original orders
+        """
+        lowest, highest = self.holderRegistry.transferWindow(holder, holderArea, targetHolder, targetArea)
+        return AreaMatching(holderCombinations, holderAreas).match(targetCombinations, self.calculateCombinationArea, lowest, highest)
+
+    def areaWindow(self, holder, holderArea, targetHolder, targetArea, otherRange, holderSide):
+        """
+        DESCRIPTION: Calculate the total area range of the combinations of one side of a swap, outside of which the swap can not pass the area threshold check of the two holders
+        INPUTS:
+                holder: String, holder id
+                holderArea: Numeric, actual total area of the holder
+                targetHolder: String, holder id of the target
+                targetArea: Numeric, actual total area of the target
+                otherRange: Tuple, smallest and largest total area of the combinations of the other side
+                holderSide: Boolean, True if the range of the holder's combinations is calculated
+        OUTPUTS: Tuple, smallest and largest total area
+        """
+        lowest, highest = self.holderRegistry.transferWindow(holder, holderArea, targetHolder, targetArea)
+        smallest, largest = otherRange
+        if holderSide:
+            return smallest + lowest, largest + highest
+        return smallest - highest, largest - lowest
 
     def checkTotalAreaThreshold(self, totalArea, holder):
         """
@@ -1673,12 +1827,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 holder: String, holder id
         OUTPUTS: Boolean
         """
-        minimalBound = self.holdersTotalArea[holder] - (self.holdersTotalArea[holder] * (self.tolerance / 100))
-        maximalBound = self.holdersTotalArea[holder] + (self.holdersTotalArea[holder] * (self.tolerance / 100))
-        if maximalBound >= totalArea >= minimalBound:
-            return True
-        else:
-            return False
+        return self.holderRegistry.inBounds(holder, totalArea)
 
     def calculateCombinationArea(self, combinations):
         """
@@ -1713,6 +1862,57 @@ class PolygonGrouper(QgsProcessingAlgorithm):
             isCloserBool = False
         return isCloserBool
 
+    def isCloserThan(self, thresholdDistance, maxDistance, sumDistance, holder):
+        """
+        DESCRIPTION: Check if certain features are closer to the seed than the threshold, from their precalculated maximum and sum of distances
+        INPUTS:
+                thresholdDistance: Numeric
+                maxDistance: Numeric, maximum distance of the features to the seed
+                sumDistance: Numeric, sum of the distances of the features to the seed
+                holder: String, holder id
+        OUTPUTS: Boolean
+        """
+        return not maxDistance > thresholdDistance and not sumDistance > self.totalDistances[holder]
+
+    def distanceSummary(self, featureIds, seed):
+        """
+        DESCRIPTION: Calculate the maximum and the sum of the distances of a list of holdings and the seed polygon
+        INPUTS:
+                featureIds: List, holding ids
+                seed: String, holding id
+        OUTPUTS: Tuple, maximum distance and sum of the distances
+        """
+        maxDistance = 0
+        sumDistance = 0
+        for featureId in featureIds:
+            distance = self.distanceMatrix[seed][featureId]
+            if distance > maxDistance:
+                maxDistance = distance
+            sumDistance += distance
+        return maxDistance, sumDistance
+
+    def seedDistance(self, seed, featureId):
+        """
+        DESCRIPTION: Give back the distance of a holding and the seed polygon
+        INPUTS:
+                seed: String, holding id
+                featureId: String, holding id
+        OUTPUTS: Numeric
+        """
+        try:
+            return self.distanceMatrix[seed][featureId]
+        except KeyError:
+            return self.pairDistances.distance(seed, featureId)
+
+    def combinationAggregates(self, holdingIds):
+        """
+        DESCRIPTION: Precalculate the total area, the distances and the composite numbers of every combination of a few holdings
+        INPUTS:
+                holdingIds: List, holding ids
+        OUTPUTS: CombinationAggregates
+        """
+        return CombinationAggregates(holdingIds, self.holdingsWithArea, self.seedDistance)
+
     def maxDistance(self, featureIds, seed, layer=None):
         """
         DESCRIPTION: Calculate maximum distance of a list of holding and the seed polygon
@@ -1729,18 +1929,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 if distance > maxDistance:
                     maxDistance = distance
             except KeyError:
-                expression = f'"{self.idAttribute}" = \'{seed}\''
-                layer.selectByExpression(expression)
-                featureSeed = layer.selectedFeatures()[0]
-                expression = f'"{self.idAttribute}" = \'{featureId}\''
-                layer.selectByExpression(expression)
-                featureTarget = layer.selectedFeatures()[0]
-                # Get geometries of the features
-                geometrySeed = featureSeed.geometry()
-                geometryTarget = featureTarget.geometry()
-                # Calculate the distance
-                distance = geometrySeed.distance(geometryTarget)
-                self.distanceMatrix[seed][featureId] = distance
+                distance = self.pairDistances.distance(seed, featureId)
                 if distance > maxDistance:
                     maxDistance = distance
         return maxDistance
@@ -1762,18 +1951,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 distance = self.distanceMatrix[seed][featureId]
                 sumDistance += distance
             except KeyError:
-                expression = f'"{self.idAttribute}" = \'{seed}\''
-                layer.selectByExpression(expression)
-                featureSeed = layer.selectedFeatures()[0]
-                expression = f'"{self.idAttribute}" = \'{featureId}\''
-                layer.selectByExpression(expression)
-                featureTarget = layer.selectedFeatures()[0]
-                # Get geometries of the features
-                geometrySeed = featureSeed.geometry()
-                geometryTarget = featureTarget.geometry()
-                # Calculate the distance
-                distance = geometrySeed.distance(geometryTarget)
-                self.distanceMatrix[seed][featureId] = distance
+                distance = self.pairDistances.distance(seed, featureId)
                 sumDistance += distance
         return sumDistance/divider
 
@@ -1800,18 +1978,18 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 tempTargetCombination: List, holding ids
         OUTPUTS: None
         """
+        # The kept evaluations of the two holders are stale from now
+        self.holderVersions.bump(holder, targetHolder)
         if len(tempHolderCombination) > 1 and len(tempTargetCombination) > 1:
             #many to many change
             for hold in tempHolderCombination:
-                self.setNewAttribute(layer, hold, ','.join(tempHolderCombination), self.actualIdAttribute)
+                self.setNewAttribute(layer, hold, ','.join([str(holding) for holding in tempHolderCombination]), self.actualIdAttribute)
                 self.setNewAttribute(layer, hold, targetHolder, self.actualHolderAttribute)
-                self.holdersWithHoldings[holder].pop(self.holdersWithHoldings[holder].index(hold))
-                self.holdersWithHoldings[targetHolder].append(hold)
+                self.holdersWithHoldings.move(hold, holder, targetHolder)
             for ch in tempTargetCombination:
-                self.setNewAttribute(layer, ch, ','.join(tempTargetCombination), self.actualIdAttribute)
+                self.setNewAttribute(layer, ch, ','.join([str(holding) for holding in tempTargetCombination]), self.actualIdAttribute)
                 self.setNewAttribute(layer, ch, holder, self.actualHolderAttribute)
-                self.holdersWithHoldings[targetHolder].pop(self.holdersWithHoldings[targetHolder].index(ch))
-                self.holdersWithHoldings[holder].append(ch)
+                self.holdersWithHoldings.move(ch, targetHolder, holder)
             self.counter += 1
         elif len(tempHolderCombination) > 1 and len(tempTargetCombination) == 1 or len(tempHolderCombination) == 1 and len(tempTargetCombination) > 1:
             #many to one change
@@ -1819,23 +1997,19 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 for hold in tempHolderCombination:
                     self.setNewAttribute(layer, hold, tempTargetCombination[0], self.actualIdAttribute)
                     self.setNewAttribute(layer, hold, targetHolder, self.actualHolderAttribute)
-                    self.holdersWithHoldings[holder].pop(self.holdersWithHoldings[holder].index(hold))
-                    self.holdersWithHoldings[targetHolder].append(hold)
+                    self.holdersWithHoldings.move(hold, holder, targetHolder)
                 self.setNewAttribute(layer, tempTargetCombination[0], holder, self.actualHolderAttribute)
-                self.setNewAttribute(layer, tempTargetCombination[0], ','.join(tempHolderCombination), self.actualIdAttribute)
-                self.holdersWithHoldings[targetHolder].pop(self.holdersWithHoldings[targetHolder].index(tempTargetCombination[0]))
-                self.holdersWithHoldings[holder].append(tempTargetCombination[0])
+                self.setNewAttribute(layer, tempTargetCombination[0], ','.join([str(holding) for holding in tempHolderCombination]), self.actualIdAttribute)
+                self.holdersWithHoldings.move(tempTargetCombination[0], targetHolder, holder)
                 self.counter += 1
             else:
                 for ch in tempTargetCombination:
                     self.setNewAttribute(layer, ch, tempHolderCombination[0], self.actualIdAttribute)
                     self.setNewAttribute(layer, ch, holder, self.actualHolderAttribute)
-                    self.holdersWithHoldings[targetHolder].pop(self.holdersWithHoldings[targetHolder].index(ch))
-                    self.holdersWithHoldings[holder].append(ch)
+                    self.holdersWithHoldings.move(ch, targetHolder, holder)
                 self.setNewAttribute(layer, tempHolderCombination[0], targetHolder, self.actualHolderAttribute)
-                self.setNewAttribute(layer, tempHolderCombination[0], ','.join(tempTargetCombination), self.actualIdAttribute)
-                self.holdersWithHoldings[holder].pop(self.holdersWithHoldings[holder].index(tempHolderCombination[0]))
-                self.holdersWithHoldings[targetHolder].append(tempHolderCombination[0])
+                self.setNewAttribute(layer, tempHolderCombination[0], ','.join([str(holding) for holding in tempTargetCombination]), self.actualIdAttribute)
+                self.holdersWithHoldings.move(tempHolderCombination[0], holder, targetHolder)
                 self.counter += 1
         else:
             #one to one change
@@ -1843,64 +2017,20 @@ class PolygonGrouper(QgsProcessingAlgorithm):
             self.setNewAttribute(layer, tempHolderCombination[0], targetHolder, self.actualHolderAttribute)
             self.setNewAttribute(layer, tempTargetCombination[0], tempHolderCombination[0], self.actualIdAttribute)
             self.setNewAttribute(layer, tempTargetCombination[0], holder, self.actualHolderAttribute)
-            self.holdersWithHoldings[targetHolder].pop(self.holdersWithHoldings[targetHolder].index(tempTargetCombination[0]))
-            self.holdersWithHoldings[holder].append(tempTargetCombination[0])
-            self.holdersWithHoldings[holder].pop(self.holdersWithHoldings[holder].index(tempHolderCombination[0]))
-            self.holdersWithHoldings[targetHolder].append(tempHolderCombination[0])
+            self.holdersWithHoldings.move(tempTargetCombination[0], targetHolder, holder)
+            self.holdersWithHoldings.move(tempHolderCombination[0], holder, targetHolder)
             self.counter += 1    
+        self.ownerComponents.move([(hold, targetHolder) for hold in tempHolderCombination] + [(ch, holder) for ch in tempTargetCombination])
 
-    def filterTouchinFeatures(self, layer, toSeed=False):
+    def filterTouchinFeatures(self, layer):
         """
-        DESCRIPTION: Determine, if a holder holding touches its seed polygon. If true, filter it, from the changables, and can be mark as seed
+        DESCRIPTION: Determine, if a holder holding touches its seed polygon (it is in the same connected block as one of the holder's seeds). If true, filter it from the changables. Only the holders changed since the last call are checked
         INPUTS:
                 layer: QgsVectorLayer
-                toSeed: Boolean
         OUTPUTS: None
         """
-        algParams =  {
-        'INPUT':layer,
-        'FIELD':[self.actualHolderAttribute],
-        'OUTPUT':'TEMPORARY_OUTPUT'
-        }
-        dissolvedLayer = processing.run("native:dissolve", algParams)['OUTPUT']
-
-        algParams = {
-        'INPUT':dissolvedLayer,
-        'OUTPUT':'TEMPORARY_OUTPUT'
-        }
-        simpliedLayer = processing.run("native:multiparttosingleparts", algParams)['OUTPUT']
-
-        for turn, seed in enumerate(list(self.seeds.values())):
-            if turn == 0:
-                expression = f'"{self.idAttribute}" = \'{seed}\''
-            else:
-                expression += f'OR "{self.idAttribute}" = \'{seed}\''
-        layer.selectByExpression(expression)
-
-        algParams = {
-            'INPUT': simpliedLayer,
-            'PREDICATE':[1],
-            'METHOD' : 0,
-            'INTERSECT':QgsProcessingFeatureSourceDefinition(layer.source(), selectedFeaturesOnly=True, featureLimit=-1, geometryCheck=QgsFeatureRequest.GeometryAbortOnInvalid),
-            'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        mergedSeed = processing.run("native:extractbylocation", algParams)['OUTPUT']
-
-        algParams = {
-            'INPUT': layer,
-            'PREDICATE':[6],
-            'METHOD' : 0,
-            'INTERSECT':mergedSeed,
-            'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        processing.run("native:selectbylocation", algParams)
-        selectedFeatures = layer.selectedFeatures()
-        for feature in selectedFeatures:
-            idValue = feature.attribute(self.idAttribute)
-            self.globalChangables.pop(self.globalChangables.index(idValue))
-            if toSeed:
-                holderValue = feature.attribute(self.actualHolderAttribute)
-                self.seeds[holderValue].append(idValue)
+        for idValue in self.ownerComponents.attachedHoldings(self.seeds):
+            self.globalChangables.discard(idValue)
 
     def createMergedFile(self, layer, directory):
         """
@@ -1910,68 +2040,64 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 directory: String, absolute path to save the new layer
         OUTPUTS: None
         """
-        lastHolderAttribute = int(self.actualHolderAttribute.split('_')[0])
-        if lastHolderAttribute == self.steps-2:
-            if self.steps-2 >= 10:
-                attributeName = str(lastHolderAttribute) + self.actualHolderAttribute[2:]
-            else:
-                attributeName = str(lastHolderAttribute) + self.actualHolderAttribute[1:]
-        else:
-            if lastHolderAttribute >= 10:
-                attributeName = str(lastHolderAttribute-1) + self.actualHolderAttribute[2:]
-            else:
-                attributeName = str(lastHolderAttribute-1) + self.actualHolderAttribute[1:]
-
-        algParams = {
-            'EXPRESSION': f'array_contains (overlay_touches (@layer, \"{attributeName}\", limit:=-1), \"{attributeName}\")',
-            'INPUT': layer,
-            'METHOD': 0
-        }
-        processing.run('qgis:selectbyexpression', algParams)
-
-        # Extract selected features
-        algParams = {
-            'INPUT': layer,
-            'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        selectedFeatures = processing.run('native:saveselectedfeatures', algParams)['OUTPUT']
+        attributeName = self.getFinalAttribute(self.actualHolderAttribute)
 
-        # Dissolve
-        algParams = {
-            'FIELD': [attributeName],
-            'INPUT': selectedFeatures,
-            'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        dissolvedLayer = processing.run('native:dissolve', algParams)['OUTPUT']
-
-        # Difference
-        algParams = {
-            'INPUT': layer,
-            'OVERLAY': dissolvedLayer,
-            'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        differences = processing.run('native:difference', algParams)['OUTPUT']
-
-        # Merge vector layers
-        algParams = {
-            'CRS': layer.crs(),
-            'LAYERS': [differences, dissolvedLayer],
-            'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        mergedLayer = processing.run('native:mergevectorlayers', algParams)['OUTPUT']
-        mergedLayer.setName(f'{os.path.basename(layer.source())[:-4]}')
-        index = self.getAttributesNames(mergedLayer).index(self.weight)
-        mergedLayer.startEditing()
-        for feature in mergedLayer.getFeatures():
+        # Connected blocks of the final holders, over the adjacency graph
+        features = {}
+        finalHolders = {}
+        for feature in layer.getFeatures():
+            features[feature.id()] = feature
             holder = feature.attribute(attributeName)
-            #newValue = self.holdersTotalArea[holder]
-            newValue = feature.geometry().area()/10000
-            mergedLayer.changeAttributeValue(feature.id(), index, newValue)
-        mergedLayer.commitChanges()
+            if holder == qgis.core.NULL or holder == 'NULL':
+                holder = None
+            finalHolders[feature.id()] = holder
+        blocks, unheld = mergeGroups(self.adjacencyGraph, self.featureIds, finalHolders)
+        blocks = [[features[featureId] for featureId in block] for block in blocks]
+
+        # Union the blocks in parallel, GEOS releases the GIL
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            geometries = list(executor.map(self.unionBlock, blocks))
+
+        mergedLayer = QgsVectorLayer('MultiPolygon', f'{os.path.basename(layer.source())[:-4]}', 'memory')
+        mergedLayer.setCrs(layer.crs())
+        mergedLayer.dataProvider().addAttributes(layer.fields().toList())
+        mergedLayer.updateFields()
+        index = mergedLayer.fields().indexFromName(self.weight)
+        mergedFeatures = []
+        for block, geometry in zip(blocks, geometries):
+            mergedFeature = QgsFeature(mergedLayer.fields())
+            mergedFeature.setAttributes(block[0].attributes())
+            mergedFeature.setGeometry(geometry)
+            if index >= 0:
+                mergedFeature.setAttribute(index, geometry.area()/10000)
+            mergedFeatures.append(mergedFeature)
+        # The features without holder are copied unchanged (only their geometry type follows the layer)
+        for featureId in unheld:
+            geometry = QgsGeometry(features[featureId].geometry())
+            geometry.convertToMultiType()
+            mergedFeature = QgsFeature(mergedLayer.fields())
+            mergedFeature.setAttributes(features[featureId].attributes())
+            mergedFeature.setGeometry(geometry)
+            mergedFeatures.append(mergedFeature)
+        mergedLayer.dataProvider().addFeatures(mergedFeatures)
         finalLayer = self.createTempLayer(mergedLayer, directory, "merged")
         layer.removeSelection()
         return finalLayer
 
+    def unionBlock(self, features):
+        """
+        DESCRIPTION: Union the geometries of a block of holdings
+        INPUTS:
+                features: List, QgsFeatures of the block
+        OUTPUTS: QgsGeometry, multipolygon
+        """
+        if len(features) == 1:
+            geometry = QgsGeometry(features[0].geometry())
+        else:
+            geometry = QgsGeometry.unaryUnion([feature.geometry() for feature in features])
+        geometry.convertToMultiType()
+        return geometry
+
     def calculateStatData(self, layer, fieldName):
         """
         DESCRIPTION: Calculate statistics infos about a layer and fields
@@ -2436,10 +2562,8 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 feature['Holder ID'] = holder
                 feature['Parcel ID'] = seed
 
-                expression = f'"{self.idAttribute}" = \'{seed}\''
-                swapedLayer.selectByExpression(expression)
-                featureSeed = swapedLayer.selectedFeatures()[0]
-                geometry = featureSeed.geometry()
+                seedGeometry = self.featureIndex.geometry(seed)
+                geometry = seedGeometry
 
                 sideLengths = []
                 angles = []
@@ -2459,21 +2583,11 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 feature['Reflex angles - before'] = len([angle for angle in angles if angle > 180 and angle < 360])
                 feature['Boundary points - before'] = len(angles)
 
-                algParams = {
-                    'INPUT': swapedLayer,
-                    'OUTPUT': 'TEMPORARY_OUTPUT'
-                }
-                selectedFeatures = processing.run("native:saveselectedfeatures",algParams)["OUTPUT"]
-
-                algParams = {
-                    'INPUT': mergedLayer,
-                    'PREDICATE':[1,5],
-                    'INTERSECT':selectedFeatures,
-                    'OUTPUT': 'TEMPORARY_OUTPUT'
-                }
-                processing.run("native:selectbylocation", algParams)
-                selectedFeatures = mergedLayer.selectedFeatures()[0]
-                geometry = selectedFeatures.geometry()
+                request = QgsFeatureRequest().setFilterRect(seedGeometry.boundingBox())
+                for mergedFeature in mergedLayer.getFeatures(request):
+                    geometry = mergedFeature.geometry()
+                    if geometry.contains(seedGeometry) or geometry.overlaps(seedGeometry):
+                        break
 
                 sideLengths = []
                 angles = []
@@ -2495,9 +2609,6 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 feats.append(feature)
                 counter += 1
 
-        swapedLayer.removeSelection()
-        mergedLayer.removeSelection()
-
         log_data.addFeatures(feats)
         log.commitChanges()
         QgsProject.instance().addMapLayer(log)
@@ -2589,14 +2700,14 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         changer = True
         self.globalChangables = self.getChangableHoldings()
         turn = 0
-        holdersLocalTotalArea = copy.deepcopy(self.holdersTotalArea)
+        holdersLocalTotalArea = self.holdersTotalArea.copy()
 
         feedback.pushInfo('Hybrid algorithm started')
 
         while changer:
             turn += 1
             layer = self.setTurnAttributes(layer, turn)
-            localChangables = copy.deepcopy(self.globalChangables)
+            localChangables = self.globalChangables.copy()
             feedback.pushInfo(f'Turn {turn}')
 
             turnHolders = list(self.holdersWithHoldings.keys())
@@ -2606,6 +2717,9 @@ class PolygonGrouper(QgsProcessingAlgorithm):
             measure = True
 
             while measure:
+                if self.searchBudget.expired():
+                    break
+                holderDeadline = self.searchBudget.holderDeadline(len(turnHolders))
                 holdings = self.holdersWithHoldings[holder]
                 holderTotalArea = holdersLocalTotalArea[holder]
                 seedList = self.seeds[holder]
@@ -2627,7 +2741,10 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                 sortedDistances = [(y, x) for y, x in zip(list(inDistance.values()), list(inDistance.keys())) if x in filteredHolderHoldingsIds]
                 sortedDistances.sort()
                 filteredHolderHoldingsIds = [key for value, key in sortedDistances[:5]]
-                holderHoldingsCombinations = self.combine_with_constant_in_all(filteredHolderHoldingsIds)
+                holderHoldingsCombinations = list(self.combine_with_constant_in_all(filteredHolderHoldingsIds))
+                holderAggregates = self.combinationAggregates(filteredHolderHoldingsIds)
+                holderCombinationAreas = [holderAggregates.area(combination) for combination in holderHoldingsCombinations]
+                holderAreaRange = self.combinationAreaRange(holderHoldingsCombinations)
 
                 minAreaHolding = min([self.holdingsWithArea[hold] for hold in holdings])*((100-self.tolerance)/100)
 
@@ -2643,17 +2760,14 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                     if distance not in filteredHolderHoldingsIds and distance in localChangables:
                         filteredLocalChangables.append(distance)
 
-                neighboursIds, neighboursLayer = self.getNeighbours(layer, seed)
-                neighboursHolders = list(set([neighboursFeature.attribute(self.actualHolderAttribute) for neighboursFeature in neighboursLayer.getFeatures()]))
-                del neighboursIds, neighboursLayer, distance, distanceChanges
+                neighboursIds, neighboursFeatures = self.getNeighbours(layer, seed)
+                neighboursHolders = list(set([self.ownerComponents.holder(neighboursId) for neighboursId in neighboursIds]))
+                del neighboursIds, neighboursFeatures, distance, distanceChanges
 
                 targetHolders = []
                 targetHolders.extend(neighboursHolders)
-                for changable in filteredLocalChangables:
-                    for allHolder, allHoldings in self.holdersWithHoldings.items():
-                        if changable in allHoldings and allHolder not in targetHolders and allHolder != 'NULL' and holdersLocalTotalArea[allHolder] > minAreaHolding and allHolder not in neighboursHolders:
-                            targetHolders.append(allHolder)
-                del changable, allHolder, allHoldings, minAreaHolding
+                targetHolders.extend(self.ownerComponents.holdersOf(filteredLocalChangables, neighboursHolders + ['NULL'], holdersLocalTotalArea, minAreaHolding))
+                del minAreaHolding
 
                 for tempTargetHolder in targetHolders:
                     targetHolderSeed = self.seeds[tempTargetHolder]
@@ -2661,86 +2775,87 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                         targetHolderSeed = self.seeds[tempTargetHolder][0]
                         filteredLocalTargetHoldings = [hold for hold in self.holdersWithHoldings[tempTargetHolder] if
                                                         hold in filteredLocalChangables and hold != targetHolderSeed]
+                        # Skip the targets, which gave no swap with the same input before
+                        pairKey = (holder, seed, tempTargetHolder)
+                        pairSignature = (tuple(holdings), tuple(filteredHolderHoldingsIds), holderTotalArea, self.totalDistances.get(holder), targetHolderSeed,
+                                         tuple(filteredLocalTargetHoldings), holdersLocalTotalArea[tempTargetHolder], self.totalDistances.get(tempTargetHolder), len(filteredLocalChangables) > 0)
+                        pairMemo = holderDeadline is None
+                        if pairMemo and self.infeasiblePairs.known(pairKey, holder, tempTargetHolder, pairSignature):
+                            continue
                         if len(filteredLocalChangables) > 0:
-                            targetAllCombinations = self.combine_with_constant_in_all(filteredLocalTargetHoldings)
-                            combTurn = 0
-                            for targetCombination in targetAllCombinations:
-                                if len(targetAllCombinations) == 1:
-                                    targetCombination = targetAllCombinations[0]
-                                if combTurn < 200000:
-                                    combTurn += 1
-                                else:
-                                    break
-                                targetMaxDistance = self.maxDistance(targetCombination, targetHolderSeed, layer)
-                                targetAvgDistanceOld = self.avgDistance(targetCombination, targetHolderSeed, layer)
-                                if len(holderHoldingsCombinations) > 1:
-                                    for holderCombination in holderHoldingsCombinations:
-                                        if len(holderHoldingsCombinations) == 1:
-                                            holderCombination = holderHoldingsCombinations
-                                        # Maximum distance check
-                                        holderMaxDistance = self.maxDistance(holderCombination, seed, layer)
-                                        targetCloser = self.isCloser(holderMaxDistance, targetCombination, seed, holder)
-                                        holderCloser = self.isCloser(targetMaxDistance, holderCombination, targetHolderSeed, tempTargetHolder)
-                                        if targetCloser and holderCloser:
-                                            #Average distance check
-                                            holderAvgDistanceOld = self.avgDistance(holderCombination, seed, layer)
-                                            holderAvgDistanceNew = self.avgDistance(targetCombination, seed, layer)
-                                            targetAvgDistanceNew = self.avgDistance(holderCombination, targetHolderSeed, layer)
-                                            if (targetAvgDistanceNew < targetAvgDistanceOld) and (holderAvgDistanceNew < holderAvgDistanceOld):
-                                                #Shape check
-                                                if self.checkShape(layer, seed, holdings, holderCombination, targetCombination):
-                                                    #Total area check
-                                                    newHolderTotalArea = holderTotalArea - self.calculateCombinationArea(holderCombination) + self.calculateCombinationArea(targetCombination)
-                                                    newTargetTotalArea = holdersLocalTotalArea[tempTargetHolder] - self.calculateCombinationArea(targetCombination) + self.calculateCombinationArea(holderCombination)
-                                                    if self.checkTotalAreaThreshold(newHolderTotalArea, holder) and self.checkTotalAreaThreshold(newTargetTotalArea, tempTargetHolder):
-                                                        #Create composite number for ranking
-                                                        localMeasure = sum([self.calculateCompositeNumber(seed, tempId) for tempId in holderCombination])
-                                                        if not measure:
-                                                            targetHolder = tempTargetHolder
-                                                            tempHolderCombination = holderCombination
-                                                            tempTargetCombination = targetCombination
-                                                            measure = localMeasure
-                                                            tempHolderTotalArea = newHolderTotalArea
-                                                            tempTargetTotalArea = newTargetTotalArea
-                                                        else:
-                                                            if measure < localMeasure:
-                                                                targetHolder = tempTargetHolder
-                                                                tempHolderCombination = holderCombination
-                                                                tempTargetCombination = targetCombination
-                                                                measure = localMeasure
-                                                                tempHolderTotalArea = newHolderTotalArea
-                                                                tempTargetTotalArea = newTargetTotalArea                                  
+                            targetMinimalArea, targetMaximalArea = self.areaWindow(holder, holderTotalArea, tempTargetHolder, holdersLocalTotalArea[tempTargetHolder], holderAreaRange, False)
+                            targetAllCombinations = self.combine_with_constant_in_all(filteredLocalTargetHoldings, None, targetMinimalArea, targetMaximalArea)
+                            targetAllCombinations = self.limitSearch(targetAllCombinations, holderDeadline)
+                            matches = self.matchCombinations(targetAllCombinations, holderHoldingsCombinations, holderCombinationAreas, holder, holderTotalArea, tempTargetHolder, holdersLocalTotalArea[tempTargetHolder])
+                            if len(holderHoldingsCombinations) > 1:
+                                # The pairs are checked in decreasing composite number, so the first suitable one is the best
+                                holderMeasures = {combination: holderAggregates.compositeNumber(combination, seed) for combination in holderHoldingsCombinations}
+                                targetDistances = {}
+                                for targetCombination, holderCombination in untilDeadline(bestFirstPairs(matches, holderMeasures), holderDeadline):
+                                    if targetCombination not in targetDistances:
+                                        targetDistances[targetCombination] = (self.maxDistance(targetCombination, targetHolderSeed, layer),
+                                                                              self.avgDistance(targetCombination, targetHolderSeed, layer),
+                                                                              self.avgDistance(targetCombination, seed, layer),
+                                                                              self.distanceSummary(targetCombination, seed))
+                                    targetMaxDistance, targetAvgDistanceOld, holderAvgDistanceNew, (targetSeedMaxDistance, targetSeedSumDistance) = targetDistances[targetCombination]
+                                    # Maximum distance check
+                                    holderMaxDistance = holderAggregates.maxDistance(holderCombination, seed)
+                                    targetCloser = self.isCloserThan(holderMaxDistance, targetSeedMaxDistance, targetSeedSumDistance, holder)
+                                    holderCloser = self.isCloserThan(targetMaxDistance, holderAggregates.maxDistance(holderCombination, targetHolderSeed),
+                                                                     holderAggregates.distanceSum(holderCombination, targetHolderSeed), tempTargetHolder)
+                                    if targetCloser and holderCloser:
+                                        #Average distance check
+                                        holderAvgDistanceOld = holderAggregates.avgDistance(holderCombination, seed)
+                                        targetAvgDistanceNew = holderAggregates.avgDistance(holderCombination, targetHolderSeed)
+                                        if (targetAvgDistanceNew < targetAvgDistanceOld) and (holderAvgDistanceNew < holderAvgDistanceOld):
+                                            #Shape check
+                                            if self.checkShape(layer, seed, holdings, holderCombination, targetCombination):
+                                                #Total area check
+                                                newHolderTotalArea = holderTotalArea - holderAggregates.area(holderCombination) + self.calculateCombinationArea(targetCombination)
+                                                newTargetTotalArea = holdersLocalTotalArea[tempTargetHolder] - self.calculateCombinationArea(targetCombination) + holderAggregates.area(holderCombination)
+                                                if self.checkTotalAreaThreshold(newHolderTotalArea, holder) and self.checkTotalAreaThreshold(newTargetTotalArea, tempTargetHolder):
+                                                    #Create composite number for ranking
+                                                    localMeasure = holderMeasures[holderCombination]
+                                                    if not measure or measure < localMeasure:
+                                                        targetHolder = tempTargetHolder
+                                                        tempHolderCombination = holderCombination
+                                                        tempTargetCombination = targetCombination
+                                                        measure = localMeasure
+                                                        tempHolderTotalArea = newHolderTotalArea
+                                                        tempTargetTotalArea = newTargetTotalArea
+                                                    if measure:
+                                                        # The next pairs can not have larger composite number
+                                                        break
+                        if pairMemo and not measure:
+                            self.infeasiblePairs.record(pairKey, holder, tempTargetHolder, pairSignature)
                     else:
                         filteredLocalTargetHoldings = [hold for hold in self.holdersWithHoldings[tempTargetHolder] if
                                                         hold in filteredLocalChangables]
                         
-                        targetAllCombinations = self.combine_with_constant_in_all(filteredLocalTargetHoldings)
+                        targetMinimalArea, targetMaximalArea = self.areaWindow(holder, holderTotalArea, tempTargetHolder, holdersLocalTotalArea[tempTargetHolder], holderAreaRange, False)
+                        targetAllCombinations = self.combine_with_constant_in_all(filteredLocalTargetHoldings, None, targetMinimalArea, targetMaximalArea)
                         targetCombinations = []
                         originCombinations = []
-                        combTurn = 0
-                        for targetCombination in targetAllCombinations:
-                            if combTurn < 200000:
-                                combTurn += 1
-                            else:
-                                break
-                            for holderCombination in holderHoldingsCombinations:
+                        targetAllCombinations = self.limitSearch(targetAllCombinations, holderDeadline)
+                        for targetCombination, matchedHolderCombinations in self.matchCombinations(targetAllCombinations, holderHoldingsCombinations, holderCombinationAreas, holder, holderTotalArea, tempTargetHolder, holdersLocalTotalArea[tempTargetHolder]):
+                            for holderCombination in matchedHolderCombinations:
                                 #Maximum distance check
-                                holderMaxDistance = self.maxDistance(holderCombination, seed, layer)
+                                holderMaxDistance = holderAggregates.maxDistance(holderCombination, seed)
                                 holderCloser = self.isCloser(holderMaxDistance, sortedCombination, seed, holder)
                                 if holderCloser:
                                     #Average distance check
-                                    holderAvgDistanceOld = self.avgDistance(holderCombination, seed, layer)
+                                    holderAvgDistanceOld = holderAggregates.avgDistance(holderCombination, seed)
                                     holderAvgDistanceNew = self.avgDistance(sortedCombination, seed, layer)
                                     if holderAvgDistanceNew < holderAvgDistanceOld:
                                         #Shape check
                                         holderSeedShape = self.checkShape(layer, seed, holdings, holderCombination, sortedCombination)
                                         if holderSeedShape:
                                             #Total area check
-                                            newHolderTotalArea = holderTotalArea - self.calculateCombinationArea(holderCombination) + self.calculateCombinationArea(targetCombination)
-                                            newTargetTotalArea = holdersLocalTotalArea[tempTargetHolder] - self.calculateCombinationArea(targetCombination) + self.calculateCombinationArea(holderCombination)
+                                            newHolderTotalArea = holderTotalArea - holderAggregates.area(holderCombination) + self.calculateCombinationArea(targetCombination)
+                                            newTargetTotalArea = holdersLocalTotalArea[tempTargetHolder] - self.calculateCombinationArea(targetCombination) + holderAggregates.area(holderCombination)
                                             if self.checkTotalAreaThreshold(newHolderTotalArea, holder) and self.checkTotalAreaThreshold(newTargetTotalArea, tempTargetHolder):
                                                 #Create composite number for ranking
-                                                localMeasure = sum([self.calculateCompositeNumber(seed, tempId) for tempId in holderCombination])
+                                                localMeasure = holderAggregates.compositeNumber(holderCombination, seed)
                                                 if not measure:
                                                     targetHolder = tempTargetHolder
                                                     tempHolderCombination = holderCombination
@@ -2770,12 +2885,12 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                     if len(tempHolderCombination) > 1 and len(tempTargetCombination) > 1:
                         #many to many change
                         for hold in tempHolderCombination:
-                            localChangables.pop(localChangables.index(hold))
+                            localChangables.remove(hold)
                             self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[hold]
                             self.holdingWithSeedDistance[hold] = self.distanceMatrix[targetHolderSeed][hold]
                             self.totalDistances[targetHolder] += self.holdingWithSeedDistance[hold]
                         for ch in tempTargetCombination:
-                            localChangables.pop(localChangables.index(ch))
+                            localChangables.remove(ch)
                             self.totalDistances[targetHolder] = self.totalDistances[targetHolder] - self.holdingWithSeedDistance[ch]
                             self.holdingWithSeedDistance[ch] = self.distanceMatrix[seed][ch]
                             self.totalDistances[holder] += self.holdingWithSeedDistance[ch]
@@ -2788,11 +2903,11 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                         #many to one change
                         if len(tempHolderCombination) > 1:
                             for hold in tempHolderCombination:
-                                localChangables.pop(localChangables.index(hold))
+                                localChangables.remove(hold)
                                 self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[hold] 
                                 self.holdingWithSeedDistance[hold] = self.distanceMatrix[targetHolderSeed][hold]
                                 self.totalDistances[targetHolder] += self.distanceMatrix[targetHolderSeed][hold]
-                            localChangables.pop(localChangables.index(tempTargetCombination[0]))
+                            localChangables.remove(tempTargetCombination[0])
                             self.totalDistances[targetHolder] = self.totalDistances[targetHolder] - self.holdingWithSeedDistance[tempTargetCombination[0]]
                             self.holdingWithSeedDistance[tempTargetCombination[0]] = self.distanceMatrix[seed][tempTargetCombination[0]]
                             self.totalDistances[holder] += self.distanceMatrix[seed][tempTargetCombination[0]]
@@ -2801,11 +2916,11 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                             feedback.pushInfo(commitMessage)
                         else:
                             for ch in tempTargetCombination:
-                                localChangables.pop(localChangables.index(ch))
+                                localChangables.remove(ch)
                                 self.totalDistances[targetHolder] = self.totalDistances[targetHolder] - self.holdingWithSeedDistance[ch] 
                                 self.holdingWithSeedDistance[ch] = self.distanceMatrix[seed][ch]
                                 self.totalDistances[holder] += self.distanceMatrix[seed][ch]
-                            localChangables.pop(localChangables.index(tempHolderCombination[0]))
+                            localChangables.remove(tempHolderCombination[0])
                             self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[tempHolderCombination[0]]
                             self.holdingWithSeedDistance[tempHolderCombination[0]] = self.distanceMatrix[targetHolderSeed][tempHolderCombination[0]]
                             self.totalDistances[targetHolder] += self.distanceMatrix[targetHolderSeed][tempHolderCombination[0]]
@@ -2816,8 +2931,8 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                         holdersLocalTotalArea[targetHolder] = tempTargetTotalArea
                     else:
                         #one to one change
-                        localChangables.pop(localChangables.index(tempTargetCombination[0]))
-                        localChangables.pop(localChangables.index(tempHolderCombination[0]))
+                        localChangables.remove(tempTargetCombination[0])
+                        localChangables.remove(tempHolderCombination[0])
                         self.totalDistances[holder] = self.totalDistances[holder] - self.holdingWithSeedDistance[tempHolderCombination[0]]
                         self.totalDistances[targetHolder] = self.totalDistances[targetHolder] - self.holdingWithSeedDistance[tempTargetCombination[0]]
                         self.holdingWithSeedDistance[tempTargetCombination[0]] = self.distanceMatrix[seed][tempTargetCombination[0]]
@@ -2856,22 +2971,22 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                     changer = False
                     return None
                 else:
-                    changes = copy.deepcopy(self.counter)
+                    changes = self.counter
                     self.filterTouchinFeatures(layer) 
             else:
                 logging.debug(f'Changes in turn {turn}: {self.counter - changes}')
                 feedback.pushInfo(f'Changes in turn {turn}: {self.counter - changes}')
                 if changes == self.counter:
                     changer = False
-                    layer.startEditing()
-                    indexes = []
-                    indexes.append(layer.fields().indexFromName(self.actualIdAttribute))
-                    indexes.append(layer.fields().indexFromName(self.actualHolderAttribute))
-                    layer.deleteAttributes(indexes)
-                    layer.updateFields()
+                    self.turnHistory.dropTurn()
                 else:
-                    changes = copy.deepcopy(self.counter)
+                    changes = self.counter
                     self.filterTouchinFeatures(layer)
+            if changer and self.searchBudget.expired():
+                feedback.pushInfo('Time limit reached, no more turns')
+                changer = False
+                # The changes of the turn are kept, so it is the final one
+                self.turnHistory.stop()
             feedback.setCurrentStep(1+turn)
             feedback.pushInfo('Save turn results to the file')
 
@@ -2906,63 +3021,19 @@ class PolygonGrouper(QgsProcessingAlgorithm):
     def checkShape(self, layer, seed, holdings, holderCombination, sortedCombination):
         #import ptvsd
         #ptvsd.debug_this_thread()
-        algParams =  {
-        'INPUT':layer,
-        'FIELD':[self.actualHolderAttribute],
-        'OUTPUT':'TEMPORARY_OUTPUT'
-        }
-        dissolvedLayer = processing.run("native:dissolve", algParams)['OUTPUT']
-
-        algParams = {
-        'INPUT':dissolvedLayer,
-        'OUTPUT':'TEMPORARY_OUTPUT'
-        }
-        simpliedLayer = processing.run("native:multiparttosingleparts", algParams)['OUTPUT']
-        
-        algParams = {
-        'INPUT':simpliedLayer,
-        'METHOD':0,
-        'TOLERANCE':5,
-        'OUTPUT':'TEMPORARY_OUTPUT'
-        }
-        simpliedLayer = processing.run("native:simplifygeometries", algParams)['OUTPUT']
-
-        expression = f'"{self.idAttribute}" = \'{seed}\''
-        layer.selectByExpression(expression)
-        seedFeature = layer.selectedFeatures()[0]
+        # Actual block of the seed, from the in memory holders
+        seedBlock = self.ownerComponents.block(seed)
+        mergedSeedGeometry = QgsGeometry.unaryUnion([self.featureIndex.geometry(hold) for hold in seedBlock]).simplify(5)
 
-        algParams = {
-                'INPUT': layer,
-                'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        selectedFeatures = processing.run('native:saveselectedfeatures', algParams)['OUTPUT']
-
-        algParams = {
-            'INPUT': simpliedLayer,
-            'PREDICATE':[1, 3, 5],
-            'METHOD' : 0,
-            'INTERSECT':selectedFeatures,
-            'OUTPUT': 'TEMPORARY_OUTPUT'
-        }
-        mergedSeed = processing.run("native:extractbylocation", algParams)['OUTPUT']
-
-        mergedFeature = next(mergedSeed.getFeatures())
-        mergedSeedGeometry = mergedFeature.geometry()
-
-        seedGeometry = layer.selectedFeatures()[0].geometry()
+        seedGeometry = self.featureIndex.geometry(seed)
         geometriesToMerge = [seedGeometry]
-        layer.removeSelection()
-
-        holdings.extend(holderCombination)
 
-        for hold in holdings:
+        # The holder's holdings are not extended in place, the list can be the actual holdings of the holder
+        for hold in itertools.chain(holdings, holderCombination):
             if hold not in sortedCombination and hold != seed:
-                expression = f'"{self.idAttribute}" = \'{hold}\''
-                layer.selectByExpression(expression)
-                holdGeometry = layer.selectedFeatures()[0].geometry()
+                holdGeometry = self.featureIndex.geometry(hold)
                 if holdGeometry.touches(seedGeometry) or holdGeometry.intersects(seedGeometry):
                     geometriesToMerge.append(holdGeometry)
-                layer.removeSelection()
         
         newSeedGeometry = QgsGeometry.unaryUnion(geometriesToMerge)
 
@@ -2982,21 +3053,11 @@ class PolygonGrouper(QgsProcessingAlgorithm):
             closestSeed = None
             closestDistance = None
             for sed in seedList:
-                if closestSeed and closestDistance:
+                if closestSeed is not None and closestDistance is not None:
                     try:
                         distance = self.distanceMatrix[sed][holding]
                     except KeyError:
-                        expression = f'"{self.idAttribute}" = \'{sed}\''
-                        layer.selectByExpression(expression)
-                        featureSeed = layer.selectedFeatures()[0]
-                        expression = f'"{self.idAttribute}" = \'{holding}\''
-                        layer.selectByExpression(expression)
-                        featureTarget = layer.selectedFeatures()[0]
-                        # Get geometries of the features
-                        geometrySeed = featureSeed.geometry()
-                        geometryTarget = featureTarget.geometry()
-                        # Calculate the distance
-                        distance = geometrySeed.distance(geometryTarget)
+                        distance = self.pairDistances.distance(sed, holding)
                     if distance < closestDistance:
                         closestSeed = sed
                         closestDistance = distance
@@ -3004,17 +3065,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
                     try:
                         distance = self.distanceMatrix[sed][holding]
                     except KeyError:
-                        expression = f'"{self.idAttribute}" = \'{sed}\''
-                        layer.selectByExpression(expression)
-                        featureSeed = layer.selectedFeatures()[0]
-                        expression = f'"{self.idAttribute}" = \'{holding}\''
-                        layer.selectByExpression(expression)
-                        featureTarget = layer.selectedFeatures()[0]
-                        # Get geometries of the features
-                        geometrySeed = featureSeed.geometry()
-                        geometryTarget = featureTarget.geometry()
-                        # Calculate the distance
-                        distance = geometrySeed.distance(geometryTarget)
+                        distance = self.pairDistances.distance(sed, holding)
                     closestSeed = sed
                     closestDistance = distance
             if closestSeed == seed:
@@ -3032,17 +3083,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
         #try to reconfigure attr value
         renderer = targetLayer.renderer()
         if hasattr(renderer, 'setClassAttribute'):
-            lastHolderAttribute = int(self.actualHolderAttribute.split('_')[0])
-            if lastHolderAttribute == self.steps-2:
-                if self.steps-2 >= 10:
-                    holderAttribute = str(lastHolderAttribute) + self.actualHolderAttribute[2:]
-                else:
-                    holderAttribute = str(lastHolderAttribute) + self.actualHolderAttribute[1:]
-            else:
-                if lastHolderAttribute >= 10:
-                    holderAttribute = str(lastHolderAttribute-1) + self.actualHolderAttribute[2:]
-                else:
-                    holderAttribute = str(lastHolderAttribute-1) + self.actualHolderAttribute[1:]
+            holderAttribute = self.getFinalAttribute(self.actualHolderAttribute)
             renderer.setClassAttribute(holderAttribute)
             targetLayer.triggerRepaint()
 
@@ -3051,17 +3092,7 @@ class PolygonGrouper(QgsProcessingAlgorithm):
     def cleanMergedLayer(self, toDeletAttr, layer):
         layer.startEditing()
         indexes = []
-        lastHolderAttribute = int(self.actualHolderAttribute.split('_')[0])
-        if lastHolderAttribute == self.steps-2:
-            if self.steps-2 >= 10:
-                holderAttribute = str(lastHolderAttribute) + self.actualHolderAttribute[2:]
-            else:
-                holderAttribute = str(lastHolderAttribute) + self.actualHolderAttribute[1:]
-        else:
-            if lastHolderAttribute >= 10:
-                holderAttribute = str(lastHolderAttribute-1) + self.actualHolderAttribute[2:]
-            else:
-                holderAttribute = str(lastHolderAttribute-1) + self.actualHolderAttribute[1:]
+        holderAttribute = self.getFinalAttribute(self.actualHolderAttribute)
         for attributeName in toDeletAttr:
             if attributeName not in [self.idAttribute, holderAttribute]:
                 indexes.append(layer.fields().indexFromName(attributeName))